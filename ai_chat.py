@@ -2,66 +2,288 @@
 """
 DeepSeek 命令行对话程序
 支持连续对话和流式输出
+
+启动时在后台预热到 API 服务器的长连接（DNS + TCP + TLS），显示欢迎信息的同时完成握手，
+第一轮对话直接复用这条连接；设置了 SYSTEM_PROMPT 时还会发送一次最小请求预热服务端的前缀缓存。
+各阶段耗时输出到 stderr（SHOW_TIMINGS = False 关闭）。
+遵循 HTTP_PROXY / HTTPS_PROXY / NO_PROXY 环境变量（HTTPS 经代理的 CONNECT 隧道），并跟随 307/308 重定向。
+
+支持工具调用: TOOL_SERVERS 中的 MCP 服务（GitHub、SSH、测试用例生成）在后台线程中
+直接加载到本进程（tool_hub.py，不经过 stdio 传输），工具以 function calling 的形式提供给模型；
+默认不加载任何服务（TOOL_SERVERS = []），需要时自行开启。只读工具（列出仓库、远程目录等）
+一轮中的多个调用并发执行，每个调用完成后立即输出结果；其他工具（执行远程脚本、上传下载文件、
+生成测试用例等）逐个执行，执行前显示工具名和完整参数并询问 y/N，AUTO_APPROVE_TOOLS 中的除外。
 """
 
+import base64
+import http.client
 import json
 import sys
+import threading
+import time
+import urllib.parse
 import urllib.request
-import urllib.error
+
+from tool_hub import Timings, accumulate_tool_call_deltas, chat_turn, start_tool_hub
 
 # DeepSeek API配置
 API_KEY = ""  # 请替换为你的API密钥
 API_URL = "https://api.deepseek.com/v1/chat/completions"
 MODEL = "deepseek-chat"
 
+# 可选: 系统提示词，每轮对话都作为第一条消息发送
+SYSTEM_PROMPT = ""
+# 启动时用系统提示词发送一次 max_tokens=1 的请求，之后的对话可命中服务端的前缀缓存
+PRIME_CACHE = True
+# 在 stderr 输出连接、预热、首 token 等阶段的耗时
+SHOW_TIMINGS = True
+REQUEST_TIMEOUT = 60
+# 最多跟随几次重定向（只跟随保留 POST 方法和请求体的 307/308）
+MAX_REDIRECTS = 5
+# 在本进程中加载的 MCP 服务，工具提供给模型调用，可选 "github"、"ssh"、"gen-testcase"；[] 表示不使用工具
+TOOL_SERVERS = []
+# 无需确认即可执行的非只读工具（fnmatch 模式，如 "gen_testcase__*"）；只读工具始终直接执行
+AUTO_APPROVE_TOOLS = []
+# 每轮对话中模型最多连续请求几次工具调用，超过后要求模型直接回答
+MAX_TOOL_ROUNDS = 8
+# 工具结果在终端中显示的最大字符数（发给模型的是完整结果）
+TOOL_PREVIEW_CHARS = 200
+
+timings = Timings(SHOW_TIMINGS)
+
+
+def proxy_for(scheme, host):
+    """环境变量为该地址配置的代理，返回 (代理主机, 端口, 代理认证头)；不经代理时返回 None"""
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    parts = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers = {}
+    if parts.username:
+        credentials = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+    return parts.hostname, parts.port or 80, headers
+
+
+class ConnectionPool:
+    """到 API 服务器的 keep-alive 连接池
+
+    请求结束后连接放回池中，下次请求直接复用，省去 DNS 解析和 TCP/TLS 握手；
+    多个线程同时请求时各自取一条连接（池中没有空闲连接就新建）。
+    配置了代理时连接建到代理上：HTTPS 通过 CONNECT 隧道，HTTP 直接把完整 URL 发给代理。
+    """
+
+    def __init__(self, url, timeout=REQUEST_TIMEOUT):
+        parts = urllib.parse.urlsplit(url)
+        self.url = url
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path + (f"?{parts.query}" if parts.query else "")
+        self.timeout = timeout
+        self.proxy = proxy_for(parts.scheme, parts.netloc)
+        # 每个请求额外带上的请求头（经 HTTP 代理时的代理认证）
+        self.headers = {}
+        if self.proxy is not None and not self.https:
+            self.path = urllib.parse.urlunsplit(parts._replace(fragment=""))
+            self.headers = self.proxy[2]
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        if self.proxy is None:
+            conn = connection_class(self.host, self.port, timeout=self.timeout)
+        else:
+            proxy_host, proxy_port, proxy_headers = self.proxy
+            conn = connection_class(proxy_host, proxy_port, timeout=self.timeout)
+            if self.https:
+                conn.set_tunnel(self.host, self.port, headers=proxy_headers)
+        started = time.perf_counter()
+        conn.connect()
+        timings.record("建立连接 (DNS+TCP+TLS)", time.perf_counter() - started)
+        return conn
+
+    def acquire(self):
+        """取一条连接，返回 (连接, 是否为复用的连接)"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def release(self, conn):
+        with self._lock:
+            self._idle.append(conn)
+
+    def warm(self):
+        """预先建立一条连接放入池中"""
+        self.release(self._connect())
 
-def stream_chat(messages):
-    """发送请求并流式接收响应"""
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(url=None):
+    """url（默认 API_URL）对应的连接池"""
+    url = url or API_URL
+    with _pool_lock:
+        if url not in _pools:
+            _pools[url] = ConnectionPool(url)
+        return _pools[url]
+
+
+def send(pool, body, headers):
+    """在连接池的一条连接上发送 POST，返回 (连接, 响应)；复用的连接已被服务器关闭时换一条新连接重试一次"""
+    while True:
+        conn, reused = pool.acquire()
+        try:
+            conn.request("POST", pool.path, body=body, headers={**headers, **pool.headers})
+            return conn, conn.getresponse()
+        except ConnectionError:
+            conn.close()
+            if not reused:
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+
+def post(data):
+    """发送 POST 请求，返回 (连接池, 连接, 响应)；跟随 307/308 重定向"""
+    url = API_URL
+    body = json.dumps(data).encode('utf-8')
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {API_KEY}"
     }
-    
+    for _ in range(MAX_REDIRECTS + 1):
+        pool = get_pool(url)
+        conn, response = send(pool, body, headers)
+        location = response.getheader("Location")
+        if response.status not in (307, 308) or not location:
+            return pool, conn, response
+        response.read()
+        finish(pool, conn, response)
+        target = urllib.parse.urljoin(url, location)
+        # 与 requests 一致：重定向到其他主机时不再发送 API 密钥
+        if urllib.parse.urlsplit(target).netloc != urllib.parse.urlsplit(url).netloc:
+            headers.pop("Authorization", None)
+        url = target
+    raise RuntimeError(f"重定向次数超过 {MAX_REDIRECTS} 次: {API_URL}")
+
+
+def finish(pool, conn, response):
+    """响应读完后把连接放回连接池；未读完或服务器要求关闭时直接关闭连接"""
+    if response.isclosed() and not response.will_close:
+        pool.release(conn)
+    else:
+        conn.close()
+
+
+def prime_prompt_cache():
+    """用系统提示词发送一次 max_tokens=1 的请求，让服务端缓存这段前缀"""
+    started = time.perf_counter()
+    pool, conn, response = post({
+        "model": MODEL,
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "你好"}],
+        "max_tokens": 1,
+        "stream": False
+    })
+    response.read()
+    finish(pool, conn, response)
+    if response.status >= 400:
+        raise RuntimeError(f"{response.status} {response.reason}")
+    timings.record("前缀缓存预热请求", time.perf_counter() - started)
+
+
+def warm_up():
+    """后台预热：建立连接，设置了 SYSTEM_PROMPT 时再发送一次缓存预热请求"""
+    started = time.perf_counter()
+    try:
+        if SYSTEM_PROMPT and PRIME_CACHE:
+            prime_prompt_cache()
+        else:
+            get_pool().warm()
+        timings.record("后台预热完成", time.perf_counter() - started)
+    except Exception as e:
+        timings.note(f"预热失败（不影响对话）: {e}")
+
+
+def stream_chat(messages, tools=None, tool_calls=None):
+    """发送请求并流式接收响应
+
+    传入 tools（OpenAI function calling 格式）时模型可以请求工具调用，
+    流中的 tool_calls 增量合并到 tool_calls 字典（按 index）中；请求中途失败或响应不完整
+    （没有 finish_reason / [DONE]）时清空 tool_calls，避免执行参数不完整的工具调用。
+    """
     data = {
         "model": MODEL,
         "messages": messages,
         "stream": True
     }
-    
-    req = urllib.request.Request(
-        API_URL,
-        data=json.dumps(data).encode('utf-8'),
-        headers=headers
-    )
-    
+    if tools:
+        data["tools"] = tools
+
     try:
-        with urllib.request.urlopen(req) as response:
-            for line in response:
-                line = line.decode('utf-8').strip()
-                if not line or line == "data: [DONE]":
-                    continue
-                    
-                if line.startswith("data: "):
-                    try:
-                        json_data = json.loads(line[6:])
-                        delta = json_data.get("choices", [{}])[0].get("delta", {})
-                        content = delta.get("content", "")
-                        if content:
-                            print(content, end='', flush=True)
-                            yield content
-                    except json.JSONDecodeError:
-                        continue
-    except urllib.error.HTTPError as e:
-        error_msg = e.read().decode('utf-8')
-        print(f"\n错误: {e.code} - {error_msg}", file=sys.stderr)
+        pool, conn, response = post(data)
+    except Exception as e:
+        print(f"\n错误: {str(e)}", file=sys.stderr)
         return
+
+    try:
+        if response.status >= 400:
+            error_msg = response.read().decode('utf-8')
+            print(f"\n错误: {response.status} - {error_msg}", file=sys.stderr)
+            return
+
+        finished = False
+        for line in response:
+            line = line.decode('utf-8').strip()
+            if line == "data: [DONE]":
+                finished = True
+                continue
+            if not line:
+                continue
+
+            if line.startswith("data: "):
+                try:
+                    json_data = json.loads(line[6:])
+                    choice = json_data.get("choices", [{}])[0]
+                    finished = finished or bool(choice.get("finish_reason"))
+                    delta = choice.get("delta", {})
+                    if tool_calls is not None and delta.get("tool_calls"):
+                        accumulate_tool_call_deltas(tool_calls, delta["tool_calls"])
+                    content = delta.get("content", "")
+                    if content:
+                        print(content, end='', flush=True)
+                        yield content
+                except json.JSONDecodeError:
+                    continue
+        # 连接提前断开时 http.client 不一定报错，没有收到结束标记就不执行工具调用
+        if tool_calls and not finished:
+            tool_calls.clear()
+            print("\n错误: 响应不完整，已忽略其中的工具调用", file=sys.stderr)
     except Exception as e:
+        if tool_calls is not None:
+            tool_calls.clear()
         print(f"\n错误: {str(e)}", file=sys.stderr)
         return
+    finally:
+        finish(pool, conn, response)
+
+
+def initial_messages():
+    return [{"role": "system", "content": SYSTEM_PROMPT}] if SYSTEM_PROMPT else []
 
 
 def main():
     """主程序"""
+    # 显示欢迎信息、等待输入的同时在后台建立连接
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    hub_future = start_tool_hub(TOOL_SERVERS, AUTO_APPROVE_TOOLS, timings)
+    hub = None
+
     print("=" * 50)
     print("DeepSeek 对话程序")
     print("=" * 50)
@@ -71,7 +293,7 @@ def main():
     print()
     
     # 对话历史
-    messages = []
+    messages = initial_messages()
     
     while True:
         try:
@@ -87,26 +309,34 @@ def main():
                 break
             
             if user_input.lower() == 'clear':
-                messages = []
+                messages = initial_messages()
                 print("对话历史已清空\n")
                 continue
             
             # 添加用户消息
             messages.append({"role": "user", "content": user_input})
             
+            # 第一轮对话时取后台加载好的工具（未完成时等待）
+            if hub is None and hub_future is not None:
+                started = time.perf_counter()
+                try:
+                    hub = hub_future.result()
+                except Exception as e:
+                    print(f"工具加载失败，本次不使用工具: {e}", file=sys.stderr)
+                hub_future = None
+                timings.record("等待工具就绪", time.perf_counter() - started)
+            
             # 显示AI回复
+            timings.flush()
             print("AI: ", end='', flush=True)
             
-            # 收集AI回复
-            assistant_reply = ""
-            for chunk in stream_chat(messages):
-                assistant_reply += chunk
+            # 收集AI回复（添加到历史由 chat_turn 完成，包括工具调用和结果）
+            started = time.perf_counter()
+            chat_turn(stream_chat, messages, hub, timings, MAX_TOOL_ROUNDS, TOOL_PREVIEW_CHARS)
             
             print()  # 换行
-            
-            # 添加AI回复到历史
-            if assistant_reply:
-                messages.append({"role": "assistant", "content": assistant_reply})
+            timings.record("本轮总计", time.perf_counter() - started)
+            timings.flush()
             
             print()  # 空行分隔
             
@@ -0,0 +1,45 @@
+"""Shared helpers for the benchmark scripts"""
+import importlib.util
+import math
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_server(demo_dir: str, module_name: str) -> ModuleType:
+    """Import <demo_dir>/server.py under a unique module name
+
+    All demo servers are called server.py, so they cannot be imported by name
+    side by side.
+    """
+    path = REPO_ROOT / demo_dir / "server.py"
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (pct in 0..100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], wall: float) -> Dict[str, float]:
+    """Latency percentiles (ms) and throughput for a batch of calls"""
+    return {
+        "calls": len(latencies),
+        "wall_s": round(wall, 4),
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
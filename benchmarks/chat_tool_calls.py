@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tool-call execution benchmark for the chat CLIs (tool_hub.ToolHub)
+
+Usage:
+    python benchmarks/chat_tool_calls.py [--calls 4] [--delay-ms 50] [--rounds 3]
+
+One model turn requests `--calls` ssh list_remote_directory calls (read-only,
+so the hub runs them concurrently) against the local SSH server behind
+delay_proxy, which adds --delay-ms each way. The same turn is executed:
+
+- in-process, concurrently (ToolHub.run_tool_calls, what the CLIs do)
+- in-process, one call after another
+- through a stdio MCP client session to `python ssh-mcp-demo/server.py`,
+  sequentially and with asyncio.gather (the transport the hub avoids)
+
+and end to end through tool_hub.chat_turn with ai_chat.stream_chat against
+mock_chat with the same tool calls. Concurrent execution should take about one call's time instead
+of the sum; the stdio rows add process start-up and JSON-RPC framing.
+Finally two execute_remote_script calls check the approval gate: the
+declined one must come back as an error without running, the approved one
+must run.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _common import REPO_ROOT
+from delay_proxy import DelayProxy
+from local_sshd import LocalSSHServer
+from mock_chat import MockChatServer
+
+sys.path.insert(0, str(REPO_ROOT))
+
+import ai_chat  # noqa: E402
+from tool_hub import ToolHub, chat_turn  # noqa: E402
+
+
+def _tool_calls(name: str, arguments: list, port: int) -> list:
+    login = {"host": "127.0.0.1", "port": port, "username": "bench", "password": "bench"}
+    return [{"id": f"call_{i}", "type": "function",
+             "function": {"name": f"ssh__{name}", "arguments": json.dumps({**args, **login})}}
+            for i, args in enumerate(arguments)]
+
+
+def _time(fn, rounds: int) -> dict:
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return {"median_s": round(statistics.median(durations), 3), "min_s": round(min(durations), 3)}
+
+
+async def _stdio_turn(calls: list, concurrent: bool, rounds: int) -> dict:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=[str(REPO_ROOT / "ssh-mcp-demo" / "server.py")],
+                                   cwd=str(REPO_ROOT / "ssh-mcp-demo"))
+    start = time.perf_counter()
+    async with stdio_client(params) as (read, write), ClientSession(read, write) as session:
+        await session.initialize()
+        startup = time.perf_counter() - start
+        durations = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            requests = [session.call_tool("list_remote_directory", json.loads(c["function"]["arguments"]))
+                        for c in calls]
+            if concurrent:
+                await asyncio.gather(*requests)
+            else:
+                for request in requests:
+                    await request
+            durations.append(time.perf_counter() - start)
+    return {"median_s": round(statistics.median(durations), 3), "min_s": round(min(durations), 3),
+            "startup_s": round(startup, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=4, help="tool calls requested in one model turn")
+    parser.add_argument("--delay-ms", type=float, default=50.0, help="one-way delay added to the SSH link")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.getLogger("paramiko").setLevel(logging.WARNING)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, LocalSSHServer() as sshd, \
+            DelayProxy(sshd.port, args.delay_ms / 1000) as proxy:
+        directories = []
+        for i in range(args.calls):
+            directory = Path(tmp) / f"dir{i}"
+            directory.mkdir()
+            (directory / f"file{i}.txt").write_text("data\n")
+            directories.append({"remote_dir": str(directory)})
+        calls = _tool_calls("list_remote_directory", directories, proxy.port)
+
+        asked = []
+
+        def confirm(name, arguments):
+            asked.append(name)
+            return "approve" in arguments
+
+        start = time.perf_counter()
+        hub = ToolHub.load(["ssh"], confirm=confirm)
+        results["hub_load_s"] = round(time.perf_counter() - start, 3)
+        try:
+            # Warm the SSH connection cache so every variant starts from the same state
+            list(hub.run_tool_calls(calls[:1]))
+
+            def concurrent():
+                outputs = [message["content"] for _, message, _ in hub.run_tool_calls(calls)]
+                assert all("file" in output for output in outputs), outputs
+
+            def sequential():
+                for call in calls:
+                    list(hub.run_tool_calls([call]))
+
+            results["in_process_concurrent"] = _time(concurrent, args.rounds)
+            results["in_process_sequential"] = _time(sequential, args.rounds)
+            results["stdio_sequential"] = asyncio.run(_stdio_turn(calls, False, args.rounds))
+            results["stdio_gather"] = asyncio.run(_stdio_turn(calls, True, args.rounds))
+
+            mock_calls = [{"name": c["function"]["name"], "arguments": json.loads(c["function"]["arguments"])}
+                          for c in calls]
+            with MockChatServer(tokens=10, first_token_delay=0.01, tool_calls=mock_calls) as chat:
+                ai_chat.API_URL = f"{chat.url}/v1/chat/completions"
+                ai_chat.timings.enabled = False
+
+                def turn():
+                    messages = [{"role": "user", "content": "run the scripts"}]
+                    chat_turn(ai_chat.stream_chat, messages, hub, ai_chat.timings)
+                    assert sum(m["role"] == "tool" for m in messages) == len(calls), messages
+
+                results["chat_turn_end_to_end"] = _time(turn, args.rounds)
+                results["chat_requests"] = chat.requests
+
+            script = Path(tmp) / "work.sh"
+            script.write_text("#!/bin/sh\necho ran $1\n")
+            script.chmod(0o755)
+            gated = _tool_calls("execute_remote_script", [{"script_path": str(script), "args": "decline"},
+                                                           {"script_path": str(script), "args": "approve"}],
+                                sshd.port)
+            outputs = {message["tool_call_id"]: message["content"] for _, message, _ in hub.run_tool_calls(gated)}
+            assert asked == ["ssh__execute_remote_script"] * 2, asked
+            assert outputs["call_0"].startswith("Error:") and "ran" not in outputs["call_0"], outputs
+            assert "ran approve" in outputs["call_1"], outputs
+            results["approval_gate"] = {"asked": len(asked), "declined": outputs["call_0"]}
+        finally:
+            hub.close()
+
+    print()
+    for key, value in results.items():
+        if isinstance(value, dict) and "median_s" in value:
+            print(f"  {key:24s} {value['median_s']:6.3f}s median")
+    print(json.dumps({"calls": args.calls, "delay_ms": args.delay_ms, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
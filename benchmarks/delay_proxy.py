@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+In-process TCP proxy that adds a fixed one-way delay in both directions
+
+Stand-in for a high-latency link (no netem/root needed): every chunk read
+from one side is forwarded to the other side `delay` seconds later, order
+preserved, so the round-trip time grows by 2 * delay while bandwidth stays
+unlimited.
+
+    with LocalSSHServer() as sshd, DelayProxy(sshd.port, delay=0.025) as proxy:
+        client.connect("127.0.0.1", proxy.port, ...)   # ~50 ms RTT
+
+Run standalone:
+
+    python benchmarks/delay_proxy.py 2222 --delay-ms 25   # listens on DELAY_PROXY_PORT (default 2223)
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class _DelayedPipe:
+    """Forward src -> dst, releasing each chunk `delay` seconds after it was read"""
+
+    def __init__(self, src: socket.socket, dst: socket.socket, delay: float):
+        self.src = src
+        self.dst = dst
+        self.delay = delay
+        self._queue: deque = deque()
+        self._ready = threading.Condition()
+        self._closed = False
+
+    def start(self) -> None:
+        threading.Thread(target=self._read, daemon=True).start()
+        threading.Thread(target=self._write, daemon=True).start()
+
+    def _read(self) -> None:
+        try:
+            while True:
+                data = self.src.recv(256 * 1024)
+                if not data:
+                    break
+                with self._ready:
+                    self._queue.append((time.monotonic() + self.delay, data))
+                    self._ready.notify()
+        except OSError:
+            pass
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+
+    def _write(self) -> None:
+        try:
+            while True:
+                with self._ready:
+                    while not self._queue and not self._closed:
+                        self._ready.wait()
+                    if not self._queue:
+                        break
+                    due, data = self._queue.popleft()
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self.dst.sendall(data)
+        except OSError:
+            pass
+        finally:
+            try:
+                self.dst.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+
+class DelayProxy:
+    """Listen on 127.0.0.1 and forward to target_port with added latency; use as a context manager"""
+
+    def __init__(self, target_port: int, delay: float = 0.025, target_host: str = "127.0.0.1", port: int = 0):
+        self.target = (target_host, target_port)
+        self.delay = delay
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", port))
+        self._sock.listen(64)
+        self.port = self._sock.getsockname()[1]
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "DelayProxy":
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                break
+            try:
+                upstream = socket.create_connection(self.target)
+            except OSError:
+                client.close()
+                continue
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            _DelayedPipe(client, upstream, self.delay).start()
+            _DelayedPipe(upstream, client, self.delay).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCP proxy adding a fixed one-way delay")
+    parser.add_argument("target_port", type=int)
+    parser.add_argument("--delay-ms", type=float, default=25.0, help="one-way delay (RTT grows by twice this)")
+    args = parser.parse_args()
+    with DelayProxy(args.target_port, args.delay_ms / 1000,
+                    port=int(os.environ.get("DELAY_PROXY_PORT", "2223"))) as proxy:
+        print(f"Delay proxy 127.0.0.1:{proxy.port} -> 127.0.0.1:{args.target_port} (+{args.delay_ms:g} ms each way)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: target discovery on a repo with a large node_modules tree
+
+Usage:
+    python benchmarks/gen_testcase_discovery.py [--node-modules-files 200000] [--source-files 2000]
+
+Builds a synthetic git repo (source files, a .gitignore listing node_modules/
+and build/, a populated node_modules and build output) and compares a
+find-style full walk (what gen_testcase.sh does) with the server's
+ignore-aware discovery, which prunes ignored directories without entering them.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from _common import load_server
+
+
+def make_repo(root: Path, node_modules_files: int, source_files: int, per_dir: int = 200) -> None:
+    (root / ".git").mkdir(parents=True)
+    (root / ".gitignore").write_text("node_modules/\nbuild/\n*.log\n")
+    for i in range(source_files):
+        directory = root / "src" / f"pkg{i // per_dir:03d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"module{i}.py").write_text("x = 1\n")
+    for i in range(node_modules_files):
+        directory = root / "node_modules" / f"dep{i // per_dir:05d}" / "lib"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"index{i}.js").write_text("module.exports = 1;\n")
+    (root / "build").mkdir()
+    for i in range(min(source_files, 1000)):
+        (root / "build" / f"out{i}.o").write_bytes(b"\0" * 16)
+
+
+def full_walk(root: Path) -> int:
+    """Equivalent of `find "$TARGET" -type f` minus *-test files"""
+    count = 0
+    for _, _, filenames in os.walk(root):
+        count += sum(1 for name in filenames if "-test" not in name)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--node-modules-files", type=int, default=200000)
+    parser.add_argument("--source-files", type=int, default=2000)
+    args = parser.parse_args()
+
+    server = load_server("gen-testcase-mcp-demo", "gen_testcase_server")
+    results = {"node_modules_files": args.node_modules_files, "source_files": args.source_files}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "repo"
+        start = time.perf_counter()
+        make_repo(root, args.node_modules_files, args.source_files)
+        results["setup_s"] = round(time.perf_counter() - start, 3)
+
+        # Warm the dentry cache so both variants are measured on the same footing
+        full_walk(root)
+
+        start = time.perf_counter()
+        results["full_walk_files"] = full_walk(root)
+        results["full_walk_s"] = round(time.perf_counter() - start, 4)
+
+        start = time.perf_counter()
+        results["discovered_files"] = len(server.enumerate_sources(root, {}))
+        results["discovery_s"] = round(time.perf_counter() - start, 4)
+
+    results["speedup"] = round(results["full_walk_s"] / results["discovery_s"], 1) if results["discovery_s"] else None
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: materialising generated test cases by copy vs reflink / content-addressed store
+
+Usage:
+    python benchmarks/gen_testcase_materialize.py [--files 2000] [--size-kb 64] [--duplicate-ratio 0.5]
+
+Builds a synthetic tree of --files source files of --size-kb each, where
+--duplicate-ratio of them share one of a handful of contents (vendored
+copies, fixtures, generated code), and generates every test case with the
+in-process copy generator under each materialize setting:
+
+- "copy":    byte-for-byte copies (the previous behaviour)
+- default:   ["reflink", "copy"]: FICLONE clones where the filesystem
+             supports them, else copy
+- "cas":     ["reflink", "cas", "copy"] (opt-in); on filesystems without
+             reflink the outputs become read-only hardlinks into the
+             .testcase-store objects
+
+Reports wall time, bytes written as reported by generate_targets, and the
+actual disk usage of the outputs plus the store (each inode counted once,
+from st_blocks). A full regeneration run (new generator version) is timed
+too, since every file is rewritten then.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from _common import load_server
+
+
+def make_tree(root: Path, files: int, size: int, duplicate_ratio: float, per_dir: int = 100) -> None:
+    rng = random.Random(0)
+
+    def text() -> bytes:
+        # Printable content: files with NUL bytes would be skipped as binary
+        return rng.randbytes(size // 2).hex().encode()
+
+    shared = [text() for _ in range(8)]
+    for i in range(files):
+        directory = root / f"pkg{i // per_dir:03d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        content = rng.choice(shared) if rng.random() < duplicate_ratio else text()
+        (directory / f"module{i}.py").write_bytes(content)
+
+
+def disk_usage(root: Path, pattern: str) -> int:
+    """Bytes allocated to files matching pattern plus the store, each inode once"""
+    seen, total = set(), 0
+    for dirpath, _, filenames in os.walk(root):
+        in_store = ".testcase-store" in Path(dirpath).parts
+        for name in filenames:
+            if not in_store and pattern not in name:
+                continue
+            st = os.lstat(os.path.join(dirpath, name))
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    server = load_server("gen-testcase-mcp-demo", "gen_testcase_server")
+    from generators import CopyGenerator
+    from materialize import Materializer
+
+    workers = args.workers or server.get_max_workers({})
+    results = {"files": args.files, "size_kb": args.size_kb, "duplicate_ratio": args.duplicate_ratio,
+               "workers": workers}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template"
+        make_tree(template, args.files, args.size_kb * 1024, args.duplicate_ratio)
+        results["source_bytes"] = disk_usage(template, "")
+
+        for label, strategies in (("copy", "copy"), ("default", None), ("cas", ["reflink", "cas", "copy"])):
+            root = Path(tmp) / label
+            shutil.copytree(template, root)
+            generator = CopyGenerator(Materializer(strategies))
+
+            start = time.perf_counter()
+            report = server.generate_targets([(root, None)], generator, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            assert report["counts"]["regenerated"] == args.files, report["counts"]
+
+            # A different generator version forces every file to be rewritten
+            generator.version = generator.version + "-v2"
+            start = time.perf_counter()
+            rerun = server.generate_targets([(root, None)], generator, max_workers=workers)
+            regenerate = time.perf_counter() - start
+
+            storage = report["storage"]
+            results[label] = {
+                "generate_s": round(elapsed, 3),
+                "regenerate_all_s": round(regenerate, 3),
+                "methods": storage["methods"],
+                "bytes_written": storage["bytes_written"],
+                "deduplicated": storage["deduplicated"],
+                "regenerate_bytes_written": rerun["storage"]["bytes_written"],
+                "output_disk_bytes": disk_usage(root, "-test"),
+            }
+            print(f"  {label:8s} {elapsed:7.3f}s  written {storage['bytes_written'] / 2**20:8.1f} MiB  "
+                  f"on disk {results[label]['output_disk_bytes'] / 2**20:8.1f} MiB  {storage['methods']}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial vs parallel test generation on a synthetic source tree
+
+Usage:
+    python benchmarks/gen_testcase_parallel.py [--files 10000] [--workers N]
+
+Compares the legacy single gen_testcase.sh directory run, the server's
+per-file script pipeline with one worker and with the default (CPU-sized)
+pool, and the in-process copy generator. Each variant starts from a fresh
+copy of the tree.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from _common import REPO_ROOT, load_server
+
+SCRIPT = REPO_ROOT / "gen-testcase-mcp-demo" / "gen_testcase.sh"
+
+
+def make_tree(root: Path, files: int, per_dir: int = 100) -> None:
+    """Create `files` small source files spread over directories of `per_dir`"""
+    extensions = (".py", ".js", ".go", ".c")
+    for i in range(files):
+        directory = root / f"pkg{i // per_dir:04d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"module{i}{extensions[i % len(extensions)]}").write_text(f"# source {i}\n" * 10)
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None, help="parallel pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    server = load_server("gen-testcase-mcp-demo", "gen_testcase_server")
+    from generators import run_script
+
+    workers = args.workers or server.get_max_workers({})
+    results = {"files": args.files, "workers": workers}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template"
+        make_tree(template, args.files)
+
+        def fresh(name: str) -> Path:
+            target = Path(tmp) / name
+            shutil.copytree(template, target)
+            return target
+
+        legacy = fresh("legacy")
+        results["legacy_script_s"] = round(timed(lambda: run_script(str(SCRIPT), legacy)), 3)
+
+        script = server.ScriptGenerator(SCRIPT)
+
+        serial = fresh("serial")
+        results["serial_pool_s"] = round(timed(
+            lambda: server.generate_incremental(serial, script, max_workers=1)), 3)
+
+        parallel = fresh("parallel")
+        results["parallel_pool_s"] = round(timed(
+            lambda: server.generate_incremental(parallel, script, max_workers=workers)), 3)
+
+        results["rerun_unchanged_s"] = round(timed(
+            lambda: server.generate_incremental(parallel, script, max_workers=workers)), 3)
+
+        in_process = fresh("in_process")
+        results["in_process_copy_s"] = round(timed(
+            lambda: server.generate_incremental(in_process, server.CopyGenerator(), max_workers=workers)), 3)
+
+    results["speedup_vs_serial_pool"] = round(results["serial_pool_s"] / results["parallel_pool_s"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("PYTHONUNBUFFERED", "1")
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Multi-source aggregation benchmark for github-mcp-demo
+
+Usage:
+    python benchmarks/github_aggregate.py [--latency 0.05] [--orgs 900,400,150,60] [--tokens 2]
+
+Runs mock_github with several orgs of different sizes and a fixed per-request
+latency, then times aggregate_repositories for each source on its own and
+for all sources in one call. With concurrent sources and concurrent pages the
+combined call should take about as long as the slowest single source, not
+the sum of all of them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from _common import load_server
+from mock_github import MockGitHubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per mock API request")
+    parser.add_argument("--orgs", default="900,400,150,60", help="repository count per org")
+    parser.add_argument("--tokens", type=int, default=2, help="sources are spread over this many tokens")
+    parser.add_argument("--per-token-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    orgs = {f"org{i}": int(count) for i, count in enumerate(args.orgs.split(","))}
+    with MockGitHubServer(repos=200, latency=args.latency, orgs=orgs) as gh:
+        os.environ["GITHUB_API_URL"] = gh.url
+        token_envs = [f"GITHUB_TOKEN_BENCH_{i}" for i in range(max(args.tokens, 1))]
+        for i, env in enumerate(token_envs):
+            os.environ[env] = f"bench-token-{i}"
+        server = load_server("github-mcp-demo", "github_server")
+
+        sources = [{"type": "self", "token_env": token_envs[0]}]
+        sources += [{"type": "org", "name": org, "token_env": token_envs[(i + 1) % len(token_envs)]}
+                    for i, org in enumerate(orgs)]
+
+        def aggregate(selected):
+            start = time.perf_counter()
+            result = asyncio.run(server.aggregate_repositories(
+                selected, per_token_concurrency=args.per_token_concurrency))
+            return time.perf_counter() - start, result
+
+        single = {}
+        for source in sources:
+            elapsed, result = aggregate([source])
+            label = result["sources"][0]["source"]
+            single[label] = {"seconds": round(elapsed, 3), "repos": result["total"],
+                             "pages": result["sources"][0].get("pages")}
+            print(f"  {label:10s} {elapsed:6.2f}s  {result['total']:5d} repos")
+
+        gh.reset_counters()
+        elapsed, result = aggregate(sources)
+        errors = [s for s in result["sources"] if s.get("error")]
+        print(f"  {'combined':10s} {elapsed:6.2f}s  {result['total']:5d} repos (deduplicated), "
+              f"{gh.requests} requests, {len(errors)} errors")
+
+    report = {
+        "latency_s": args.latency,
+        "single": single,
+        "sum_of_single_s": round(sum(v["seconds"] for v in single.values()), 3),
+        "slowest_single_s": max(v["seconds"] for v in single.values()),
+        "combined_s": round(elapsed, 3),
+        "combined_repos": result["total"],
+        "tokens": result["tokens"],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Webhook-maintained repository cache benchmark for github-mcp-demo
+
+Usage:
+    python benchmarks/github_webhook.py [--repos 2000] [--latency 0.02] [--events 200] [--reads 50]
+
+Runs mock_github with --repos repositories and a fixed per-request latency,
+then compares list_repositories reads:
+
+- without the receiver, after the GITHUB_REUSE_WINDOW has expired (every read
+  is a full paginated crawl, which is what keeping data fresh by polling costs)
+- with the receiver (GITHUB_WEBHOOK_SECRET set): one crawl, then reads from memory
+
+and posts --events signed `repository` edited/renamed/deleted deliveries to
+the receiver, timing each delivery until a read reflects it. Upstream request
+counts come from the mock.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from _common import load_server, percentile
+from mock_github import USER, MockGitHubServer, make_repo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per mock API request")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=50)
+    args = parser.parse_args()
+
+    with MockGitHubServer(repos=args.repos, latency=args.latency) as gh:
+        os.environ.update(GITHUB_API_URL=gh.url, GITHUB_TOKEN="bench-token", GITHUB_REUSE_WINDOW="0",
+                          GITHUB_WEBHOOK_SECRET="bench-secret", GITHUB_WEBHOOK_PORT="0")
+        server = load_server("github-mcp-demo", "github_webhook_server")
+        results = {"repos": args.repos, "latency_s": args.latency}
+
+        async def reads(count):
+            durations = []
+            for _ in range(count):
+                start = time.perf_counter()
+                repos = await server.list_repositories()
+                durations.append(time.perf_counter() - start)
+            return repos, durations
+
+        # Polling: with no reuse window every read crawls all pages again
+        gh.reset_counters()
+        polled = max(args.reads // 10, 3)
+        _, durations = asyncio.run(reads(polled))
+        results["polling"] = {"reads": polled, "median_ms": round(statistics.median(durations) * 1000, 2),
+                              "upstream_requests": gh.requests}
+
+        receiver = server.start_webhook_receiver()
+        try:
+            gh.reset_counters()
+            _, durations = asyncio.run(reads(args.reads + 1))
+            results["webhook_cache"] = {
+                "reads": args.reads, "first_read_ms": round(durations[0] * 1000, 2),
+                "median_ms": round(statistics.median(durations[1:]) * 1000, 3),
+                "upstream_requests": gh.requests,
+            }
+
+            actions = ("edited", "renamed", "deleted")
+            delays = []
+            for i in range(args.events):
+                action = actions[i % len(actions)]
+                repo = make_repo(USER, i + 1)
+                payload = {"action": action, "repository": repo}
+                if action == "edited":
+                    repo["description"] = f"edit {i}"
+                elif action == "renamed":
+                    payload["changes"] = {"repository": {"name": {"from": repo["name"]}}}
+                    repo["name"] = f"renamed-{i}"
+                    repo["full_name"] = f"{USER}/renamed-{i}"
+                body = json.dumps(payload).encode("utf-8")
+                start = time.perf_counter()
+                status, _ = server.post_webhook(receiver.url, "bench-secret", "repository", body, f"bench-{i}")
+                repos = asyncio.run(server.list_repositories())
+                delays.append(time.perf_counter() - start)
+                assert status == 200, status
+                names = {r["full_name"] for r in repos}
+                if action == "edited":
+                    assert any(r["description"] == f"edit {i}" for r in repos)
+                else:
+                    assert make_repo(USER, i + 1)["full_name"] not in names
+            results["events"] = {
+                "count": args.events,
+                "deliver_to_visible_p50_ms": round(percentile(delays, 50) * 1000, 2),
+                "deliver_to_visible_p99_ms": round(percentile(delays, 99) * 1000, 2),
+                "upstream_requests": gh.requests,
+            }
+            results["metrics"] = json.loads(server.get_github_metrics())["webhook"]
+        finally:
+            server.stop_webhook_receiver()
+
+    print(f"  polling        {results['polling']['median_ms']:9.2f} ms/read")
+    print(f"  webhook cache  {results['webhook_cache']['median_ms']:9.3f} ms/read "
+          f"({results['webhook_cache']['upstream_requests']} upstream requests for {args.reads + 1} reads)")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
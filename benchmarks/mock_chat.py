@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Scripted OpenAI-compatible chat server used as a stand-in for DeepSeek/OpenAI in benchmarks
+
+POST /v1/chat/completions (and /chat/completions) replies with a scripted
+answer, streamed as SSE chunks when "stream" is true; GET /v1/models lists
+one model (clients use it to warm up a connection). The delay before the
+first token and between tokens is configurable. Connections are HTTP/1.1
+keep-alive (chunked SSE), and `connections` counts the TCP connections
+accepted, so connection reuse by a client can be checked.
+
+With `tool_calls` set, a request that offers "tools" and whose last message
+is not a tool result is answered with those function calls instead (streamed
+as tool_call deltas, arguments split across chunks, finish_reason
+"tool_calls"); the follow-up request carrying the tool results gets the
+scripted text. `tool_results` keeps the tool messages of every request.
+
+    with MockChatServer(tokens=40, first_token_delay=0.05, token_delay=0.002) as chat:
+        ai_chat.API_URL = chat.url + "/v1/chat/completions"
+
+    calls = [{"name": "github__list_repositories", "arguments": {"per_page": 10}}]
+    with MockChatServer(tool_calls=calls) as chat: ...
+
+Run standalone:
+
+    python benchmarks/mock_chat.py            # listens on MOCK_CHAT_PORT (default 8766)
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SCRIPT = ["This is a scripted reply from the local benchmark chat server."]
+
+
+class MockChatServer:
+    """Threaded mock chat completions endpoint on 127.0.0.1; use as a context manager"""
+
+    def __init__(self, tokens: int = 40, first_token_delay: float = 0.05, token_delay: float = 0.002,
+                 script: Optional[List[str]] = None, tool_calls: Optional[List[Dict[str, Any]]] = None,
+                 port: int = 0):
+        self.tokens = tokens
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.script = script or DEFAULT_SCRIPT
+        self.tool_calls = tool_calls or []
+        self.tool_results: List[List[Dict[str, Any]]] = []
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MockChatServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+            self.tool_results = []
+
+    def reply_tokens(self, request_index: int) -> List[str]:
+        """The scripted reply for a request, split into `tokens` pieces"""
+        words = self.script[request_index % len(self.script)].split()
+        return [f"{words[i % len(words)]} " for i in range(self.tokens)]
+
+    def requested_tool_calls(self, body: Dict[str, Any], request_index: int) -> List[Dict[str, Any]]:
+        """The function calls to answer a request with (empty when a text reply is due)"""
+        messages = body.get("messages") or [{}]
+        if not body.get("tools") or not self.tool_calls or messages[-1].get("role") == "tool":
+            return []
+        return [{"id": f"call_{request_index}_{i}", "type": "function",
+                 "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))}}
+                for i, call in enumerate(self.tool_calls)]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("/v1/models", "/models"):
+                    self.send_error(404)
+                    return
+                payload = json.dumps({"object": "list", "data": [
+                    {"id": "mock-chat", "object": "model", "created": 0, "owned_by": "benchmarks"}]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+                with server._lock:
+                    index = server.requests
+                    server.requests += 1
+                    server.tool_results.append([m for m in body.get("messages", []) if m.get("role") == "tool"])
+
+                calls = server.requested_tool_calls(body, index)
+                tokens = [] if calls else server.reply_tokens(index)
+                model = body.get("model", "mock-chat")
+                time.sleep(server.first_token_delay)
+
+                if not body.get("stream"):
+                    message = {"role": "assistant", "content": "".join(tokens) or None}
+                    if calls:
+                        message["tool_calls"] = calls
+                    payload = json.dumps({
+                        "id": f"chatcmpl-{index}", "object": "chat.completion", "model": model,
+                        "choices": [{"index": 0, "finish_reason": "tool_calls" if calls else "stop",
+                                     "message": message}],
+                    }).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                deltas = [{"content": token} for token in tokens]
+                for i, call in enumerate(calls):
+                    # Like the real APIs: id and name first, then the arguments in pieces
+                    arguments = call["function"]["arguments"]
+                    half = len(arguments) // 2
+                    deltas.append({"tool_calls": [{"index": i, "id": call["id"], "type": "function",
+                                                   "function": {"name": call["function"]["name"], "arguments": ""}}]})
+                    for piece in (arguments[:half], arguments[half:]):
+                        deltas.append({"tool_calls": [{"index": i, "function": {"arguments": piece}}]})
+                for i, delta in enumerate(deltas):
+                    if i and server.token_delay:
+                        time.sleep(server.token_delay)
+                    chunk = {
+                        "id": f"chatcmpl-{index}", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                    }
+                    self._chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                final = {
+                    "id": f"chatcmpl-{index}", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls" if calls else "stop"}],
+                }
+                self._chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    with MockChatServer(port=int(os.environ.get("MOCK_CHAT_PORT", "8766"))) as chat:
+        print(f"Mock chat server listening on {chat.url}/v1/chat/completions")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
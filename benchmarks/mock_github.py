@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Local mock of the GitHub REST API used as a stand-in for api.github.com in benchmarks
+
+Serves GET /user/repos, /users/<name>/repos and /orgs/<name>/repos with
+page/per_page pagination and Link headers, a fixed per-request latency and
+per-token X-RateLimit-* headers. Every request needs an Authorization header.
+The authenticated user ("bench-user") owns `repos` repositories and is a member
+of every org in `orgs`, so /user/repos also returns the org repositories.
+
+    with MockGitHubServer(repos=250, latency=0.02, orgs={"acme": 120}) as gh:
+        os.environ["GITHUB_API_URL"] = gh.url
+
+Run standalone to point the github-mcp-demo --test mode at it:
+
+    python benchmarks/mock_github.py          # listens on MOCK_GITHUB_PORT (default 8765)
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+USER = "bench-user"
+RATE_LIMIT = 5000
+
+
+def make_repo(owner: str, index: int, private: bool = False) -> Dict[str, Any]:
+    """A repository object with the fields the demo servers read"""
+    name = f"repo-{index:05d}"
+    return {
+        "id": hash((owner, index)) & 0x7FFFFFFF,
+        "name": name,
+        "full_name": f"{owner}/{name}",
+        "owner": {"login": owner},
+        "description": f"Synthetic repository {index} of {owner}",
+        "private": private,
+        "visibility": "private" if private else "public",
+        "html_url": f"https://github.example/{owner}/{name}",
+        "ssh_url": f"git@github.example:{owner}/{name}.git",
+        "clone_url": f"https://github.example/{owner}/{name}.git",
+        "default_branch": "main",
+        "updated_at": "2024-01-01T00:00:00Z",
+    }
+
+
+class MockGitHubServer:
+    """Threaded mock GitHub API on 127.0.0.1; use as a context manager"""
+
+    def __init__(self, repos: int = 250, latency: float = 0.0, orgs: Optional[Dict[str, int]] = None,
+                 users: Optional[Dict[str, int]] = None, port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._remaining: Dict[str, int] = {}
+        self._orgs = {org: [make_repo(org, i) for i in range(count)] for org, count in (orgs or {}).items()}
+        self._users = {user: [make_repo(user, i) for i in range(count)] for user, count in (users or {}).items()}
+        self._users[USER] = [make_repo(USER, i, private=i % 3 == 0) for i in range(repos)]
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MockGitHubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self._remaining.clear()
+
+    def _listing(self, path: str, query: Dict[str, List[str]]) -> Optional[List[Dict[str, Any]]]:
+        parts = [p for p in path.split("/") if p]
+        if parts == ["user", "repos"]:
+            repos = list(self._users[USER])
+            for org_repos in self._orgs.values():
+                repos.extend(org_repos)
+            visibility = query.get("visibility", ["all"])[0]
+            if visibility in ("public", "private"):
+                repos = [r for r in repos if r["visibility"] == visibility]
+            return repos
+        if len(parts) == 3 and parts[2] == "repos":
+            if parts[0] == "orgs":
+                return self._orgs.get(parts[1])
+            if parts[0] == "users":
+                return self._users.get(parts[1])
+        return None
+
+    def _take_rate_limit(self, token: str) -> int:
+        with self._lock:
+            self.requests += 1
+            remaining = self._remaining.get(token, RATE_LIMIT) - 1
+            self._remaining[token] = remaining
+            return remaining
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                auth = self.headers.get("Authorization", "")
+                if not auth.startswith(("Bearer ", "token ")):
+                    self._send_json(401, {"message": "Requires authentication"})
+                    return
+
+                remaining = server._take_rate_limit(auth.split(" ", 1)[1])
+                rate_headers = {
+                    "X-RateLimit-Limit": str(RATE_LIMIT),
+                    "X-RateLimit-Remaining": str(max(remaining, 0)),
+                    "X-RateLimit-Reset": str(int(time.time()) + 3600),
+                }
+                if remaining < 0:
+                    self._send_json(403, {"message": "API rate limit exceeded"}, rate_headers)
+                    return
+
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                repos = server._listing(url.path, query)
+                if repos is None:
+                    self._send_json(404, {"message": "Not Found"}, rate_headers)
+                    return
+
+                per_page = min(max(int(query.get("per_page", ["30"])[0]), 1), 100)
+                page = max(int(query.get("page", ["1"])[0]), 1)
+                start = (page - 1) * per_page
+                last_page = max((len(repos) + per_page - 1) // per_page, 1)
+                if page < last_page:
+                    base = f"{server.url}{url.path}?per_page={per_page}"
+                    rate_headers["Link"] = (f'<{base}&page={page + 1}>; rel="next", '
+                                            f'<{base}&page={last_page}>; rel="last"')
+                self._send_json(200, repos[start:start + per_page], rate_headers)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    with MockGitHubServer(port=int(os.environ.get("MOCK_GITHUB_PORT", "8765")),
+                          latency=float(os.environ.get("MOCK_GITHUB_LATENCY", "0.02")),
+                          orgs={"acme": 120}) as gh:
+        print(f"Mock GitHub API listening on {gh.url}")
+        print(f"  GITHUB_API_URL={gh.url} GITHUB_TOKEN=any python github-mcp-demo/server.py --test")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
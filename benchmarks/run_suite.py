@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: drive every MCP tool and chat client against local stand-ins
+
+Usage:
+    python benchmarks/run_suite.py [--levels 1,4,16] [--calls 48] [--only github,ssh]
+                                   [--output results.json] [--compare baseline.json] [--threshold 0.25]
+                                   [--startup-runs 3] [--startup-budget-ms 1500]
+
+Stand-ins (all on 127.0.0.1, started in-process):
+    github        mock_github.MockGitHubServer  -> github-mcp-demo list_repositories
+    ssh           local_sshd.LocalSSHServer     -> ssh-mcp-demo upload/exec/list tools
+    gen_testcase  synthetic source trees        -> gen-testcase-mcp-demo generate_testcase
+    chat_urllib   mock_chat.MockChatServer      -> ai_chat.stream_chat
+    chat_openai   mock_chat.MockChatServer      -> OpenAI SDK streaming (skipped if openai is missing)
+
+Each scenario runs `calls` requests at every concurrency level and records
+throughput and latency percentiles, then repeats the highest level under
+tracemalloc to record peak Python memory (kept out of the timed runs because
+tracing slows allocation-heavy code). Results are written to JSON
+(default: benchmarks/results/<commit>.json). With --compare, the run is
+checked against an earlier result file and the exit code is 1 if any
+p50/p99 grew, or throughput dropped, by more than --threshold.
+
+The "startup" section starts each server as a stdio subprocess (see
+mcp_runtime.profile_startup) and records the median time until tools/list is
+answered plus the slowest imports; the exit code is 1 if any server is over
+--startup-budget-ms.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from _common import REPO_ROOT, load_server, percentile, summarize
+
+sys.path.insert(0, str(REPO_ROOT))
+from mcp_runtime import profile_startup, summarize_startup
+from local_sshd import LocalSSHServer
+from mock_chat import MockChatServer
+from mock_github import MockGitHubServer
+
+# (latencies, errors, extra metrics)
+RunResult = Tuple[List[float], int, Dict[str, Any]]
+
+
+def _tool_failed(result: Any) -> bool:
+    """Tool results that report an error in-band (the demos return error strings/dicts)"""
+    content = result[0] if isinstance(result, tuple) else result
+    text = content[0].text if content else ""
+    return text.startswith(("Error", "错误")) or text.lstrip().startswith('{\n  "error"')
+
+
+async def drive_async(call: Callable[[int], Any], concurrency: int, calls: int) -> RunResult:
+    """Run `calls` coroutine calls with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if _tool_failed(await call(i)):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return latencies, errors, {}
+
+
+def drive_threads(call: Callable[[int], Optional[float]], concurrency: int, calls: int) -> RunResult:
+    """Run `calls` blocking calls on `concurrency` threads; call returns time to first token"""
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    errors = 0
+
+    def one(i: int) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            first = call(i)
+            if first is None:
+                errors += 1
+            else:
+                first_tokens.append(first)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(calls)))
+    return latencies, errors, {"ttft_p50_ms": round(percentile(first_tokens, 50) * 1000, 2),
+                               "ttft_p99_ms": round(percentile(first_tokens, 99) * 1000, 2)}
+
+
+class Scenario:
+    """One benchmark target; setup/teardown manage its stand-in"""
+
+    name = ""
+
+    def setup(self, args) -> Optional[str]:
+        """Prepare the scenario; return a reason string to skip it"""
+        return None
+
+    def run(self, concurrency: int, calls: int) -> RunResult:
+        raise NotImplementedError
+
+    def teardown(self) -> None:
+        pass
+
+
+class GitHubScenario(Scenario):
+    name = "github"
+
+    def setup(self, args):
+        self.gh = MockGitHubServer(repos=args.github_repos, latency=args.github_latency).start()
+        os.environ["GITHUB_API_URL"] = self.gh.url
+        os.environ["GITHUB_TOKEN"] = "bench-token"
+        # No result reuse between calls: every call either crawls or joins a concurrent identical crawl
+        os.environ["GITHUB_REUSE_WINDOW"] = "0"
+        self.server = load_server("github-mcp-demo", "github_mcp_server")
+
+    def run(self, concurrency, calls):
+        self.gh.reset_counters()
+        coalesced = self.server.repo_listings.coalesced
+        result = asyncio.run(drive_async(
+            lambda i: self.server.app.call_tool("list_repositories", {}), concurrency, calls))
+        result[2]["upstream_requests"] = self.gh.requests
+        result[2]["coalesced"] = self.server.repo_listings.coalesced - coalesced
+        return result
+
+    def teardown(self):
+        self.gh.stop()
+
+
+class SSHScenario(Scenario):
+    name = "ssh"
+
+    def setup(self, args):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        (root / "remote").mkdir()
+        (root / "local").mkdir()
+        for i in range(20):
+            (root / "remote" / f"file{i}.txt").write_text("x" * 4096)
+            (root / "local" / f"upload{i}.txt").write_text("z" * 8192)
+        config = root / "config.json"
+        config.write_text(json.dumps({"max_workers": 32, "max_concurrency_per_host": 8}))
+        self.sshd = LocalSSHServer().start()
+        self.server = load_server("ssh-mcp-demo", "ssh_mcp_server")
+        self.server.CONFIG_FILE = config
+        conn = dict(host="127.0.0.1", port=self.sshd.port, username="bench", password="bench")
+        remote = str(root / "remote")
+        self.calls = [
+            ("upload_file", lambda i: dict(local_file=str(root / "local" / f"upload{i % 20}.txt"),
+                                           remote_dir=remote, **conn)),
+            ("execute_remote_script", lambda i: dict(script_path="echo", args=f"call-{i}", **conn)),
+            ("list_remote_entries", lambda i: dict(remote_dir=remote, refresh=True, **conn)),
+        ]
+
+    def run(self, concurrency, calls):
+        def call(i):
+            name, make_args = self.calls[i % len(self.calls)]
+            return self.server.mcp.call_tool(name, make_args(i))
+        return asyncio.run(drive_async(call, concurrency, calls))
+
+    def teardown(self):
+        self.sshd.stop()
+        self.tmp.cleanup()
+
+
+class GenTestcaseScenario(Scenario):
+    name = "gen_testcase"
+
+    def setup(self, args):
+        self.files = args.gen_files
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        config = self.root / "config.json"
+        config.write_text(json.dumps({"generator": "copy"}))
+        self.server = load_server("gen-testcase-mcp-demo", "gen_testcase_server")
+        self.server.CONFIG_FILE = config
+        self.round = 0
+
+    def run(self, concurrency, calls):
+        # Every call generates a fresh directory, so none of them is skipped as unchanged
+        self.round += 1
+        targets = []
+        for i in range(calls):
+            target = self.root / f"round{self.round}" / f"call{i}"
+            target.mkdir(parents=True)
+            for j in range(self.files):
+                (target / f"module{j}.py").write_text(f"# source {j}\n" * 10)
+            targets.append(str(target))
+        return asyncio.run(drive_async(
+            lambda i: self.server.mcp.call_tool("generate_testcase", {"path": targets[i]}), concurrency, calls))
+
+    def teardown(self):
+        self.tmp.cleanup()
+
+
+class ChatUrllibScenario(Scenario):
+    name = "chat_urllib"
+
+    def setup(self, args):
+        self.chat = MockChatServer(tokens=args.chat_tokens, first_token_delay=args.chat_first_token_delay,
+                                   token_delay=args.chat_token_delay).start()
+        sys.path.insert(0, str(REPO_ROOT))
+        import ai_chat
+        ai_chat.API_URL = f"{self.chat.url}/v1/chat/completions"
+        ai_chat.timings.enabled = False
+        self.client = ai_chat
+
+    def run(self, concurrency, calls):
+        def call(i):
+            start = time.perf_counter()
+            first = None
+            for _ in self.client.stream_chat([{"role": "user", "content": f"question {i}"}]):
+                if first is None:
+                    first = time.perf_counter() - start
+            return first
+
+        self.chat.reset_counters()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = drive_threads(call, concurrency, calls)
+        result[2]["connections"] = self.chat.connections
+        return result
+
+    def teardown(self):
+        self.chat.stop()
+
+
+class ChatOpenAIScenario(ChatUrllibScenario):
+    name = "chat_openai"
+
+    def setup(self, args):
+        try:
+            from openai import OpenAI
+        except ImportError:
+            return "openai is not installed"
+        self.chat = MockChatServer(tokens=args.chat_tokens, first_token_delay=args.chat_first_token_delay,
+                                   token_delay=args.chat_token_delay).start()
+        self.openai = OpenAI(api_key="bench", base_url=f"{self.chat.url}/v1")
+
+    def run(self, concurrency, calls):
+        def call(i):
+            start = time.perf_counter()
+            first = None
+            stream = self.openai.chat.completions.create(
+                model="mock-chat", messages=[{"role": "user", "content": f"question {i}"}], stream=True)
+            for chunk in stream:
+                if first is None and chunk.choices and chunk.choices[0].delta.content:
+                    first = time.perf_counter() - start
+            return first
+
+        self.chat.reset_counters()
+        result = drive_threads(call, concurrency, calls)
+        result[2]["connections"] = self.chat.connections
+        return result
+
+
+SCENARIOS = [GitHubScenario, SSHScenario, GenTestcaseScenario, ChatUrllibScenario, ChatOpenAIScenario]
+
+# Servers checked against the startup budget
+STARTUP_SERVERS = {
+    "github": "github-mcp-demo/server.py",
+    "ssh": "ssh-mcp-demo/server.py",
+    "gen_testcase": "gen-testcase-mcp-demo/server.py",
+}
+
+
+def run_startup(runs: int, budget_ms: float) -> Tuple[Dict[str, Any], List[str]]:
+    """Profile every server's startup; return the summaries and the servers over budget"""
+    results, over_budget = {}, []
+    for name, script in STARTUP_SERVERS.items():
+        summary = summarize_startup([profile_startup(REPO_ROOT / script, top=5) for _ in range(runs)])
+        summary["server"] = script
+        summary["budget_ms"] = budget_ms
+        results[name] = summary
+        slowest = ", ".join(f"{m['module']} {m['cumulative_ms']}ms" for m in summary["top_cumulative"][:3])
+        print(f"  {name:14s} ready {summary['ready_ms']}ms (budget {budget_ms:g}ms), "
+              f"imports {summary['import_ms']}ms: {slowest}", file=sys.stderr)
+        if summary["ready_ms"] > budget_ms:
+            over_budget.append(f"{name} startup {summary['ready_ms']}ms > budget {budget_ms:g}ms")
+    return results, over_budget
+
+
+def run_scenario(scenario: Scenario, levels: List[int], calls: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"levels": {}}
+    for concurrency in levels:
+        start = time.perf_counter()
+        latencies, errors, extra = scenario.run(concurrency, calls)
+        wall = time.perf_counter() - start
+        results["levels"][str(concurrency)] = {**summarize(latencies, wall), "errors": errors, **extra}
+        print(f"  {scenario.name} c={concurrency}: {results['levels'][str(concurrency)]}", file=sys.stderr)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        scenario.run(max(levels), calls)
+        results["peak_python_memory_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print per-level deltas against a baseline; return the regressions"""
+    regressions = []
+    print(f"\nComparison with {baseline['meta'].get('commit')} (threshold {threshold:.0%}):")
+    for name, scenario in current["scenarios"].items():
+        base_scenario = baseline.get("scenarios", {}).get(name)
+        if not base_scenario or "levels" not in scenario or "levels" not in base_scenario:
+            continue
+        for level, stats in scenario["levels"].items():
+            base = base_scenario["levels"].get(level)
+            if not base:
+                continue
+            deltas = []
+            for metric, higher_is_worse in (("p50_ms", True), ("p99_ms", True), ("throughput_per_s", False)):
+                if not base.get(metric):
+                    continue
+                change = stats[metric] / base[metric] - 1
+                deltas.append(f"{metric} {base[metric]} -> {stats[metric]} ({change:+.0%})")
+                if (change if higher_is_worse else -change) > threshold:
+                    regressions.append(f"{name} c={level} {metric} {change:+.0%}")
+            print(f"  {name:14s} c={level:<3s} " + ", ".join(deltas))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--calls", type=int, default=48, help="calls per level")
+    parser.add_argument("--only", default="", help="comma-separated scenario names")
+    parser.add_argument("--output", default=None, help="result JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression ratio for --compare")
+    parser.add_argument("--github-repos", type=int, default=250)
+    parser.add_argument("--github-latency", type=float, default=0.02, help="seconds per mock API request")
+    parser.add_argument("--gen-files", type=int, default=100, help="source files per generate_testcase call")
+    parser.add_argument("--chat-tokens", type=int, default=40)
+    parser.add_argument("--chat-first-token-delay", type=float, default=0.05)
+    parser.add_argument("--chat-token-delay", type=float, default=0.002)
+    parser.add_argument("--startup-runs", type=int, default=3, help="server starts per server (median is kept)")
+    parser.add_argument("--startup-budget-ms", type=float, default=1500,
+                        help="max time from spawn to tools/list response (under -X importtime)")
+    args = parser.parse_args()
+
+    # Paramiko and the MCP servers log every channel/request at INFO
+    logging.getLogger("paramiko").setLevel(logging.WARNING)
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+
+    levels = [int(level) for level in args.levels.split(",") if level]
+    selected = {name for name in args.only.split(",") if name}
+    commit = git_commit()
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "levels": levels,
+            "calls": args.calls,
+        },
+        "scenarios": {},
+    }
+
+    over_budget: List[str] = []
+    if not selected or "startup" in selected:
+        print("[startup]", file=sys.stderr)
+        report["startup"], over_budget = run_startup(args.startup_runs, args.startup_budget_ms)
+
+    for scenario_class in SCENARIOS:
+        if selected and scenario_class.name not in selected:
+            continue
+        scenario = scenario_class()
+        print(f"[{scenario.name}]", file=sys.stderr)
+        skip = scenario.setup(args)
+        if skip:
+            print(f"  skipped: {skip}", file=sys.stderr)
+            report["scenarios"][scenario.name] = {"skipped": skip}
+            continue
+        try:
+            report["scenarios"][scenario.name] = run_scenario(scenario, levels, args.calls)
+        finally:
+            scenario.teardown()
+
+    output = Path(args.output) if args.output else REPO_ROOT / "benchmarks" / "results" / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}", file=sys.stderr)
+
+    failed = False
+    if over_budget:
+        print("\nOver startup budget:\n  " + "\n  ".join(over_budget))
+        failed = True
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("PYTHONUNBUFFERED", "1")
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Sampling profiler overhead and output check (mcp_runtime profile_server)
+
+Usage:
+    python benchmarks/runtime_profiler.py [--calls 40] [--concurrency 4] [--repos 500] [--intervals 5,1]
+
+Drives github-mcp-demo list_repositories against mock_github (reuse window
+off, so every call runs curl and parses the pages) with --concurrency
+callers, first with the profiler idle and then while profile_server samples
+at each interval in --intervals (milliseconds). Reports the wall time of the
+batch per variant, the CPU time the sampler thread itself used (the direct
+cost; wall-time differences of a few percent are within run-to-run noise of a
+subprocess-heavy workload), and the profile's per-category thread time and
+top functions. With the profiler idle there is no sampler thread at all, so
+the idle row is the baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from _common import load_server
+from mock_github import MockGitHubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repos", type=int, default=500)
+    parser.add_argument("--intervals", default="5,1", help="sampling intervals to try, in milliseconds")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with MockGitHubServer(repos=args.repos, latency=0.0) as gh:
+        os.environ.update(GITHUB_API_URL=gh.url, GITHUB_TOKEN="bench-token", GITHUB_REUSE_WINDOW="0")
+        server = load_server("github-mcp-demo", "github_profiled_server")
+
+        async def batch() -> float:
+            queue = list(range(args.calls))
+
+            async def caller():
+                while queue:
+                    queue.pop()
+                    await server.app.call_tool("list_repositories", {})
+
+            start = time.perf_counter()
+            await asyncio.gather(*(caller() for _ in range(args.concurrency)))
+            return time.perf_counter() - start
+
+        async def profiled(interval_ms: float):
+            # Sample for longer than the batch and stop it once the batch is done
+            profile = server.runtime.profiler.start(600, interval_ms / 1000)
+            try:
+                elapsed = await batch()
+            finally:
+                profile.stop()
+            profile.wait()
+            return elapsed, profile
+
+        results = {"calls": args.calls, "concurrency": args.concurrency, "repos": args.repos}
+        asyncio.run(batch())  # warm up
+        idle = [asyncio.run(batch()) for _ in range(args.rounds)]
+        results["profiler_idle_s"] = round(statistics.median(idle), 3)
+        print(f"  idle        {results['profiler_idle_s']:7.3f}s")
+
+        for interval in (float(value) for value in args.intervals.split(",")):
+            runs = [asyncio.run(profiled(interval)) for _ in range(args.rounds)]
+            elapsed = statistics.median(seconds for seconds, _ in runs)
+            summary = runs[-1][1].summary(top=5)
+            interval = summary["interval_ms"]  # the profiler raises intervals below 1 ms
+            overhead = elapsed / results["profiler_idle_s"] - 1
+            results[f"sampling_{interval:g}ms"] = {
+                "median_s": round(elapsed, 3), "overhead": round(overhead, 3), "ticks": summary["ticks"],
+                "sampler_cpu_share": round(summary["sampler_cpu_s"] / summary["duration_s"], 4),
+                "categories": summary["categories"], "top_cumulative": summary["top_cumulative"],
+            }
+            print(f"  {interval:g} ms      {elapsed:7.3f}s  ({overhead:+.1%}, sampler CPU "
+                  f"{results[f'sampling_{interval:g}ms']['sampler_cpu_share']:.1%})  "
+                  + ", ".join(f"{name} {c['share']:.0%}" for name, c in summary["categories"].items()))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
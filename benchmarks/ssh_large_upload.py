@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Large-file upload benchmark for ssh-mcp-demo over a link with injected latency
+
+Usage:
+    python benchmarks/ssh_large_upload.py [--size-mb 32] [--delay-ms 25] [--channels 1,4]
+                                          [--depths 16,64] [--chunk-kb 32,128]
+
+Starts the local SSH server behind delay_proxy.DelayProxy (RTT = 2 * delay)
+and uploads the same file with paramiko's sftp.put and with the pipelined
+path (fast_upload.pipelined_upload) for every channels x depth x chunk
+combination, checking each result byte-for-byte. A final run goes through the
+upload_large_file tool (mcp.call_tool) with remote sha256 verification.
+Prints throughput per variant as JSON.
+"""
+import argparse
+import asyncio
+import filecmp
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from _common import load_server
+from delay_proxy import DelayProxy
+from local_sshd import LocalSSHServer
+
+
+def _make_file(path: Path, size: int) -> None:
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for offset in range(0, size, len(block)):
+            f.write(block[:min(len(block), size - offset)])
+
+
+def _timed(label: str, upload, source: Path, target: Path, size: int) -> dict:
+    if target.exists():
+        target.unlink()
+    start = time.perf_counter()
+    upload()
+    elapsed = time.perf_counter() - start
+    result = {"variant": label, "seconds": round(elapsed, 3), "mb_per_s": round(size / elapsed / 1e6, 2),
+              "identical": filecmp.cmp(source, target, shallow=False)}
+    print(f"  {label:40s} {result['mb_per_s']:8.2f} MB/s  {result['seconds']:7.2f}s"
+          f"{'' if result['identical'] else '  MISMATCH'}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--delay-ms", type=float, default=25.0, help="one-way delay added by the proxy")
+    parser.add_argument("--channels", default="1,4")
+    parser.add_argument("--depths", default="16,64")
+    parser.add_argument("--chunk-kb", default="32,128")
+    args = parser.parse_args()
+    logging.getLogger("paramiko").setLevel(logging.WARNING)
+
+    server = load_server("ssh-mcp-demo", "ssh_server")
+    from fast_upload import UploadTuning, pipelined_upload
+
+    size = args.size_mb * 1024 * 1024
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, LocalSSHServer() as sshd, \
+            DelayProxy(sshd.port, args.delay_ms / 1000) as proxy:
+        root = Path(tmp)
+        source, remote_dir = root / "artifact.bin", root / "remote"
+        remote_dir.mkdir()
+        target = remote_dir / source.name
+        _make_file(source, size)
+        conn = dict(host="127.0.0.1", port=proxy.port, username="bench", password="bench")
+        print(f"{args.size_mb} MiB over +{args.delay_ms:g} ms each way (RTT ~{2 * args.delay_ms:g} ms)")
+
+        client = server.get_ssh_client(conn["host"], conn["port"], conn["username"], conn["password"])
+        try:
+            sftp = client.open_sftp()
+            results.append(_timed("sftp.put (paramiko default)",
+                                  lambda: sftp.put(str(source), str(target)), source, target, size))
+            sftp.close()
+            for channels in [int(c) for c in args.channels.split(",")]:
+                for depth in [int(d) for d in args.depths.split(",")]:
+                    for chunk_kb in [int(c) for c in args.chunk_kb.split(",")]:
+                        tuning = UploadTuning(channels=channels, pipeline_depth=depth, chunk_size=chunk_kb * 1024)
+                        label = f"pipelined c={channels} depth={depth} chunk={chunk_kb}K"
+                        results.append(_timed(label, lambda: pipelined_upload(client, str(source), str(target),
+                                                                              tuning), source, target, size))
+        finally:
+            client.close()
+
+        channels = max(int(c) for c in args.channels.split(","))
+        call = server.mcp.call_tool("upload_large_file", dict(
+            local_file=str(source), remote_dir=str(remote_dir), channels=channels, verify=True, **conn))
+        tool_result = {}
+
+        def via_tool():
+            content = asyncio.run(call)
+            content = content[0] if isinstance(content, tuple) else content
+            tool_result["text"] = content[0].text
+
+        results.append(_timed(f"upload_large_file c={channels} + sha256", via_tool, source, target, size))
+        results[-1]["message"] = tool_result["text"]
+        print(f"  {tool_result['text']}")
+
+    print(json.dumps({"size_mb": args.size_mb, "delay_ms": args.delay_ms, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
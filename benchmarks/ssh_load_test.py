@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Load test for ssh-mcp-demo: fire concurrent mixed tool calls at a local SSH server
+
+Usage:
+    python benchmarks/ssh_load_test.py [--calls 100] [--per-host 4] [--workers 32]
+
+Calls go through mcp.call_tool, so they pass the shared runtime middleware
+(per-tool limits, timing) exactly as client requests do.
+
+Reports p50/p99 latency per tool and overall, plus the worst event-loop stall
+observed while the calls were running (should stay near zero now that the
+tools run on the worker pool), and the runtime's own per-tool statistics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from _common import load_server, summarize
+from local_sshd import LocalSSHServer
+
+
+def _make_tree(root: Path, files: int = 20) -> None:
+    (root / "remote" / "sub").mkdir(parents=True)
+    (root / "local").mkdir()
+    for i in range(files):
+        (root / "remote" / f"file{i}.yaml").write_text("x" * 4096)
+        (root / "remote" / "sub" / f"nested{i}.pem").write_text("y" * 1024)
+        (root / "local" / f"upload{i}.txt").write_text("z" * 8192)
+
+
+async def _loop_lag_monitor(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst delay of a periodic timer while the load runs"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_load(server, root: Path, port: int, calls: int) -> dict:
+    conn = dict(host="127.0.0.1", port=port, username="bench", password="bench")
+    remote = str(root / "remote")
+    local = root / "local"
+    kinds = {
+        "upload_file": lambda i: dict(local_file=str(local / f"upload{i % 20}.txt"), remote_dir=remote),
+        "execute_remote_script": lambda i: dict(script_path="echo", args=f"call-{i}"),
+        "list_remote_entries": lambda i: dict(remote_dir=remote, refresh=True),
+        "list_remote_directory": lambda i: dict(remote_dir=remote),
+        "download_file": lambda i: dict(remote_path=f"{remote}/sub", local_dir=str(root / "downloads" / str(i))),
+    }
+    names = list(kinds)
+    latencies = {name: [] for name in names}
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        name = names[i % len(names)]
+        start = time.perf_counter()
+        try:
+            result = await server.mcp.call_tool(name, {**kinds[name](i), **conn})
+        except Exception:
+            errors += 1
+            return
+        finally:
+            latencies[name].append(time.perf_counter() - start)
+        content = result[0] if isinstance(result, tuple) else result
+        text = content[0].text if content else ""
+        if text.startswith("Error") or text.startswith('{\n  "error"'):
+            errors += 1
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_loop_lag_monitor(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    wall = time.perf_counter() - start
+    stop.set()
+    worst_lag = await monitor
+
+    report = {name: summarize(values, wall) for name, values in latencies.items()}
+    report["overall"] = summarize([v for values in latencies.values() for v in values], wall)
+    report["overall"]["errors"] = errors
+    report["overall"]["max_event_loop_stall_ms"] = round(worst_lag * 1000, 2)
+    report["runtime"] = {name: {k: stats[k] for k in ("calls", "errors", "p50_ms", "p99_ms", "avg_queue_wait_ms")}
+                         for name, stats in server.runtime.snapshot()["tools"].items() if stats["calls"]}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--per-host", type=int, default=4, help="max_concurrency_per_host")
+    parser.add_argument("--workers", type=int, default=32, help="max_workers")
+    args = parser.parse_args()
+
+    server = load_server("ssh-mcp-demo", "ssh_mcp_server")
+    with tempfile.TemporaryDirectory() as tmp, LocalSSHServer() as sshd:
+        root = Path(tmp)
+        _make_tree(root)
+        config_file = root / "config.json"
+        config_file.write_text(json.dumps({
+            "max_workers": args.workers,
+            "max_concurrency_per_host": args.per_host,
+        }))
+        server.CONFIG_FILE = config_file
+
+        report = asyncio.run(run_load(server, root, sshd.port, args.calls))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("PYTHONUNBUFFERED", "1")
+    main()
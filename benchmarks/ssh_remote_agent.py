@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Remote agent vs SFTP benchmark for ssh-mcp-demo metadata operations
+
+Usage:
+    python benchmarks/ssh_remote_agent.py [--delay-ms 10] [--dirs 20] [--files 10] [--rounds 3]
+
+Builds a remote tree of --dirs directories (nested two levels) with --files
+files each, served by the local SSH server behind delay_proxy.DelayProxy
+(RTT = 2 * delay). Each operation runs with remote_agent disabled (SFTP /
+exec per call) and enabled (one framed request to the persistent agent):
+
+- download_file of the whole tree with an extension filter (the walk is one
+  listing request instead of a stat + listdir per directory)
+- list_remote_entries (refresh=True) and stat_remote_paths over every
+  directory
+- upload_file into an existing directory
+
+Downloaded trees are compared with the source. Prints the median per variant
+and the agent's session metrics as JSON.
+"""
+import argparse
+import asyncio
+import filecmp
+import json
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from _common import load_server
+from delay_proxy import DelayProxy
+from local_sshd import LocalSSHServer
+
+
+def _make_tree(root: Path, dirs: int, files: int) -> list:
+    directories = []
+    for d in range(dirs):
+        directory = root / f"group{d % 4}" / f"dir{d:03d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        directories.append(directory)
+        for f in range(files):
+            suffix = ".yaml" if f % 3 == 0 else ".log"
+            (directory / f"file{f:03d}{suffix}").write_text(f"{d}-{f}\n" * 20)
+    return directories
+
+
+def _same_tree(source: Path, copy: Path, suffix: str) -> bool:
+    wanted = sorted(p.relative_to(source) for p in source.rglob(f"*{suffix}"))
+    copied = sorted(p.relative_to(copy) for p in copy.rglob("*") if p.is_file())
+    return wanted == copied and all(filecmp.cmp(source / p, copy / p, shallow=False) for p in wanted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--delay-ms", type=float, default=10.0, help="one-way delay added by the proxy")
+    parser.add_argument("--dirs", type=int, default=20)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.getLogger("paramiko").setLevel(logging.WARNING)
+
+    server = load_server("ssh-mcp-demo", "ssh_server")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, LocalSSHServer() as sshd, \
+            DelayProxy(sshd.port, args.delay_ms / 1000) as proxy:
+        root = Path(tmp)
+        remote_root, upload_source = root / "remote", root / "artifact.txt"
+        directories = _make_tree(remote_root, args.dirs, args.files)
+        upload_source.write_text("payload\n")
+        config_file = root / "config.json"
+        server.CONFIG_FILE = config_file
+        conn = dict(host="127.0.0.1", port=proxy.port, username="bench", password="bench")
+        print(f"{args.dirs} dirs x {args.files} files over +{args.delay_ms:g} ms each way "
+              f"(RTT ~{2 * args.delay_ms:g} ms)")
+
+        def call(tool, **arguments):
+            content = asyncio.run(server.mcp.call_tool(tool, {**arguments, **conn}))
+            content = content[0] if isinstance(content, tuple) else content
+            return content[0].text
+
+        for mode in ("sftp", "agent"):
+            config_file.write_text(json.dumps({"remote_agent": mode == "agent",
+                                               "allowed_file_extensions": [".yaml"]}))
+            if mode == "agent":
+                start = time.perf_counter()
+                call("stat_remote_paths", paths=[str(remote_root)])
+                results["agent_start_s"] = round(time.perf_counter() - start, 3)
+
+            def download():
+                with tempfile.TemporaryDirectory() as local_dir:
+                    text = call("download_file", remote_path=str(remote_root), local_dir=local_dir)
+                    assert _same_tree(remote_root, Path(local_dir) / remote_root.name, ".yaml"), text
+
+            operations = {
+                "download_file (tree, .yaml filter)": download,
+                "list_remote_entries refresh": lambda: call("list_remote_entries", remote_dir=str(directories[0]),
+                                                            refresh=True),
+                f"stat_remote_paths x{len(directories)}": lambda: call(
+                    "stat_remote_paths", paths=[str(d) for d in directories]),
+                "upload_file": lambda: call("upload_file", local_file=str(upload_source),
+                                            remote_dir=str(directories[0])),
+            }
+            for name, operation in operations.items():
+                durations = []
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    operation()
+                    durations.append(time.perf_counter() - start)
+                median = statistics.median(durations)
+                results.setdefault(name, {})[mode] = round(median, 3)
+                print(f"  {mode:5s} {name:36s} {median * 1000:8.1f} ms")
+
+        metrics = json.loads(server.get_ssh_metrics())
+        results["remote_agents"] = metrics["remote_agents"]
+        server.remote_agents.close_all()
+
+    print(json.dumps({"delay_ms": args.delay_ms, "dirs": args.dirs, "files": args.files, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
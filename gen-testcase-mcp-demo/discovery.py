@@ -0,0 +1,283 @@
+"""
+生成测试用例时的目标文件发现
+
+- 遵循 .gitignore 规则（包括目标目录上层、直到仓库根目录的 .gitignore）
+- 支持 config.json 中的 include / exclude glob 和 languages 语言过滤
+- 被忽略的目录在目录层面剪枝，不会进入遍历
+- 可选（skip_binary，默认关闭，与之前的版本一样处理所有文件）跳过二进制文件：已知的二进制扩展名，
+  以及文件头包含 NUL 字节的文件
+
+glob 语法与 .gitignore 相同：* 不跨目录，** 匹配任意层目录。
+"""
+
+import os
+import re
+from pathlib import Path
+
+from testcase_index import DEFAULT_IGNORE_DIRS
+
+LANGUAGE_EXTENSIONS = {
+    "python": {".py", ".pyi"},
+    "javascript": {".js", ".jsx", ".mjs", ".cjs"},
+    "typescript": {".ts", ".tsx", ".mts", ".cts"},
+    "go": {".go"},
+    "java": {".java"},
+    "kotlin": {".kt", ".kts"},
+    "c": {".c", ".h"},
+    "cpp": {".cc", ".cpp", ".cxx", ".hh", ".hpp", ".hxx", ".h"},
+    "csharp": {".cs"},
+    "rust": {".rs"},
+    "ruby": {".rb"},
+    "php": {".php"},
+    "shell": {".sh", ".bash"},
+}
+
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".pdf", ".zip", ".gz", ".tgz",
+    ".bz2", ".xz", ".7z", ".rar", ".jar", ".war", ".class", ".so", ".dll", ".dylib", ".exe",
+    ".o", ".a", ".lib", ".obj", ".pyc", ".pyo", ".whl", ".bin", ".dat", ".db", ".sqlite",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".mov", ".avi", ".wav",
+}
+
+
+def glob_to_regex(pattern):
+    """把 gitignore 风格的 glob 转换为正则（匹配完整的相对路径）"""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern[i:i + 3] == "**/":
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern[i:i + 2] == "**":
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_glob(pattern):
+    """编译 include/exclude glob：不含 / 的模式匹配任意层级的文件名（与 .gitignore 一致）"""
+    pattern = pattern.strip().rstrip("/")
+    regex = glob_to_regex(pattern.lstrip("/"))
+    if "/" not in pattern:
+        regex = f"(?:.*/)?{regex}"
+    return re.compile(f"^{regex}$")
+
+
+def parse_gitignore(path, base):
+    """解析 .gitignore，返回规则列表 [(base, regex, negate, dir_only)]
+
+    base 是该 .gitignore 所在目录相对扫描根目录的路径（根目录为 ""）
+    """
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        line = line.rstrip() if not line.endswith("\\ ") else line
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        line = line.lstrip("/")
+        regex = glob_to_regex(line)
+        if not anchored:
+            regex = f"(?:.*/)?{regex}"
+        rules.append((base, re.compile(f"^{regex}$"), negate, dir_only))
+    return rules
+
+
+def _find_repo_root(path):
+    """向上查找包含 .git 的目录；找不到时返回 None"""
+    for candidate in [path, *path.parents]:
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+class SourceFilter:
+    """根据 .gitignore、include/exclude glob、语言和二进制检测决定哪些文件需要生成测试用例
+
+    Args:
+        root: 扫描根目录（目标目录）
+        config: config.json 内容，使用其中的 include、exclude、languages、ignore_dirs、
+                use_gitignore、skip_binary
+        is_generated: 判断文件是否为已生成的测试用例/内部文件（这些文件总是跳过）
+    """
+
+    def __init__(self, root, config=None, is_generated=None):
+        config = config or {}
+        self.root = Path(root)
+        self.is_generated = is_generated or (lambda name: False)
+        self.ignore_dirs = DEFAULT_IGNORE_DIRS | set(config.get("ignore_dirs", []))
+        self.use_gitignore = config.get("use_gitignore", True)
+        self.skip_binary = config.get("skip_binary", False)
+        self.include = [compile_glob(p) for p in config.get("include", [])]
+        self.exclude = [compile_glob(p) for p in config.get("exclude", [])]
+
+        self.extensions = None
+        languages = config.get("languages")
+        if languages:
+            self.extensions = set()
+            for language in languages:
+                self.extensions |= LANGUAGE_EXTENSIONS.get(language.lower(), {language.lower()})
+
+        self._rules_cache = {}
+        self._root_rules = self._ancestor_rules() if self.use_gitignore else []
+
+    def _ancestor_rules(self):
+        """仓库根目录到扫描根目录（不含）之间各层的 .gitignore 规则，路径换算到扫描根目录"""
+        repo_root = _find_repo_root(self.root)
+        if repo_root is None or repo_root == self.root:
+            return []
+
+        prefix = self.root.relative_to(repo_root).as_posix()
+        ancestors = [repo_root]
+        for part in self.root.relative_to(repo_root).parts[:-1]:
+            ancestors.append(ancestors[-1] / part)
+
+        rules = []
+        for directory in ancestors:
+            ancestor = "" if directory == repo_root else directory.relative_to(repo_root).as_posix()
+            for _, regex, negate, dir_only in parse_gitignore(directory / ".gitignore", ancestor):
+                rules.append(((ancestor, prefix), regex, negate, dir_only))
+        return rules
+
+    def _dir_rules(self, rel_dir, inherited):
+        """rel_dir 目录生效的规则：继承的规则 + 本目录 .gitignore"""
+        if not self.use_gitignore:
+            return inherited
+        own = parse_gitignore(self.root / rel_dir / ".gitignore", rel_dir)
+        return inherited + own if own else inherited
+
+    @staticmethod
+    def _relative_to_base(rel, base):
+        if isinstance(base, tuple):
+            # 上层 .gitignore：把相对扫描根目录的路径换算成相对该 .gitignore 目录的路径
+            ancestor, prefix = base
+            full = f"{prefix}/{rel}"
+            if not ancestor:
+                return full
+            return full[len(ancestor) + 1:] if full.startswith(ancestor + "/") else None
+        if not base:
+            return rel
+        return rel[len(base) + 1:] if rel.startswith(base + "/") else None
+
+    def _gitignored(self, rel, is_dir, rules):
+        ignored = False
+        for base, regex, negate, dir_only in rules:
+            if dir_only and not is_dir:
+                continue
+            sub = self._relative_to_base(rel, base)
+            if sub is not None and regex.match(sub):
+                ignored = not negate
+        return ignored
+
+    def _dir_excluded(self, rel, name, rules):
+        if name in self.ignore_dirs:
+            return True
+        if any(p.match(rel) for p in self.exclude):
+            return True
+        return self._gitignored(rel, True, rules)
+
+    def _file_accepted(self, rel, name, path, rules):
+        if self.is_generated(name):
+            return False
+        ext = os.path.splitext(name)[1].lower()
+        if self.extensions is not None and ext not in self.extensions:
+            return False
+        if self.include and not any(p.match(rel) for p in self.include):
+            return False
+        if any(p.match(rel) for p in self.exclude):
+            return False
+        if rules and self._gitignored(rel, False, rules):
+            return False
+        if self.skip_binary and (ext in BINARY_EXTENSIONS or _looks_binary(path)):
+            return False
+        return True
+
+    def walk(self):
+        """遍历扫描根目录，返回需要处理的源文件列表（忽略的目录整体剪枝）"""
+        sources = []
+        stack = [("", self._dir_rules("", self._root_rules))]
+        while stack:
+            rel_dir, rules = stack.pop()
+            directory = self.root / rel_dir if rel_dir else self.root
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self._dir_excluded(rel, entry.name, rules):
+                            stack.append((rel, self._dir_rules(rel, rules)))
+                    elif entry.is_file() and self._file_accepted(rel, entry.name, entry.path, rules):
+                        sources.append(Path(entry.path))
+                except OSError:
+                    continue
+        return sources
+
+    def accepts(self, path):
+        """判断单个文件是否需要处理（用于监听模式等只检查部分路径的场景）"""
+        path = Path(path)
+        try:
+            rel = path.relative_to(self.root).as_posix()
+        except ValueError:
+            return False
+
+        parts = rel.split("/")
+        rules = self._dir_rules("", self._root_rules)
+        for depth in range(1, len(parts)):
+            rel_dir = "/".join(parts[:depth])
+            if self._dir_excluded(rel_dir, parts[depth - 1], rules):
+                return False
+            key = rel_dir
+            if key not in self._rules_cache:
+                self._rules_cache[key] = self._dir_rules(rel_dir, rules)
+            rules = self._rules_cache[key]
+        return path.is_file() and self._file_accepted(rel, path.name, str(path), rules)
+
+
+def _looks_binary(path, sniff_bytes=1024):
+    """文件头包含 NUL 字节时视为二进制文件"""
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(sniff_bytes)
+    except OSError:
+        return True
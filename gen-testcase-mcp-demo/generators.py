@@ -0,0 +1,201 @@
+"""
+测试用例生成器插件
+
+生成器在进程内按批次处理文件，不再为每个文件启动 bash + cp 进程。
+
+插件接口（继承 Generator，或鸭子类型提供相同的属性和方法）：
+    name:       生成器名称
+    version:    版本字符串，写入增量清单；变化时所有文件重新生成
+    batch_size: 每批交给 generate() 的最大文件数
+    generate(sources) -> [{"source", "output", "ok", "error", "duration"}, ...]
+                结果可另带 "bytes_written" / "logical_bytes" / "method"（见 materialize.py），
+                用于统计每次运行实际写入的字节数；没有时按输出文件大小计
+
+插件发现方式（config.json 中的 "generator"）：
+    "copy"              内置：进程内复制（与 gen_testcase.sh 行为一致）
+    "script"            旧版适配器：逐个文件调用生成脚本
+    "package.module:factory"
+                        导入 factory 并以 config 为参数调用，返回生成器实例
+    其他名称            在 entry points 组 "testcase_generator.generators" 中查找
+"""
+
+import abc
+import hashlib
+import importlib
+import os
+import subprocess
+import time
+from importlib.metadata import entry_points
+from pathlib import Path
+
+from materialize import Materializer
+
+ENTRY_POINT_GROUP = "testcase_generator.generators"
+
+# 脚本失败时，错误信息只保留输出的末尾部分，避免结构化结果随脚本输出无限增长
+MAX_ERROR_CHARS = 2000
+
+
+def test_output_path(source):
+    """与 gen_testcase.sh 的 process_file 保持一致的输出路径：name-test.ext"""
+    source = Path(source)
+    filename = source.name
+    if "." in filename:
+        name, ext = filename.rsplit(".", 1)
+        return source.with_name(f"{name}-test.{ext}")
+    return source.with_name(f"{filename}-test")
+
+
+def run_script(script_cmd, target, timeout=None):
+    """用测试用例生成脚本处理单个文件或目录，返回 subprocess.CompletedProcess
+
+    超过 timeout 秒时抛出 subprocess.TimeoutExpired
+    """
+    # 始终使用 bash 执行（即使在 Windows 上，如果脚本是 .sh）
+    script_ext = Path(script_cmd).suffix.lower()
+
+    if script_ext == '.sh':
+        # 使用 bash 执行 .sh 脚本（Linux 原生，Windows 通过 WSL 或 Git Bash）
+        return subprocess.run(
+            ["bash", script_cmd, str(target)],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            timeout=timeout
+        )
+    elif script_ext == '.cmd' or script_ext == '.bat':
+        # 使用 cmd 执行 .cmd/.bat 脚本（Windows）
+        return subprocess.run(
+            [script_cmd, str(target)],
+            capture_output=True,
+            text=True,
+            shell=True,
+            encoding='utf-8',
+            errors='ignore',
+            timeout=timeout
+        )
+    else:
+        # 尝试直接执行（假设有执行权限）
+        return subprocess.run(
+            [script_cmd, str(target)],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            timeout=timeout
+        )
+
+
+def file_result(source, ok, error=None, duration=0.0, output=None):
+    """生成器返回的单个文件结果"""
+    return {
+        "source": Path(source),
+        "output": Path(output) if output is not None else test_output_path(source),
+        "ok": ok,
+        "error": error,
+        "duration": duration,
+    }
+
+
+class Generator(abc.ABC):
+    """生成器基类（插件也可以不继承，只要提供相同的属性和方法）
+
+    子类必须实现 generate()，否则实例化时即报 TypeError。
+    """
+
+    name = "base"
+    version = "0"
+    batch_size = 64
+
+    @abc.abstractmethod
+    def generate(self, sources):
+        """生成一批测试用例，返回每个源文件的结果字典列表"""
+
+
+class CopyGenerator(Generator):
+    """内置生成器：在进程内生成与源文件内容相同的 name-test.ext（与 Demo 脚本行为一致）
+
+    输出通过 Materializer 落盘：优先 reflink / 内容寻址存储的硬链接，最后才逐字节复制。
+    """
+
+    name = "copy"
+    version = "copy-1"
+    batch_size = 256
+
+    def __init__(self, materializer=None):
+        self.materializer = materializer or Materializer()
+
+    def generate(self, sources):
+        results = []
+        for source in sources:
+            start = time.perf_counter()
+            output = test_output_path(source)
+            try:
+                info = self.materializer.materialize(source, output)
+                result = file_result(source, True, duration=time.perf_counter() - start, output=output)
+                result.update(info)
+                results.append(result)
+            except OSError as e:
+                results.append(file_result(source, False, str(e), time.perf_counter() - start, output))
+        return results
+
+
+class ScriptGenerator(Generator):
+    """旧版适配器：逐个文件调用 gen_testcase.sh / gen_testcase.cmd 或自定义脚本"""
+
+    name = "script"
+    batch_size = 1
+
+    def __init__(self, script_cmd, timeout=None):
+        self.script_cmd = str(script_cmd)
+        self.timeout = timeout
+        self._version = None
+        self._version_mtime = None
+
+    @property
+    def version(self):
+        """脚本路径 + 内容哈希；只在脚本 mtime 变化时重新计算"""
+        mtime = os.stat(self.script_cmd).st_mtime_ns
+        if self._version is None or mtime != self._version_mtime:
+            with open(self.script_cmd, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            self._version = f"{Path(self.script_cmd).resolve()}:{digest}"
+            self._version_mtime = mtime
+        return self._version
+
+    def generate(self, sources):
+        return [self._generate_one(source) for source in sources]
+
+    def _generate_one(self, source):
+        start = time.perf_counter()
+        try:
+            result = run_script(self.script_cmd, source, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            return file_result(source, False, f"超时（超过 {self.timeout} 秒）", time.perf_counter() - start)
+        except Exception as e:
+            return file_result(source, False, str(e), time.perf_counter() - start)
+
+        duration = time.perf_counter() - start
+        if result.returncode != 0:
+            message = (result.stderr or result.stdout or "Unknown error").strip()
+            return file_result(source, False, message[-MAX_ERROR_CHARS:], duration)
+        if not test_output_path(source).exists():
+            return file_result(source, False, "脚本未生成测试用例文件", duration)
+        return file_result(source, True, duration=duration)
+
+
+def load_plugin(spec, config):
+    """按 "module:factory" 或 entry point 名称加载插件生成器"""
+    if ":" in spec:
+        module_name, attr = spec.split(":", 1)
+        factory = getattr(importlib.import_module(module_name), attr)
+    else:
+        matches = [ep for ep in entry_points(group=ENTRY_POINT_GROUP) if ep.name == spec]
+        if not matches:
+            raise ValueError(f"未找到生成器插件: {spec}（entry point 组 {ENTRY_POINT_GROUP}）")
+        factory = matches[0].load()
+    generator = factory(config)
+    if not callable(getattr(generator, "generate", None)):
+        raise TypeError(f"生成器插件 {spec} 返回的对象没有 generate() 方法: {generator!r}")
+    return generator
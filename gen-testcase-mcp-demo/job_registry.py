@@ -0,0 +1,46 @@
+"""
+正在进行中的生成任务注册表
+
+多个调用（generate_testcase、generate_testcases、监听模式）并发处理同一个源文件时，
+只有第一个调用真正执行生成，其他调用等待同一个 Future 并复用其结果。
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+class JobRegistry:
+    """源文件路径 -> 正在进行的生成任务（Future，结果为生成器返回的单个文件结果）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def claim(self, sources):
+        """登记一批要生成的文件
+
+        Returns:
+            (owned, joined)：owned 为本调用负责生成的文件列表；
+            joined 为 {文件: Future}，这些文件已由其他调用在生成，等待其结果即可
+        """
+        owned, joined = [], {}
+        with self._lock:
+            for source in sources:
+                job = self._jobs.get(source)
+                if job is not None:
+                    joined[source] = job
+                else:
+                    self._jobs[source] = Future()
+                    owned.append(source)
+        return owned, joined
+
+    def finish(self, source, result):
+        """发布文件的生成结果并唤醒等待的调用；result 为 None 表示未执行（例如被取消）"""
+        with self._lock:
+            job = self._jobs.pop(source, None)
+        if job is not None:
+            job.set_result(result)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._jobs)
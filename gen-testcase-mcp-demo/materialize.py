@@ -0,0 +1,221 @@
+"""
+测试用例输出的落盘方式
+
+内置复制生成器的输出与源文件内容完全相同，逐字节复制会让磁盘占用和写入量翻倍。
+按配置的顺序尝试以下方式，前一种不可用时换下一种：
+
+    "reflink"   写时复制克隆（Linux FICLONE：btrfs、XFS、bcachefs 等），不写入数据块
+    "cas"       内容寻址存储：内容按 sha256 只保存一份在生成根目录的 .testcase-store 中（只读），
+                输出是指向它的硬链接；内容相同的输出（包括之后的运行）共享同一份数据。
+                需要显式配置：输出变为只读，内容相同的输出共享同一个 inode（权限随存储对象）
+    "hardlink"  直接硬链接到源文件（需要显式配置：原地修改输出会同时修改源文件）
+    "copy"      逐字节复制（最终兜底）
+
+config.json 的 "materialize" 指定尝试顺序，默认 ["reflink", "copy"]：输出与逐字节复制一样是独立、
+可写的文件（源文件权限不变），只是在支持的文件系统上不占用额外空间。设为 "copy" 即原来的行为；
+重复内容多、输出只读也没关系时可配置 ["reflink", "cas", "copy"]。
+
+输出总是先写到临时文件再原子替换，已有的输出（可能是存储对象的硬链接）不会被原地覆盖。
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import stat
+import threading
+from pathlib import Path
+
+STORE_DIR_NAME = ".testcase-store"
+STRATEGIES = ("reflink", "cas", "hardlink", "copy")
+DEFAULT_STRATEGIES = ("reflink", "copy")
+
+# linux/fs.h: FICLONE = _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# 这些错误说明文件系统不支持该方式，之后同一设备上不再尝试
+_UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EXDEV}
+
+_COPY_BLOCK = 1024 * 1024
+
+
+def parse_strategies(value):
+    """config.json 中的 materialize（字符串或列表）→ 策略元组；未知名称抛出 ValueError"""
+    if value is None:
+        return DEFAULT_STRATEGIES
+    names = [value] if isinstance(value, str) else list(value)
+    unknown = [name for name in names if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"未知的 materialize 方式: {', '.join(unknown)}（可选 {', '.join(STRATEGIES)}）")
+    # copy 总是最后的兜底
+    return tuple(names) if "copy" in names else tuple(names) + ("copy",)
+
+
+def _temp_path(path):
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _reflink(source, target):
+    import fcntl  # 仅 Unix；Windows 上 ImportError 按不支持处理
+
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copymode(source, target)
+
+
+def _copy_hashed(source, target):
+    """复制文件并同时计算 sha256（只读一遍源文件）"""
+    digest = hashlib.sha256()
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        for block in iter(lambda: src.read(_COPY_BLOCK), b''):
+            digest.update(block)
+            dst.write(block)
+    return digest.hexdigest()
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_COPY_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Materializer:
+    """把源文件内容落盘为输出文件，返回每个文件实际写入的字节数
+
+    CAS 存储位于 add_root() 登记的生成根目录下（包含输出的最深的根目录）；
+    没有登记根目录时跳过 cas。
+    """
+
+    def __init__(self, strategies=None):
+        self.strategies = parse_strategies(strategies)
+        self._lock = threading.Lock()
+        self._roots = set()
+        self._unsupported = set()  # (策略, st_dev)
+
+    def add_root(self, root):
+        with self._lock:
+            self._roots.add(Path(root))
+
+    def store_dir(self, output):
+        with self._lock:
+            roots = [root for root in self._roots if root in output.parents]
+        if not roots:
+            return None
+        return max(roots, key=lambda root: len(root.parts)) / STORE_DIR_NAME
+
+    def materialize(self, source, output, digest=None):
+        """生成 output，返回 {"method", "bytes_written", "logical_bytes", "deduplicated", "sha256"}
+
+        sha256 只在 cas 方式中计算（否则为 None），可供调用方复用。
+        """
+        source, output = Path(source), Path(output)
+        size = os.stat(source).st_size
+        device = os.stat(output.parent).st_dev
+        temp = _temp_path(output)
+        _remove(temp)
+        try:
+            for strategy in self.strategies:
+                if strategy != "copy" and (strategy, device) in self._unsupported:
+                    continue
+                try:
+                    info = self._apply(strategy, source, temp, output, size, digest)
+                except OSError as e:
+                    if strategy == "copy":
+                        raise
+                    _remove(temp)
+                    if e.errno in _UNSUPPORTED_ERRNOS:
+                        with self._lock:
+                            self._unsupported.add((strategy, device))
+                    continue
+                except ImportError:
+                    with self._lock:
+                        self._unsupported.add((strategy, device))
+                    continue
+                if info is None:
+                    continue
+                os.replace(temp, output)
+                return {"method": strategy, "logical_bytes": size, **info}
+        finally:
+            _remove(temp)
+        raise OSError(f"无法生成 {output}")
+
+    def _apply(self, strategy, source, temp, output, size, digest):
+        """用一种方式生成 temp；该方式不适用时返回 None"""
+        if strategy == "reflink":
+            _reflink(source, temp)
+            return {"bytes_written": 0, "deduplicated": False, "sha256": None}
+        if strategy == "hardlink":
+            os.link(source, temp)
+            return {"bytes_written": 0, "deduplicated": False, "sha256": None}
+        if strategy == "copy":
+            shutil.copy(source, temp)
+            return {"bytes_written": size, "deduplicated": False, "sha256": None}
+
+        store = self.store_dir(output)
+        if store is None:
+            return None
+        digest = digest or _digest(source)
+        obj = store / digest[:2] / digest[2:]
+        if os.path.exists(obj):
+            # 复用前校验内容：对象被改过权限后原地修改时，不把改动传播给新的输出
+            try:
+                if _digest(obj) == digest:
+                    os.link(obj, temp)
+                    return {"bytes_written": 0, "deduplicated": True, "sha256": digest}
+                _remove(obj)  # 已链接的输出保留被改动的内容，存储中换成正确的新对象
+            except FileNotFoundError:
+                pass  # 对象刚被清理，重新写入
+
+        # 新内容：复制进存储（边复制边哈希，以实际写入的内容命名），去掉写权限（保留可执行位）后链接到输出
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        staging = _temp_path(obj)
+        _remove(staging)
+        try:
+            digest = _copy_hashed(source, staging)
+            os.chmod(staging, stat.S_IMODE(os.stat(source).st_mode) & ~0o222)
+            obj = store / digest[:2] / digest[2:]
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(staging, obj)
+                deduplicated = False
+            except FileExistsError:
+                # 并发的调用先存入了相同内容
+                deduplicated = True
+            # 先链接输出再删除 staging，避免对象的链接数短暂变为 1 被 prune 清理
+            os.link(obj, temp)
+        finally:
+            _remove(staging)
+        return {"bytes_written": size, "deduplicated": deduplicated, "sha256": digest}
+
+    def prune(self, root):
+        """删除 root 的 CAS 存储中不再被任何输出引用（链接数为 1）的对象，返回 (对象数, 字节数)"""
+        store = Path(root) / STORE_DIR_NAME
+        count = freed = 0
+        if not store.is_dir():
+            return count, freed
+        for dirpath, _, filenames in os.walk(store, topdown=False):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.lstat(path)
+                    if st.st_nlink <= 1 and not name.endswith(".tmp"):
+                        os.unlink(path)
+                        count += 1
+                        freed += st.st_size
+                except OSError:
+                    continue
+            if dirpath != str(store):
+                try:
+                    os.rmdir(dirpath)  # 只删除已清空的前缀目录
+                except OSError:
+                    pass
+        return count, freed
@@ -6,11 +6,24 @@ Auto-generate test cases for code files
 
 import os
 import sys
-import subprocess
 import platform
 import json
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from mcp.server.fastmcp import FastMCP
+from typing import Optional
+from mcp.server.fastmcp import Context, FastMCP
+
+from discovery import SourceFilter
+from generators import CopyGenerator, ScriptGenerator, load_plugin
+from job_registry import JobRegistry
+from materialize import Materializer
+from testcase_index import DEFAULT_IGNORE_DIRS, DEFAULT_POLL_INTERVAL, IndexRegistry
+from watch_mode import DEFAULT_DEBOUNCE, DEFAULT_MAX_DELAY, WatchSession
 
 # Windows console encoding fix
 if platform.system() == "Windows":
@@ -18,22 +31,102 @@ if platform.system() == "Windows":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+# 共享的 MCP 运行时（仓库根目录的 mcp_runtime.py）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from mcp_runtime import MCPRuntime
+
 # 创建 FastMCP 实例
 mcp = FastMCP("testcase-generator")
+runtime = MCPRuntime(mcp)
+
+# 生成类工具的并发上限（每个调用内部还有自己的生成线程池）
+GENERATE_CONCURRENCY = 4
+
+
+CONFIG_FILE = Path(__file__).parent / "config.json"
+
+# config.json 的解析结果，按 mtime 缓存：{"mtime_ns": ..., "config": {...}}
+_config_cache = {"mtime_ns": None, "config": {}}
 
 
 def load_config():
-    """加载配置文件"""
-    config_path = Path(__file__).parent / "config.json"
+    """加载配置文件（文件未修改时直接返回缓存的结果）
 
-    if config_path.exists():
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Warning: Failed to load config.json: {e}", file=sys.stderr)
+    文件不存在或解析失败时同样更新缓存（配置为空），依赖 mtime 的缓存（如生成器）随之失效，
+    解析失败的文件在修改前也不会重复解析和警告。
+    """
+    try:
+        mtime_ns = CONFIG_FILE.stat().st_mtime_ns
+    except OSError:
+        _config_cache.update(mtime_ns=None, config={})
+        return {}
+
+    if _config_cache["mtime_ns"] == mtime_ns:
+        return _config_cache["config"]
+
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception as e:
+        print(f"Warning: Failed to load config.json: {e}", file=sys.stderr)
+        config = {}
+
+    _config_cache.update(mtime_ns=mtime_ns, config=config)
+    return config
+
+
+def default_script_paths():
+    """随本服务提供的默认脚本（等价于内置的 CopyGenerator）"""
+    here = Path(__file__).parent
+    return {(here / "gen_testcase.sh").resolve(), (here / "gen_testcase.cmd").resolve()}
+
+
+# 已解析的生成器，按 (config.json mtime, TESTCASE_SCRIPT_PATH) 缓存
+_generator_cache = {"key": None, "generator": None}
 
-    return {}
+
+def resolve_generator():
+    """解析要使用的生成器（结果缓存，config.json 修改或环境变量变化后重新解析）
+
+    优先级：
+    1. config.json 中的 generator（"copy"、"script"、"module:factory" 或 entry point 名称）
+    2. 环境变量 / config.json 中配置了自定义脚本时，使用旧版脚本适配器
+    3. 内置的进程内 CopyGenerator（与默认 gen_testcase.sh/.cmd 行为一致）
+    """
+    config = load_config()
+    key = (_config_cache["mtime_ns"], os.environ.get('TESTCASE_SCRIPT_PATH'))
+    if _generator_cache["key"] == key:
+        return _generator_cache["generator"]
+
+    spec = config.get('generator')
+    if spec == "copy":
+        generator = CopyGenerator(Materializer(config.get('materialize')))
+    elif spec == "script":
+        generator = ScriptGenerator(get_script_command(), timeout=config.get('per_file_timeout'))
+    elif spec:
+        generator = load_plugin(spec, config)
+    else:
+        script_cmd = get_script_command()
+        if Path(script_cmd).resolve() in default_script_paths():
+            generator = CopyGenerator(Materializer(config.get('materialize')))
+        else:
+            generator = ScriptGenerator(script_cmd, timeout=config.get('per_file_timeout'))
+
+    _generator_cache.update(key=key, generator=generator)
+    return generator
+
+
+def check_generator(generator):
+    """检查生成器是否可用，不可用时返回错误信息"""
+    if isinstance(generator, ScriptGenerator) and not Path(generator.script_cmd).exists():
+        return f"错误：测试用例生成脚本不存在: {generator.script_cmd}"
+    return None
+
+
+def describe_generator(generator):
+    if isinstance(generator, ScriptGenerator):
+        return f"{generator.name} ({generator.script_cmd})"
+    return generator.name
 
 
 def get_script_command():
@@ -71,80 +164,579 @@ def get_script_command():
     return str(script_path)
 
 
-@mcp.tool()
-def generate_testcase(path: str) -> str:
+# 增量生成清单文件名（保存在目标目录中，文件目标则保存在其所在目录）
+MANIFEST_NAME = ".testcase-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def is_test_output(path):
+    """判断文件名是否为生成的测试用例（*-test.* 或 *-test）"""
+    name = os.path.basename(path)
+    return "-test." in name or name.endswith("-test")
+
+
+def _is_internal_file(name):
+    """已生成的测试用例以及本服务自己的清单文件，不作为源文件"""
+    return is_test_output(name) or name in (MANIFEST_NAME, MANIFEST_NAME + ".tmp")
+
+
+def source_filter(root, config=None):
+    """按 config.json 中的忽略规则（.gitignore、include/exclude、languages）创建源文件过滤器"""
+    return SourceFilter(root, load_config() if config is None else config, _is_internal_file)
+
+
+def enumerate_sources(target, config=None):
+    """列出需要生成测试用例的源文件
+
+    单个文件目标直接返回该文件；目录目标遵循 .gitignore 和配置的过滤规则，
+    忽略的目录（.git、node_modules 等）整体跳过。
+    """
+    target = Path(target)
+    if target.is_file():
+        return [target]
+    return source_filter(target, config).walk()
+
+
+def file_digest(path):
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 保存清单时的进程内锁：并发调用可能同时写同一个清单
+_manifest_save_lock = threading.Lock()
+
+
+class TestcaseManifest:
+    """记录每个源文件的内容哈希，用于跳过未变化的文件
+
+    格式：{"version": 1, "generator": "...", "sources": {相对路径: {sha256, size, mtime_ns, output}}}
+
+    保存时只合并本次修改过的条目，同一目录上的并发调用不会覆盖彼此的记录。
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_NAME
+        self.generator = None
+        self._changed = set()
+        self._removed = set()
+        self._reset = False
+        self.sources = self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.generator = data.get("generator")
+                return data.get("sources", {})
+        except Exception as e:
+            print(f"Warning: Failed to load {self.path}: {e}", file=sys.stderr)
+        return {}
+
+    def reset(self, generator):
+        """生成器版本变化：丢弃所有记录"""
+        self.sources = {}
+        self.generator = generator
+        self._reset = True
+
+    def key(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def is_current(self, source, key):
+        """源文件未变化且输出仍存在时返回 True（size/mtime 未变则不重新计算哈希）"""
+        entry = self.sources.get(key)
+        if entry is None or not (self.root / entry["output"]).exists():
+            return False
+
+        st = source.stat()
+        if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return True
+
+        if entry["sha256"] != file_digest(source):
+            return False
+        # 内容未变（例如只是 touch 过），刷新 stat 信息
+        entry["size"], entry["mtime_ns"] = st.st_size, st.st_mtime_ns
+        self._changed.add(key)
+        return True
+
+    def record(self, source, key, output, sha256=None):
+        """记录生成结果；sha256 为生成时已算出的源文件哈希（没有时重新计算）"""
+        st = source.stat()
+        self.sources[key] = {
+            "sha256": sha256 or file_digest(source),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "output": self.key(output),
+        }
+        self._changed.add(key)
+        self._removed.discard(key)
+
+    def forget(self, key):
+        """删除一条记录，返回原记录（不存在时返回 None）"""
+        self._changed.discard(key)
+        self._removed.add(key)
+        return self.sources.pop(key, None)
+
+    def save(self):
+        with _manifest_save_lock:
+            sources = self.sources
+            if not self._reset:
+                # 合并期间其他调用写入的记录，只覆盖本次修改或删除的条目
+                generator = self.generator
+                on_disk = self._load()
+                disk_generator, self.generator = self.generator, generator
+                if on_disk and disk_generator == generator:
+                    sources = {k: v for k, v in on_disk.items() if k not in self._removed}
+                    sources.update({k: self.sources[k] for k in self._changed if k in self.sources})
+
+            data = {"version": MANIFEST_VERSION, "generator": self.generator, "sources": sources}
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self.sources = sources
+            self._changed, self._removed, self._reset = set(), set(), False
+
+
+def new_storage_stats():
+    return {"logical_bytes": 0, "bytes_written": 0, "deduplicated": 0, "methods": {},
+            "store_pruned": 0, "store_freed_bytes": 0}
+
+
+def add_storage_stats(storage, result):
+    """累加一个生成结果的字节数；生成器没有报告时（脚本、插件）按输出大小计为全部写入"""
+    if "bytes_written" in result:
+        logical, written, method = result["logical_bytes"], result["bytes_written"], result.get("method", "copy")
+    else:
+        try:
+            logical = written = os.path.getsize(result["output"])
+        except OSError:
+            logical = written = 0
+        method = "generator"
+    storage["logical_bytes"] += logical
+    storage["bytes_written"] += written
+    storage["deduplicated"] += bool(result.get("deduplicated"))
+    storage["methods"][method] = storage["methods"].get(method, 0) + 1
+
+
+def storage_report(storage):
+    """本次运行的存储统计：logical_bytes（输出的总大小）、bytes_written（实际写入的数据量）、
+    saved_bytes、methods（各落盘方式的文件数）、deduplicated（复用已有存储对象的文件数）、
+    store_pruned / store_freed_bytes（清理的无引用存储对象）"""
+    return {**storage, "saved_bytes": storage["logical_bytes"] - storage["bytes_written"]}
+
+
+def get_max_workers(config=None):
+    """并行生成的工作线程数：config.json 中的 max_workers，默认为 CPU 核数"""
+    config = load_config() if config is None else config
+    return max(int(config.get('max_workers') or os.cpu_count() or 1), 1)
+
+
+# 结构化结果中最多列出的文件条目数（跳过的文件只计数，不逐个列出）
+MAX_REPORTED_FILES = 1000
+
+# 进度通知的最小间隔（秒）
+PROGRESS_INTERVAL = 0.25
+
+# 所有调用共享的进行中任务：并发调用对同一文件只生成一次
+generation_jobs = JobRegistry()
+
+
+def normalize_targets(paths):
+    """把一组路径规范化为互不重叠的生成目标
+
+    重复的路径去重；已被某个目录目标包含的文件或子目录合并进该目录（按该目录的过滤规则处理）。
+
+    Returns:
+        (targets, missing)：targets 为排序后的绝对路径列表，missing 为不存在的路径
+    """
+    resolved, missing = set(), []
+    for path in paths:
+        target = Path(path).resolve()
+        if target.exists():
+            resolved.add(target)
+        else:
+            missing.append(path)
+    directories = {t for t in resolved if t.is_dir()}
+    targets = [t for t in sorted(resolved) if not any(d in t.parents for d in directories)]
+    return targets, missing
+
+
+def generate_incremental(target_path, generator, max_workers=None, paths=None, progress=None, cancel_event=None):
+    """增量生成单个目标（文件或目录），参数和返回值见 generate_targets
+
+    paths 不为 None 时（目标必须是目录）只检查其中列出的路径，而不遍历整个目录：
+    存在的源文件按需重新生成，已不存在的路径（文件或目录）删除其对应的测试用例。
+    """
+    return generate_targets([(target_path, paths)], generator, max_workers, progress, cancel_event)
+
+
+def generate_targets(targets, generator, max_workers=None, progress=None, cancel_event=None):
+    """增量生成：只处理新增或变化的文件，并删除源文件已不存在的测试用例
+
+    targets 为 [(目标路径, paths)] 列表（paths 含义见 generate_incremental），
+    所有目标中需要重新生成的文件合并成一个集合，按生成器的 batch_size 分批，
+    分发到同一个有界线程池中并行处理，单个文件变慢或失败不会阻塞其他文件。
+
+    其他调用正在生成的文件不会重复生成，而是等待其结果（见 JobRegistry）。
+
+    progress(done, total, message) 在每个文件处理完成后调用（在工作线程中）。
+    cancel_event 被设置后，尚未开始的批次不再执行，正在运行的批次完成后结果照常记录，
+    清单仍会保存，因此下次运行只需处理剩余的文件。
+
+    Returns:
+        结构化结果 dict：counts（各状态计数）、files（逐文件状态和耗时）、
+        failures（失败列表）、joined（复用其他调用结果的文件数）、cancelled、duration_s、
+        storage（本次生成的输出逻辑字节数与实际写入字节数，见 storage_report）
+    """
+    started = time.perf_counter()
+    config = load_config()
+    if max_workers is None:
+        max_workers = get_max_workers(config)
+
+    # 生成器（或脚本内容）版本变化时，所有记录失效
+    version = f"{generator.name}:{generator.version}"
+    manifests = {}
+
+    def manifest_for(root):
+        if root not in manifests:
+            manifest = manifests[root] = TestcaseManifest(root)
+            if manifest.generator != version:
+                manifest.reset(version)
+        return manifests[root]
+
+    counts = {"total": 0, "skipped": 0, "regenerated": 0, "removed": 0, "failed": 0, "cancelled": 0}
+    storage = new_storage_stats()
+    files = []
+    failures = []
+    pending = {}
+    scopes = []
+    generated = []
+    removed = []
+
+    for target_path, paths in targets:
+        manifest = manifest_for(target_path if target_path.is_dir() else target_path.parent)
+        if paths is None:
+            sources = enumerate_sources(target_path, config)
+            gone = None
+        else:
+            paths = [Path(p) for p in paths]
+            accepts = source_filter(target_path, config).accepts
+            sources = [p for p in paths if accepts(p)]
+            gone = [manifest.key(p) for p in paths if not p.exists()]
+
+        seen = set()
+        for source in sources:
+            key = manifest.key(source)
+            seen.add(key)
+            if source in pending:
+                continue
+            counts["total"] += 1
+            if manifest.is_current(source, key):
+                counts["skipped"] += 1
+            else:
+                pending[source] = (manifest, key)
+        scopes.append((target_path, manifest, seen, gone))
+
+    # 多个清单目录时用绝对路径标识文件，否则用相对目标目录的路径
+    single_root = len(manifests) == 1
+
+    # 内容寻址存储放在各清单目录下
+    materializer = getattr(generator, "materializer", None)
+    if materializer is not None:
+        for root in manifests:
+            materializer.add_root(root)
+
+    def label(source):
+        return pending[source][1] if single_root else str(source)
+
+    def report(name, status, duration=None, error=None):
+        counts[status] += 1
+        if status == "failed":
+            failures.append({"file": name, "error": error})
+        if len(files) < MAX_REPORTED_FILES:
+            entry = {"file": name, "status": status}
+            if duration is not None:
+                entry["duration_s"] = round(duration, 4)
+            if error:
+                entry["error"] = error
+            files.append(entry)
+
+    total = counts["total"]
+    done = counts["skipped"]
+    if progress is not None:
+        progress(done, total, f"跳过 {done} 个未变化文件，待生成 {len(pending)} 个")
+
+    def apply(source, result):
+        nonlocal done
+        manifest, key = pending[source]
+        if result is None:
+            report(label(source), "cancelled")
+            return
+        if result["ok"]:
+            manifest.record(source, key, result["output"], result.get("sha256"))
+            generated.append(result["output"])
+            add_storage_stats(storage, result)
+            report(label(source), "regenerated", result.get("duration"))
+        else:
+            manifest.forget(key)
+            report(label(source), "failed", result.get("duration"), result["error"])
+
+        done += 1
+        if progress is not None:
+            progress(done, total, f"{label(source)}: {'完成' if result['ok'] else '失败'}")
+
+    def run_batch(batch):
+        # 取消后，已排队但尚未开始的批次直接放弃
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        return generator.generate(batch)
+
+    joined_count = 0
+    if pending:
+        owned, joined = generation_jobs.claim(list(pending))
+        joined_count = len(joined)
+        unpublished = set(owned)
+        batch_size = max(int(getattr(generator, "batch_size", 1)), 1)
+        batches = [owned[i:i + batch_size] for i in range(0, len(owned), batch_size)]
+        own = set()
+        waiting = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(min(max_workers, len(batches)), 1)) as pool:
+                for batch in batches:
+                    future = pool.submit(run_batch, batch)
+                    own.add(future)
+                    waiting[future] = batch
+                waiting.update({job: [source] for source, job in joined.items()})
+
+                cancelling = False
+                while waiting:
+                    finished, _ = wait(waiting, timeout=0.2, return_when=FIRST_COMPLETED)
+                    if not cancelling and cancel_event is not None and cancel_event.is_set():
+                        cancelling = True
+                        for future in own:
+                            future.cancel()
+                        # 不再等待其他调用负责的文件
+                        for future in [f for f in waiting if f not in own and f not in finished]:
+                            for source in waiting.pop(future):
+                                apply(source, None)
+
+                    for future in finished:
+                        batch = waiting.pop(future)
+                        if future in own:
+                            if future.cancelled():
+                                results = None
+                            else:
+                                try:
+                                    results = future.result()
+                                except Exception as e:
+                                    results = [{"source": source, "ok": False, "error": f"生成器异常: {e}",
+                                                "duration": 0.0} for source in batch]
+
+                            by_source = {Path(r["source"]): r for r in results} if results is not None else {}
+                            for source in batch:
+                                result = by_source.get(source)
+                                generation_jobs.finish(source, result)
+                                unpublished.discard(source)
+                                apply(source, result)
+                            continue
+
+                        # 等待的是其他调用的任务；对方被取消（结果为 None）时由本调用重新生成
+                        source = batch[0]
+                        result = future.result()
+                        if result is not None or cancelling:
+                            apply(source, result)
+                            continue
+                        retry_owned, retry_joined = generation_jobs.claim([source])
+                        if retry_owned:
+                            unpublished.add(source)
+                            retry = pool.submit(run_batch, [source])
+                            own.add(retry)
+                            waiting[retry] = [source]
+                        else:
+                            waiting[retry_joined[source]] = [source]
+        finally:
+            # 异常退出时也要唤醒等待本调用的其他调用
+            for source in unpublished:
+                generation_jobs.finish(source, None)
+
+    cancelled = cancel_event is not None and cancel_event.is_set()
+
+    # 删除源文件已不存在的测试用例（只处理清单中记录过、且在本次检查范围内的条目）
+    # 被取消的运行没有完整检查范围内的文件，不做删除
+    for target_path, manifest, seen, gone in scopes:
+        if not target_path.is_dir() or cancelled:
+            continue
+        for key in list(manifest.sources):
+            if gone is None:
+                if key in seen:
+                    continue
+            elif not any(key == g or key.startswith(g + "/") for g in gone):
+                continue
+            orphan = manifest.root / manifest.forget(key)["output"]
+            if orphan.exists():
+                orphan.unlink()
+                removed.append(orphan)
+                report(key if single_root else str(manifest.root / key), "removed")
+
+    # 被替换或删除的输出可能不再引用存储中的对象
+    if materializer is not None and (counts["regenerated"] or counts["removed"]):
+        for root in manifests:
+            pruned, freed = materializer.prune(root)
+            storage["store_pruned"] += pruned
+            storage["store_freed_bytes"] += freed
+
+    for manifest in manifests.values():
+        manifest.save()
+    testcase_indexes.update(generated, removed)
+    return {
+        "counts": counts,
+        "files": files,
+        "files_truncated": sum(counts.values()) - counts["total"] - counts["skipped"] > len(files),
+        "failures": failures,
+        "joined": joined_count,
+        "cancelled": cancelled,
+        "storage": storage_report(storage),
+        "duration_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def progress_reporter(ctx):
+    """把工作线程中的 progress(done, total, message) 转发为 MCP 进度通知
+
+    在事件循环线程中创建；通知按 PROGRESS_INTERVAL 节流，最后一个文件总会发送。
+    没有 ctx（例如测试模式）时返回 None。
+    """
+    if ctx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    last_sent = [0.0]
+
+    def forward(done, total, message):
+        now = time.monotonic()
+        if done < total and now - last_sent[0] < PROGRESS_INTERVAL:
+            return
+        last_sent[0] = now
+        asyncio.run_coroutine_threadsafe(ctx.report_progress(done, total, message), loop)
+
+    return forward
+
+
+def _load_generator():
+    """返回 (生成器, 错误信息)"""
+    try:
+        generator = resolve_generator()
+    except Exception as e:
+        return None, f"错误：无法加载生成器: {str(e)}"
+    return generator, check_generator(generator)
+
+
+async def _run_generation(targets, generator, ctx):
+    """在线程中运行 generate_targets，转发进度；请求被取消时停止派发剩余批次"""
+    cancel_event = threading.Event()
+    worker = asyncio.get_running_loop().run_in_executor(runtime.get_executor(), functools.partial(
+        generate_targets, targets, generator,
+        progress=progress_reporter(ctx), cancel_event=cancel_event))
+    try:
+        return await asyncio.shield(worker)
+    except asyncio.CancelledError:
+        # 工作线程处理完正在运行的批次后保存清单
+        cancel_event.set()
+        raise
+
+
+@runtime.tool(max_concurrency=GENERATE_CONCURRENCY)
+async def generate_testcase(path: str, ctx: Optional[Context] = None) -> dict:
     """
-    为指定的文件或文件夹生成测试用例
+    为指定的文件或文件夹生成测试用例（增量：未变化的文件会被跳过）
+
+    处理过程中按文件发送进度通知；客户端取消请求后，剩余的文件不再处理。
 
     Args:
         path: 文件或文件夹的路径
 
     Returns:
-        生成结果的描述信息
+        结构化结果：counts（total/skipped/regenerated/removed/failed/cancelled）、
+        files（逐文件状态和耗时，最多 1000 条）、failures、storage（逻辑字节数与实际写入字节数）、
+        duration_s；出错时为 {"error": ...}
     """
     # 验证路径是否存在
     target_path = Path(path).resolve()
     if not target_path.exists():
-        return f"错误：路径不存在: {path}"
+        return {"error": f"错误：路径不存在: {path}"}
 
-    # 获取脚本命令
-    script_cmd = get_script_command()
-
-    if not Path(script_cmd).exists():
-        return f"错误：测试用例生成脚本不存在: {script_cmd}"
+    generator, error = _load_generator()
+    if error:
+        return {"error": error}
 
     try:
-        # 调用脚本生成测试用例
-        # 始终使用 bash 执行（即使在 Windows 上，如果脚本是 .sh）
-        script_ext = Path(script_cmd).suffix.lower()
-
-        if script_ext == '.sh':
-            # 使用 bash 执行 .sh 脚本（Linux 原生，Windows 通过 WSL 或 Git Bash）
-            result = subprocess.run(
-                ["bash", script_cmd, str(target_path)],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore'
-            )
-        elif script_ext == '.cmd' or script_ext == '.bat':
-            # 使用 cmd 执行 .cmd/.bat 脚本（Windows）
-            result = subprocess.run(
-                [script_cmd, str(target_path)],
-                capture_output=True,
-                text=True,
-                shell=True,
-                encoding='utf-8',
-                errors='ignore'
-            )
-        else:
-            # 尝试直接执行（假设有执行权限）
-            result = subprocess.run(
-                [script_cmd, str(target_path)],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='ignore'
-            )
-
-        if result.returncode != 0:
-            error_msg = result.stderr if result.stderr else "Unknown error"
-            return f"Generation failed:\n{error_msg}"
-
-        output = result.stdout if result.stdout else "No output"
-        return f"Test cases generated successfully!\n\n{output}"
+        report = await _run_generation([(target_path, None)], generator, ctx)
+    except Exception as e:
+        return {"error": f"Error executing script: {str(e)}"}
+
+    return {"target": str(target_path), "generator": describe_generator(generator), **report}
+
+
+@runtime.tool(max_concurrency=GENERATE_CONCURRENCY)
+async def generate_testcases(paths: list[str], ctx: Optional[Context] = None) -> dict:
+    """
+    为一组文件或文件夹一次性生成测试用例（重叠的路径只处理一次）
 
+    路径会被规范化并去重：已包含在某个目录中的文件或子目录并入该目录，
+    所有目标的文件合并成一个集合后统一调度。其他调用正在生成的文件会复用其结果。
+
+    Args:
+        paths: 文件或文件夹路径列表
+
+    Returns:
+        结构化结果：targets（规范化后的目标）、missing（不存在的路径），
+        其余字段与 generate_testcase 相同（多个目录时 files 中为绝对路径）
+    """
+    targets, missing = normalize_targets(paths)
+    if not targets:
+        return {"error": "错误：没有存在的路径", "missing": missing}
+
+    generator, error = _load_generator()
+    if error:
+        return {"error": error}
+
+    try:
+        report = await _run_generation([(target, None) for target in targets], generator, ctx)
     except Exception as e:
-        return f"Error executing script: {str(e)}"
+        return {"error": f"Error executing script: {str(e)}"}
+
+    return {"targets": [str(t) for t in targets], "missing": missing,
+            "generator": describe_generator(generator), **report}
 
 
-@mcp.tool()
-def list_generated_testcases(directory: str = ".") -> str:
+# 已生成测试用例的索引（按根目录，冷扫描后由文件系统监听保持最新）
+testcase_indexes = IndexRegistry(is_test_output)
+
+
+def get_ignore_dirs(config=None):
+    """扫描时跳过的目录：默认列表 + config.json 中的 ignore_dirs"""
+    config = load_config() if config is None else config
+    return DEFAULT_IGNORE_DIRS | set(config.get('ignore_dirs', []))
+
+
+@runtime.tool()
+def list_generated_testcases(directory: str = ".", prefix: str = "", offset: int = 0, limit: int = 200) -> str:
     """
-    列出指定目录下所有生成的测试用例文件
+    列出指定目录下所有生成的测试用例文件（从索引中查询，不再每次全量扫描）
 
     Args:
         directory: 要搜索的目录路径，默认为当前目录
+        prefix: 只返回相对路径以此开头的文件（如 "src/utils"）
+        offset: 分页起始位置
+        limit: 每页最多返回的文件数
 
     Returns:
         测试用例文件列表
@@ -157,16 +749,96 @@ def list_generated_testcases(directory: str = ".") -> str:
     if not dir_path.is_dir():
         return f"错误：{directory} 不是一个目录"
 
-    # 查找所有 *-test.* 文件
-    test_files = []
-    for file in dir_path.rglob("*-test.*"):
-        if file.is_file():
-            test_files.append(str(file.relative_to(dir_path)))
+    config = load_config()
+    index, subdir = testcase_indexes.get(
+        dir_path, get_ignore_dirs(config), config.get('poll_interval', DEFAULT_POLL_INTERVAL))
+    offset = max(offset, 0)
+    total, test_files = index.query(subdir, prefix, offset, max(limit, 1))
 
-    if not test_files:
+    if not total:
         return f"在 {directory} 目录下未找到测试用例文件"
 
-    return "找到以下测试用例文件:\n" + "\n".join(f"  - {f}" for f in sorted(test_files))
+    result = f"找到以下测试用例文件（共 {total} 个，显示第 {offset + 1}-{offset + len(test_files)} 个）:\n"
+    result += "\n".join(f"  - {f}" for f in test_files)
+    if offset + len(test_files) < total:
+        result += f"\n\n还有更多结果，使用 offset={offset + len(test_files)} 查看下一页"
+    return result
+
+
+# 监听模式会话（按根目录）
+watch_sessions = {}
+watch_sessions_lock = threading.Lock()
+
+
+def _watch_generate(root, paths):
+    """监听模式的批处理：只检查本批次变化的路径"""
+    report = generate_incremental(root, resolve_generator(), paths=paths)
+    return {**report["counts"], "failures": report["failures"][:20]}
+
+
+@runtime.tool()
+def start_watch(root: str, debounce: float = DEFAULT_DEBOUNCE, max_delay: float = DEFAULT_MAX_DELAY) -> str:
+    """
+    开始监听目录：源文件变化后自动为变化的文件重新生成测试用例
+
+    Args:
+        root: 要监听的目录
+        debounce: 静默多少秒后处理一批变化（合并 git checkout 等突发修改）
+        max_delay: 从第一个变化开始最多等待多少秒就处理
+
+    Returns:
+        监听状态描述
+    """
+    root_path = Path(root).resolve()
+    if not root_path.is_dir():
+        return f"错误：{root} 不是一个目录"
+
+    _, error = _load_generator()
+    if error:
+        return error
+
+    config = load_config()
+    with watch_sessions_lock:
+        if root_path in watch_sessions:
+            return f"已在监听: {root_path}"
+        session = WatchSession(
+            root_path, _watch_generate, lambda path: _is_internal_file(Path(path).name),
+            debounce=max(debounce, 0.0), max_delay=max(max_delay, debounce),
+            ignore_dirs=get_ignore_dirs(config),
+            poll_interval=config.get('poll_interval', DEFAULT_POLL_INTERVAL))
+        watch_sessions[root_path] = session
+
+    return f"开始监听: {root_path}（{session.watcher.mode} 模式，去抖 {debounce} 秒）"
+
+
+@runtime.tool()
+def stop_watch(root: str) -> str:
+    """
+    停止监听目录
+
+    Args:
+        root: 调用 start_watch 时使用的目录
+
+    Returns:
+        停止结果
+    """
+    root_path = Path(root).resolve()
+    with watch_sessions_lock:
+        session = watch_sessions.pop(root_path, None)
+    if session is None:
+        return f"未在监听: {root_path}"
+
+    session.stop()
+    status = session.status()
+    return f"已停止监听: {root_path}（共处理 {status['batches']} 个批次，{status['files']} 个变化路径）"
+
+
+@mcp.resource("watch://testcase-generator")
+def get_watch_status() -> str:
+    """所有监听会话的状态（JSON）"""
+    with watch_sessions_lock:
+        sessions = list(watch_sessions.values())
+    return json.dumps([session.status() for session in sessions], ensure_ascii=False, indent=2)
 
 
 @mcp.resource("info://testcase-generator")
@@ -175,12 +847,14 @@ def get_server_info() -> str:
     return f"""TestCase Generator MCP Server
 
 当前操作系统: {platform.system()}
-使用的脚本: {get_script_command()}
+使用的生成器: {describe_generator(resolve_generator())}
 工作目录: {os.getcwd()}
 
 可用工具:
 - generate_testcase: 为文件或文件夹生成测试用例
+- generate_testcases: 为一组文件或文件夹一次性生成测试用例（重叠路径去重）
 - list_generated_testcases: 列出已生成的测试用例文件
+- start_watch / stop_watch: 监听目录，源文件变化时自动重新生成
 """
 
 
@@ -192,13 +866,14 @@ def test_mode(target_path=None):
     """
     print("=== TestCase Generator MCP Server - Test Mode ===\n")
 
-    # 1. Check if script exists
-    script_cmd = get_script_command()
-    print(f"1. Checking script: {script_cmd}")
-    if Path(script_cmd).exists():
-        print("   [OK] Script exists\n")
+    # 1. Check generator (and script, for the legacy script adapter)
+    generator = resolve_generator()
+    print(f"1. Checking generator: {describe_generator(generator)}")
+    error = check_generator(generator)
+    if error is None:
+        print("   [OK] Generator available\n")
     else:
-        print(f"   [FAIL] Script not found\n")
+        print(f"   [FAIL] {error}\n")
         return
 
     # If user provided a path, use it directly
@@ -214,8 +889,8 @@ def test_mode(target_path=None):
         if target.is_file():
             print("   [INFO] Target is a file\n")
             print(f"3. Generating test case for file: {target}")
-            result = generate_testcase(str(target))
-            print(f"   Result: {result}\n")
+            result = asyncio.run(generate_testcase(str(target)))
+            print(f"   Result: {json.dumps(result, ensure_ascii=False, indent=2)}\n")
 
             # List test cases in the same directory
             print(f"4. Listing test cases in: {target.parent}")
@@ -224,8 +899,8 @@ def test_mode(target_path=None):
         else:
             print("   [INFO] Target is a directory\n")
             print(f"3. Generating test cases for directory: {target}")
-            result = generate_testcase(str(target))
-            print(f"   Result: {result}\n")
+            result = asyncio.run(generate_testcase(str(target)))
+            print(f"   Result: {json.dumps(result, ensure_ascii=False, indent=2)}\n")
 
             # List generated test cases
             print(f"4. Listing test cases in: {target}")
@@ -253,8 +928,8 @@ def add(a, b):
 
     # Test single file generation
     print(f"4. Testing single file generation: {test_file}")
-    result = generate_testcase(str(test_file))
-    print(f"   Result: {result}\n")
+    result = asyncio.run(generate_testcase(str(test_file)))
+    print(f"   Result: {json.dumps(result, ensure_ascii=False, indent=2)}\n")
 
     # Create multiple test files
     test_file2 = test_dir / "utils.js"
@@ -267,8 +942,8 @@ def add(a, b):
 
     # Test directory generation
     print(f"6. Testing directory generation: {test_dir}")
-    result = generate_testcase(str(test_dir))
-    print(f"   Result: {result}\n")
+    result = asyncio.run(generate_testcase(str(test_dir)))
+    print(f"   Result: {json.dumps(result, ensure_ascii=False, indent=2)}\n")
 
     # List generated test cases
     print(f"7. Listing generated test cases:")
@@ -299,7 +974,9 @@ if __name__ == "__main__":
 
         config = load_config()
         config_script = config.get('script_path')
-        print(f"  config.json script_path: {config_script if config_script else '(not set)'}\n")
+        print(f"  config.json script_path: {config_script if config_script else '(not set)'}")
+        config_generator = config.get('generator')
+        print(f"  config.json generator: {config_generator if config_generator else '(not set)'}\n")
 
         # 实际使用的脚本
         script_cmd = get_script_command()
@@ -309,8 +986,9 @@ if __name__ == "__main__":
         if script_path.exists():
             print(f"Script resolved path: {script_path.resolve()}")
             print(f"Script extension: {script_path.suffix}")
+        print(f"Generator to use: {describe_generator(resolve_generator())}")
 
         print("\n=== Check completed ===")
     else:
         # 正常运行 MCP server
-        mcp.run()
+        runtime.run()
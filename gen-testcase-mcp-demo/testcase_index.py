@@ -0,0 +1,304 @@
+"""
+生成的测试用例文件索引
+
+- 冷启动时用 os.scandir 扫描目录树，并在目录层面跳过忽略的目录（.git、node_modules 等）
+- 之后由文件系统监听保持最新：安装了 watchdog 时使用 inotify/FSEvents/ReadDirectoryChangesW，
+  否则退化为轮询：索引在查询时发现上次扫描已超过轮询间隔才重新扫描，空闲的索引不扫描
+- list_generated_testcases 直接从内存索引分页返回结果
+- watchdog 在第一次开始监听时才导入，不拖慢服务启动
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_IGNORE_DIRS = {
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".idea", ".vscode",
+    # 测试用例输出的内容寻址存储（materialize.STORE_DIR_NAME）
+    ".testcase-store",
+}
+DEFAULT_POLL_INTERVAL = 5.0
+# 同时保持的索引（及其监听）数量上限，超出时停止最久未查询的索引
+DEFAULT_MAX_INDEXES = 16
+
+
+def scan_tree(root, ignore_dirs):
+    """用 os.scandir 遍历目录树，返回 {文件路径: (mtime_ns, size)}，忽略的目录整体跳过"""
+    files = {}
+    stack = [str(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in ignore_dirs:
+                                stack.append(entry.path)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            files[entry.path] = (st.st_mtime_ns, st.st_size)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
+
+def _is_ignored(path, root, ignore_dirs):
+    try:
+        parts = Path(path).relative_to(root).parts
+    except ValueError:
+        return True
+    return any(part in ignore_dirs for part in parts[:-1]) or (parts and parts[-1] in ignore_dirs)
+
+
+class TreeWatcher:
+    """监听目录树中的文件变化，回调 callback(changed, deleted)
+
+    changed 为新增或修改的文件路径集合；deleted 为删除的路径集合（可能是目录，
+    使用方需要按前缀处理）。忽略目录中的变化不会回调。
+    """
+
+    def __init__(self, root, callback, ignore_dirs=DEFAULT_IGNORE_DIRS, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.root = str(root)
+        self.callback = callback
+        self.ignore_dirs = set(ignore_dirs)
+        self.poll_interval = poll_interval
+        self._observer = None
+        self._poll_thread = None
+        self._stopped = threading.Event()
+        # 轮询模式：上次扫描结果及时间，_scan_lock 保证同一时间只有一次扫描
+        self._scan_lock = threading.Lock()
+        self._snapshot = None
+        self._scanned_at = 0.0
+
+    @property
+    def mode(self):
+        return "watchdog" if self._observer is not None else "polling"
+
+    def start(self, snapshot=None, background=True):
+        """开始监听；snapshot 为冷扫描结果，轮询模式用它作为基线
+
+        background=False 时轮询模式不启动后台线程，由使用方在需要最新结果时调用 refresh()。
+        """
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            Observer = None
+
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_EventHandler(self), self.root, recursive=True)
+                self._observer.daemon = True
+                self._observer.start()
+                return self
+            except Exception as e:
+                print(f"Warning: watchdog unavailable for {self.root}, falling back to polling: {e}",
+                      file=sys.stderr)
+                self._observer = None
+
+        if snapshot is not None:
+            self._snapshot, self._scanned_at = snapshot, time.monotonic()
+        if background:
+            self._poll_thread = threading.Thread(target=self._poll, name=f"poll:{self.root}", daemon=True)
+            self._poll_thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def refresh(self):
+        """轮询模式下，距上次扫描超过 poll_interval 时重新扫描并回调变化；watchdog 模式下什么也不做"""
+        if self._observer is not None or self._stopped.is_set():
+            return
+        with self._scan_lock:
+            if time.monotonic() - self._scanned_at >= self.poll_interval:
+                self._rescan()
+
+    def _emit(self, changed, deleted):
+        changed = {p for p in changed if not _is_ignored(p, self.root, self.ignore_dirs)}
+        deleted = {p for p in deleted if not _is_ignored(p, self.root, self.ignore_dirs)}
+        if changed or deleted:
+            try:
+                self.callback(changed, deleted)
+            except Exception as e:
+                print(f"Warning: watcher callback failed for {self.root}: {e}", file=sys.stderr)
+
+    def _rescan(self):
+        """扫描一次并与上次的结果比较；还没有基线时只记录基线"""
+        previous = self._snapshot
+        current = scan_tree(self.root, self.ignore_dirs)
+        self._snapshot, self._scanned_at = current, time.monotonic()
+        if previous is not None:
+            changed = {p for p, sig in current.items() if previous.get(p) != sig}
+            deleted = set(previous) - set(current)
+            self._emit(changed, deleted)
+
+    def _poll(self):
+        with self._scan_lock:
+            if self._snapshot is None:
+                self._rescan()
+        while not self._stopped.wait(self.poll_interval):
+            with self._scan_lock:
+                self._rescan()
+
+
+class _EventHandler:
+    """把 watchdog 事件转换成文件级的 changed/deleted 集合
+
+    Observer 只调用 dispatch(event)，因此不必继承 FileSystemEventHandler（避免在模块加载时导入 watchdog）
+    """
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def _expand(self, path):
+        """新出现的目录（创建或移动进来）需要展开成其中的文件"""
+        if os.path.isdir(path):
+            return set(scan_tree(path, self.watcher.ignore_dirs))
+        return {path}
+
+    def dispatch(self, event):
+        if event.event_type in ("created", "modified", "closed"):
+            if event.is_directory:
+                if event.event_type == "created":
+                    self.watcher._emit(self._expand(event.src_path), set())
+                return
+            self.watcher._emit({event.src_path}, set())
+        elif event.event_type == "deleted":
+            self.watcher._emit(set(), {event.src_path})
+        elif event.event_type == "moved":
+            self.watcher._emit(self._expand(event.dest_path), {event.src_path})
+
+
+class TestcaseIndex:
+    """某个根目录下所有测试用例文件（相对路径）的内存索引"""
+
+    def __init__(self, root, match, ignore_dirs=DEFAULT_IGNORE_DIRS, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.root = Path(root)
+        self.match = match
+        self.ignore_dirs = set(ignore_dirs)
+        self._lock = threading.Lock()
+        self._files = set()
+        self._sorted = None
+        snapshot = scan_tree(self.root, self.ignore_dirs)
+        self._files = {self._key(p) for p in snapshot if self.match(p)}
+        # 没有 watchdog 时不在后台轮询：查询时按需重新扫描（见 query()），空闲的索引不占用 CPU 和磁盘
+        self.watcher = TreeWatcher(self.root, self._on_change, self.ignore_dirs, poll_interval).start(
+            snapshot, background=False)
+
+    def _key(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def _on_change(self, changed, deleted):
+        self.update(changed, deleted)
+
+    def update(self, changed=(), deleted=()):
+        """应用文件变化；deleted 中的目录会删除其下所有条目"""
+        with self._lock:
+            for path in deleted:
+                try:
+                    key = self._key(path)
+                except ValueError:
+                    continue
+                if key in self._files:
+                    self._files.discard(key)
+                else:
+                    prefix = key + "/"
+                    self._files -= {k for k in self._files if k.startswith(prefix)}
+            for path in changed:
+                try:
+                    key = self._key(path)
+                except ValueError:
+                    continue
+                if self.match(path) and os.path.isfile(path):
+                    self._files.add(key)
+            self._sorted = None
+
+    def query(self, subdir="", prefix="", offset=0, limit=200):
+        """返回 (总数, 当前页)；subdir 为相对索引根目录的子目录，结果相对 subdir"""
+        self.watcher.refresh()
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._files)
+            files = self._sorted
+        return _page(files, subdir, prefix, offset, limit)
+
+    def close(self):
+        self.watcher.stop()
+
+
+class DirectScan:
+    """不建立索引、每次查询直接扫描的目录（用于上层索引忽略的目录，如 node_modules 内部）"""
+
+    def __init__(self, root, match, ignore_dirs=DEFAULT_IGNORE_DIRS):
+        self.root = Path(root)
+        self.match = match
+        self.ignore_dirs = set(ignore_dirs)
+
+    def query(self, subdir="", prefix="", offset=0, limit=200):
+        files = sorted(Path(p).relative_to(self.root).as_posix()
+                       for p in scan_tree(self.root, self.ignore_dirs) if self.match(p))
+        return _page(files, subdir, prefix, offset, limit)
+
+    def close(self):
+        pass
+
+
+def _page(files, subdir, prefix, offset, limit):
+    base = f"{subdir}/" if subdir else ""
+    start = base + prefix
+    matched = [f[len(base):] for f in files if f.startswith(start)]
+    return len(matched), matched[offset:offset + limit]
+
+
+class IndexRegistry:
+    """按根目录管理测试用例索引；子目录查询复用已有的上层索引
+
+    最多保持 max_indexes 个索引，超出时停止并移除最久未查询的索引（LRU）。
+    """
+
+    def __init__(self, match, max_indexes=DEFAULT_MAX_INDEXES):
+        self.match = match
+        self.max_indexes = max_indexes
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+
+    def get(self, directory, ignore_dirs=DEFAULT_IGNORE_DIRS, poll_interval=DEFAULT_POLL_INTERVAL):
+        """返回 (索引, directory 相对索引根目录的子路径)"""
+        directory = Path(directory)
+        with self._lock:
+            for root, index in self._indexes.items():
+                if directory == root or root in directory.parents:
+                    self._indexes.move_to_end(root)
+                    subdir = directory.relative_to(root).as_posix() if directory != root else ""
+                    if _is_ignored(directory, root, index.ignore_dirs):
+                        # 上层索引不包含被忽略目录中的文件，直接扫描该目录
+                        return DirectScan(directory, self.match, ignore_dirs), ""
+                    return index, subdir
+
+            index = TestcaseIndex(directory, self.match, ignore_dirs, poll_interval)
+            # 新索引覆盖了已有的子目录索引，停止并移除它们
+            for root in [r for r in self._indexes if directory in r.parents]:
+                self._indexes.pop(root).close()
+            self._indexes[directory] = index
+            while len(self._indexes) > self.max_indexes:
+                _, evicted = self._indexes.popitem(last=False)
+                evicted.close()
+            return index, ""
+
+    def update(self, changed=(), deleted=()):
+        """把本服务自己生成/删除的文件同步到所有相关索引（不必等待监听事件）"""
+        with self._lock:
+            indexes = list(self._indexes.items())
+        for root, index in indexes:
+            index.update({p for p in map(str, changed) if Path(p).is_relative_to(root)},
+                         {p for p in map(str, deleted) if Path(p).is_relative_to(root)})
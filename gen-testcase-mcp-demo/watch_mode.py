@@ -0,0 +1,120 @@
+"""
+监听模式：源文件变化后自动为变化的文件重新生成测试用例
+
+- 变化事件先进入待处理集合，在静默 debounce 秒后（或首个事件起最多 max_delay 秒）合并成一个批次
+- 同一时间每个根目录只运行一个批次；运行期间的新变化进入下一批次，
+  同一文件的多次快速修改只会触发一次重新生成
+- 生成的测试用例和清单文件本身的变化会被忽略，避免循环触发
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+from testcase_index import DEFAULT_IGNORE_DIRS, DEFAULT_POLL_INTERVAL, TreeWatcher
+
+DEFAULT_DEBOUNCE = 1.0
+DEFAULT_MAX_DELAY = 10.0
+
+
+class WatchSession:
+    """监听一个根目录，把去抖后的变化批量交给 generate(root, paths)"""
+
+    def __init__(self, root, generate, ignore_path, debounce=DEFAULT_DEBOUNCE, max_delay=DEFAULT_MAX_DELAY,
+                 ignore_dirs=DEFAULT_IGNORE_DIRS, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.root = Path(root)
+        self.generate = generate
+        self.ignore_path = ignore_path
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.started_at = time.time()
+
+        self._cond = threading.Condition()
+        self._pending = set()
+        self._first_event = None
+        self._last_event = None
+        self._stopped = False
+
+        self.stats = {"events": 0, "batches": 0, "files": 0, "running": False,
+                      "last_batch": None, "last_error": None}
+
+        self._worker = threading.Thread(target=self._run, name=f"watch:{self.root}", daemon=True)
+        self._worker.start()
+        self.watcher = TreeWatcher(self.root, self._on_change, ignore_dirs, poll_interval).start()
+
+    def _on_change(self, changed, deleted):
+        paths = {p for p in changed | deleted if not self.ignore_path(p)}
+        if not paths:
+            return
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_event = now
+            self._last_event = now
+            self._pending |= paths
+            self.stats["events"] += len(paths)
+            self._cond.notify()
+
+    def _next_batch(self):
+        """等待一个去抖完成的批次；停止时返回 None"""
+        with self._cond:
+            while not self._stopped:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                deadline = min(self._last_event + self.debounce, self._first_event + self.max_delay)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    batch, self._pending = self._pending, set()
+                    return batch
+                self._cond.wait(remaining)
+            return None
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            self.stats["running"] = True
+            start = time.perf_counter()
+            try:
+                result = self.generate(self.root, sorted(batch))
+                self.stats["last_error"] = None
+            except Exception as e:
+                result = None
+                self.stats["last_error"] = str(e)
+                print(f"Warning: watch generation failed for {self.root}: {e}", file=sys.stderr)
+            finally:
+                self.stats["running"] = False
+
+            self.stats["batches"] += 1
+            self.stats["files"] += len(batch)
+            self.stats["last_batch"] = {
+                "paths": len(batch),
+                "duration_s": round(time.perf_counter() - start, 3),
+                "finished_at": time.time(),
+                "result": result,
+            }
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self):
+        self.watcher.stop()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def status(self):
+        return {
+            "root": str(self.root),
+            "mode": self.watcher.mode,
+            "debounce_s": self.debounce,
+            "max_delay_s": self.max_delay,
+            "started_at": self.started_at,
+            "pending": self.pending(),
+            **self.stats,
+        }
@@ -3,6 +3,21 @@
 Environment variables:
     GITHUB_TOKEN: personal access token used for authentication.
     GITHUB_API_URL: base API URL (default: https://api.github.com).
+
+    GITHUB_REUSE_WINDOW: seconds a finished list_repositories result is reused
+        for identical calls (default: 0, only calls made while a crawl is in
+        flight share it; set e.g. 5 to also reuse finished results).
+
+    GITHUB_WEBHOOK_SECRET: when set, start a local receiver for `repository`
+        webhooks signed with this secret and keep list_repositories results
+        in memory, updated by the events (see webhook.py).
+    GITHUB_WEBHOOK_HOST / GITHUB_WEBHOOK_PORT: receiver address
+        (default: 127.0.0.1:8787).
+    GITHUB_WEBHOOK_MAX_AGE: hours a webhook-maintained listing is kept before
+        it is crawled again (default: 1, 0 keeps listings until invalidated).
+
+aggregate_repositories can read further tokens from other environment
+variables (named per source), so several accounts can be crawled at once.
 """
 
 from __future__ import annotations
@@ -10,25 +25,68 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import re
 import subprocess
-from typing import Any, Dict, List, Optional
+import sys
+import tempfile
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 
-from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 
-# Load .env file
-load_dotenv()
-
+# Shared MCP runtime (mcp_runtime.py at the repository root)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from mcp_runtime import MCPRuntime
+from webhook import DEFAULT_HOST as DEFAULT_WEBHOOK_HOST
+from webhook import DEFAULT_PORT as DEFAULT_WEBHOOK_PORT
+from webhook import RepoCache, WebhookReceiver, sign
 
 APP_NAME = "github-mcp-demo"
 DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_TOKEN_ENV = "GITHUB_TOKEN"
+# aggregate_repositories only reads tokens from these variables, so a caller cannot have
+# the value of an arbitrary environment variable sent upstream as a bearer token
+TOKEN_ENV_PATTERN = re.compile(r"GITHUB_TOKEN(_[A-Za-z0-9_]+)?")
+
+# aggregate_repositories defaults: per-token concurrent requests, per-token request cap,
+# and how many requests of the token's remaining rate limit to leave untouched
+DEFAULT_PER_TOKEN_CONCURRENCY = 4
+DEFAULT_MAX_REQUESTS_PER_TOKEN = 200
+RATE_LIMIT_RESERVE = 50
+
+# Finished results are not reused by default, so every call sees a fresh crawl
+DEFAULT_REUSE_WINDOW = 0.0
+# Hours a webhook-maintained listing is kept; catches missed deliveries and membership changes
+DEFAULT_WEBHOOK_MAX_AGE = 1.0
 
 app = FastMCP(APP_NAME)
+runtime = MCPRuntime(app)
+
+
+_dotenv_loaded = False
+
+
+def _load_dotenv_once() -> None:
+    """Load the .env file on first use rather than at import time, so the server starts serving sooner."""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _dotenv_loaded = True
+
+
+def get_api_url() -> str:
+    """GitHub API base URL from the environment (and .env, on the first call)."""
+    _load_dotenv_once()
+    return os.environ.get("GITHUB_API_URL", DEFAULT_API_URL).rstrip("/")
 
 
 def get_settings() -> tuple[str, str]:
-    """Load GitHub-related settings from environment."""
-    api_url = os.environ.get("GITHUB_API_URL", DEFAULT_API_URL).rstrip("/")
+    """Load GitHub-related settings from environment (and .env, on the first call)."""
+    api_url = get_api_url()
     token = os.environ.get("GITHUB_TOKEN")
     if not token:
         raise RuntimeError(
@@ -56,31 +114,67 @@ def format_repo(repo: Dict[str, Any]) -> Dict[str, Any]:
 
 def curl_request(url: str, token: str) -> List[Dict[str, Any]]:
     """Execute curl command to fetch data from GitHub API."""
+    status, _, data = curl_page(url, token)
+
+    if status == 401 or status == 403:
+        raise RuntimeError(
+            "GitHub authentication failed. Check GITHUB_TOKEN or permissions."
+        )
+
+    return data if isinstance(data, list) else []
+
+
+def _parse_headers(text: str) -> Dict[str, str]:
+    """Lower-cased headers of the last response in a curl --dump-header file.
+
+    The file holds one block per response curl read: a proxy's CONNECT reply
+    or "100 Continue" come before the final response's block.
+    """
+    blocks = [block for block in text.replace("\r\n", "\n").split("\n\n") if block.strip()]
+    headers = {}
+    for line in (blocks[-1].split("\n")[1:] if blocks else []):
+        key, sep, value = line.partition(":")
+        if sep:
+            headers[key.strip().lower()] = value.strip()
+    return headers
+
+
+def curl_page(url: str, token: str) -> Tuple[int, Dict[str, str], Any]:
+    """Fetch one API page with curl; returns (HTTP status, lower-cased headers, parsed JSON body)."""
+    header_file = tempfile.NamedTemporaryFile(prefix="github-mcp-headers-", delete=False)
+    header_file.close()
     cmd = [
         "curl",
         "-k",  # Ignore SSL certificate verification
         "-s",  # Silent mode
-        "-H", f"Accept: application/vnd.github+json",
+        "-D", header_file.name,  # Response headers to a file, the body alone on stdout
+        "-w", "\n%{http_code}",  # Final status on the last line of stdout
+        "-H", "Accept: application/vnd.github+json",
         "-H", f"Authorization: Bearer {token}",
         "-H", f"User-Agent: {APP_NAME}/0.1",
         url
     ]
 
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-
-    if result.returncode == 401 or result.returncode == 403:
-        raise RuntimeError(
-            "GitHub authentication failed. Check GITHUB_TOKEN or permissions."
-        )
-
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+        with open(header_file.name, encoding='utf-8', errors='ignore') as f:
+            headers = _parse_headers(f.read())
+    finally:
+        os.unlink(header_file.name)
     if result.returncode != 0:
         raise RuntimeError(f"curl failed with code {result.returncode}: {result.stderr}")
 
+    body, _, code = result.stdout.rpartition("\n")
     try:
-        data = json.loads(result.stdout)
-        return data if isinstance(data, list) else []
+        status = int(code)
+    except ValueError:
+        raise RuntimeError(f"Unexpected response from {url}: {code[:200]}")
+
+    try:
+        data = json.loads(body) if body.strip() else None
     except json.JSONDecodeError as e:
-        raise RuntimeError(f"Failed to parse JSON response: {e}\nResponse: {result.stdout}")
+        raise RuntimeError(f"Failed to parse JSON response: {e}\nResponse: {body[:500]}")
+    return status, headers, data
 
 
 async def fetch_repos(
@@ -111,7 +205,8 @@ async def fetch_repos(
         query_string = "&".join(params_with_page)
         url = f"{api_url}/user/repos?{query_string}"
 
-        batch = curl_request(url, token)
+        # curl is blocking; run it on the runtime's worker pool
+        batch = await runtime.run_blocking(curl_request, url, token)
 
         if not batch:
             break
@@ -127,7 +222,93 @@ async def fetch_repos(
     return repos
 
 
-@app.tool()
+class SingleFlight:
+    """Share one fetch between identical concurrent calls
+
+    The first call for a key starts the fetch; calls with the same key that
+    arrive while it runs await the same task (counted as coalesced). A
+    successful result is reused for `reuse_window` seconds (as given by the
+    call that started the fetch) after it finishes (counted as reused);
+    failures are not cached. A caller that is cancelled does not cancel the
+    shared fetch.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        # key -> (expires at, result)
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self.calls = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self.reused = 0
+        self.errors = 0
+
+    async def run(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], reuse_window: float = 0.0) -> Any:
+        self.calls += 1
+        now = time.monotonic()
+        for stale in [k for k, (expires, _) in self._recent.items() if expires < now]:
+            del self._recent[stale]
+        if key in self._recent:
+            self.reused += 1
+            return self._recent[key][1]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.fetches += 1
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done, reuse_window))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task, reuse_window: float) -> None:
+        self._in_flight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.errors += 1
+        elif reuse_window > 0:
+            self._recent[key] = (time.monotonic() + reuse_window, task.result())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "reused": self.reused,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+            "cached": len(self._recent),
+        }
+
+
+repo_listings = SingleFlight()
+# Listings kept current by webhook events (only used while the receiver runs)
+repo_cache = RepoCache(format_repo)
+webhook_receiver: Optional[WebhookReceiver] = None
+
+
+def get_reuse_window() -> float:
+    """Seconds to reuse a finished list_repositories result (GITHUB_REUSE_WINDOW)."""
+    _load_dotenv_once()
+    try:
+        return max(float(os.environ.get("GITHUB_REUSE_WINDOW", DEFAULT_REUSE_WINDOW)), 0.0)
+    except ValueError:
+        return DEFAULT_REUSE_WINDOW
+
+
+def get_webhook_max_age() -> Optional[float]:
+    """Seconds a webhook-maintained listing is kept (GITHUB_WEBHOOK_MAX_AGE, in hours); None = no limit."""
+    _load_dotenv_once()
+    try:
+        hours = float(os.environ.get("GITHUB_WEBHOOK_MAX_AGE", DEFAULT_WEBHOOK_MAX_AGE))
+    except ValueError:
+        hours = DEFAULT_WEBHOOK_MAX_AGE
+    return hours * 3600 if hours > 0 else None
+
+
+@runtime.tool()
 async def list_repositories(
     visibility: Optional[str] = None,
     affiliation: Optional[str] = None,
@@ -139,10 +320,272 @@ async def list_repositories(
         visibility: Optional filter: 'all', 'public', or 'private'.
         affiliation: Filter by affiliations, e.g. 'owner,collaborator,organization_member'.
         per_page: Page size for the GitHub API (max 100).
+
+    Identical concurrent calls share one crawl; with GITHUB_REUSE_WINDOW set, a
+    finished result is also reused for that many seconds (see the
+    metrics://github resource). While
+    the webhook receiver runs (GITHUB_WEBHOOK_SECRET), results are kept until
+    a repository event invalidates them or GITHUB_WEBHOOK_MAX_AGE hours pass.
+    """
+    api_url, token = get_settings()
+    key = (api_url, token, visibility, affiliation, per_page)
+    if not repo_cache.enabled:
+        repos = await repo_listings.run(key, lambda: fetch_repos(visibility, affiliation, per_page=per_page),
+                                        get_reuse_window())
+        return list(repos)
+
+    cached = repo_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def crawl() -> List[Dict[str, Any]]:
+        since = repo_cache.sequence()
+        repos = await fetch_repos(visibility, affiliation, per_page=per_page)
+        return repo_cache.store(key, visibility, repos, since)
+
+    repos = await repo_listings.run(key, crawl)
+    return list(repos)
+
+
+def start_webhook_receiver() -> Optional[WebhookReceiver]:
+    """Start the webhook receiver if GITHUB_WEBHOOK_SECRET is set (once)."""
+    global webhook_receiver
+    _load_dotenv_once()
+    secret = os.environ.get("GITHUB_WEBHOOK_SECRET")
+    if webhook_receiver is None and secret:
+        host = os.environ.get("GITHUB_WEBHOOK_HOST", DEFAULT_WEBHOOK_HOST)
+        port = int(os.environ.get("GITHUB_WEBHOOK_PORT", DEFAULT_WEBHOOK_PORT))
+        webhook_receiver = WebhookReceiver(repo_cache, secret, host, port).start()
+        repo_cache.max_age = get_webhook_max_age()
+        repo_cache.enabled = True
+    return webhook_receiver
+
+
+def stop_webhook_receiver() -> None:
+    global webhook_receiver
+    if webhook_receiver is not None:
+        webhook_receiver.stop()
+        webhook_receiver = None
+        repo_cache.enabled = False
+
+
+@app.resource("metrics://github")
+def get_github_metrics() -> str:
+    """list_repositories coalescing counters (calls, upstream crawls, coalesced and reused calls)
+    and the webhook-maintained cache (listings, events applied, invalidations)"""
+    return json.dumps({
+        "list_repositories": {**repo_listings.snapshot(), "reuse_window_s": get_reuse_window()},
+        "webhook": {**repo_cache.snapshot(), **(webhook_receiver.snapshot() if webhook_receiver else {})},
+    }, indent=2)
+
+
+class TokenBudget:
+    """Request budget for one token during an aggregation
+
+    Limits concurrent requests per token and the number of requests per
+    crawl, and stops before the token's remaining rate limit (from the
+    X-RateLimit-Remaining header) drops below RATE_LIMIT_RESERVE.
     """
 
-    repos = await fetch_repos(visibility, affiliation, per_page=per_page)
-    return repos
+    def __init__(self, env_name: str, token: str, concurrency: int, max_requests: int):
+        self.env_name = env_name
+        self.token = token
+        self.max_requests = max_requests
+        self.requests = 0
+        self.rate_remaining: Optional[int] = None
+        self.rate_reset: Optional[int] = None
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    def exhausted(self) -> Optional[str]:
+        if self.requests >= self.max_requests:
+            return f"request budget of {self.max_requests} for {self.env_name} used up"
+        if self.rate_remaining is not None and self.rate_remaining <= RATE_LIMIT_RESERVE:
+            return (f"{self.env_name} has {self.rate_remaining} requests of rate limit left "
+                    f"(reserve {RATE_LIMIT_RESERVE}, resets at {self.rate_reset})")
+        return None
+
+    async def get(self, url: str) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """Fetch one page within the budget; returns (repositories, headers)."""
+        async with self._semaphore:
+            reason = self.exhausted()
+            if reason:
+                raise RuntimeError(reason)
+            self.requests += 1
+            status, headers, data = await runtime.run_blocking(curl_page, url, self.token)
+
+        try:
+            remaining = int(headers["x-ratelimit-remaining"])
+            self.rate_remaining = remaining if self.rate_remaining is None else min(self.rate_remaining, remaining)
+            self.rate_reset = int(headers.get("x-ratelimit-reset", 0)) or None
+        except (KeyError, ValueError):
+            # No (or a malformed) rate limit header, e.g. from a proxy or GitHub Enterprise without limits
+            pass
+        if status == 401:
+            raise RuntimeError(f"GitHub authentication failed for {self.env_name}")
+        if status in (403, 429) and headers.get("x-ratelimit-remaining") == "0":
+            raise RuntimeError(f"GitHub rate limit exceeded for {self.env_name}")
+        if status >= 400:
+            message = data.get("message") if isinstance(data, dict) else ""
+            raise RuntimeError(f"GitHub API returned {status} for {url}: {message}")
+        return (data if isinstance(data, list) else []), headers
+
+    def summary(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "max_requests": self.max_requests,
+                "rate_remaining": self.rate_remaining, "rate_reset": self.rate_reset}
+
+
+def _last_page(link_header: str) -> Optional[int]:
+    """Page number of the rel="last" link in a GitHub Link header."""
+    for part in link_header.split(","):
+        if 'rel="last"' in part:
+            match = re.search(r"[?&]page=(\d+)", part)
+            if match:
+                return int(match.group(1))
+    return None
+
+
+def _source_path(source: Dict[str, Any]) -> Tuple[str, str]:
+    """(label, API path) for an aggregation source."""
+    kind = (source.get("type") or "").lower()
+    name = (source.get("name") or "").strip()
+    if kind == "self":
+        return "self", "/user/repos"
+    if kind in ("org", "user") and name:
+        return f"{kind}:{name}", f"/{kind}s/{urllib.parse.quote(name, safe='')}/repos"
+    raise ValueError(f"Invalid source {source!r}: type must be 'org', 'user' (with a name) or 'self'")
+
+
+def _check_token_env(token_env: str) -> None:
+    if not TOKEN_ENV_PATTERN.fullmatch(token_env):
+        raise ValueError(f"Invalid token_env {token_env!r}: must be GITHUB_TOKEN or GITHUB_TOKEN_<suffix>")
+
+
+async def crawl_source(api_url: str, path: str, query: List[str], budget: TokenBudget,
+                       per_page: int) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    """Fetch every page of one listing; returns (repositories, pages fetched, error).
+
+    Page 1 reveals the last page through the Link header; the remaining pages
+    are then fetched concurrently (bounded by the token budget). Without a
+    Link header, pages are followed one by one until a short page.
+    """
+    def page_url(page: int) -> str:
+        return f"{api_url}{path}?" + "&".join(query + [f"per_page={per_page}", f"page={page}"])
+
+    repos: List[Dict[str, Any]] = []
+    try:
+        batch, headers = await budget.get(page_url(1))
+    except Exception as e:
+        return repos, 0, str(e)
+    repos.extend(batch)
+    pages = 1
+
+    last = _last_page(headers.get("link", ""))
+    if last is not None:
+        results = await asyncio.gather(*(budget.get(page_url(page)) for page in range(2, last + 1)),
+                                       return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        for result in results:
+            if not isinstance(result, BaseException):
+                repos.extend(result[0])
+                pages += 1
+        return repos, pages, str(errors[0]) if errors else None
+
+    page = 1
+    while len(batch) >= per_page:
+        page += 1
+        try:
+            batch, _ = await budget.get(page_url(page))
+        except Exception as e:
+            return repos, pages, str(e)
+        repos.extend(batch)
+        pages += 1
+    return repos, pages, None
+
+
+@runtime.tool()
+async def aggregate_repositories(
+    sources: List[Dict[str, str]],
+    visibility: Optional[str] = None,
+    per_page: int = 100,
+    per_token_concurrency: int = DEFAULT_PER_TOKEN_CONCURRENCY,
+    max_requests_per_token: int = DEFAULT_MAX_REQUESTS_PER_TOKEN,
+) -> Dict[str, Any]:
+    """Crawl repositories of several orgs, users and accounts concurrently and merge them.
+
+    Args:
+        sources: List of sources, each {"type": "org" | "user" | "self", "name": "<org or user>",
+            "token_env": "<environment variable holding the token>"}. "self" lists the token
+            owner's repositories (/user/repos); token_env defaults to GITHUB_TOKEN and must be
+            GITHUB_TOKEN or start with GITHUB_TOKEN_.
+        visibility: Optional filter for "self" sources: 'all', 'public', or 'private'.
+        per_page: Page size for the GitHub API (max 100).
+        per_token_concurrency: Concurrent requests allowed per token.
+        max_requests_per_token: Request cap per token for this call; the crawl also stops
+            before a token's remaining rate limit drops below the reserve.
+
+    Returns:
+        repositories (deduplicated by full_name, each with the sources it was found in),
+        total, per-source results (repos, pages, duration, error), per-token request counts
+        and remaining rate limit, and the total duration.
+    """
+    started = time.perf_counter()
+    api_url = get_api_url()
+    per_page = min(max(per_page, 1), 100)
+
+    budgets: Dict[str, TokenBudget] = {}
+    jobs = []
+    source_results: List[Dict[str, Any]] = []
+    for source in sources:
+        token_env = source.get("token_env") or DEFAULT_TOKEN_ENV
+        try:
+            label, path = _source_path(source)
+            _check_token_env(token_env)
+        except ValueError as e:
+            source_results.append({"source": source, "token_env": token_env, "error": str(e)})
+            continue
+        entry = {"source": label, "token_env": token_env}
+        source_results.append(entry)
+        token = os.environ.get(token_env)
+        if not token:
+            entry["error"] = f"environment variable {token_env} is not set"
+            continue
+        if token_env not in budgets:
+            budgets[token_env] = TokenBudget(token_env, token, per_token_concurrency, max_requests_per_token)
+        if label == "self":
+            query = [f"visibility={visibility}"] if visibility else []
+        else:
+            query = ["type=all"]
+        jobs.append((entry, path, query))
+
+    async def run(entry: Dict[str, Any], path: str, query: List[str]) -> List[Dict[str, Any]]:
+        source_started = time.perf_counter()
+        repos, pages, error = await crawl_source(api_url, path, query, budgets[entry["token_env"]], per_page)
+        entry.update(repos=len(repos), pages=pages, complete=error is None,
+                     duration_s=round(time.perf_counter() - source_started, 3))
+        if error:
+            entry["error"] = error
+        return repos
+
+    crawled = await asyncio.gather(*(run(*job) for job in jobs))
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    for (entry, _, _), repos in zip(jobs, crawled):
+        for repo in repos:
+            full_name = repo.get("full_name")
+            if not full_name:
+                continue
+            if full_name not in merged:
+                merged[full_name] = {**format_repo(repo), "sources": []}
+            if entry["source"] not in merged[full_name]["sources"]:
+                merged[full_name]["sources"].append(entry["source"])
+
+    return {
+        "repositories": [merged[name] for name in sorted(merged)],
+        "total": len(merged),
+        "sources": source_results,
+        "tokens": {env: budget.summary() for env, budget in budgets.items()},
+        "duration_s": round(time.perf_counter() - started, 3),
+    }
 
 
 async def test_list(visibility: Optional[str] = None, affiliation: Optional[str] = None):
@@ -159,11 +602,168 @@ async def test_list(visibility: Optional[str] = None, affiliation: Optional[str]
         print(f"错误: {e}")
 
 
-if __name__ == "__main__":
-    import sys
+def parse_source_spec(spec: str) -> Dict[str, str]:
+    """Parse a command-line source: 'org:<name>', 'user:<name>' or 'self', optionally '@<TOKEN_ENV>'."""
+    spec, _, token_env = spec.partition("@")
+    kind, _, name = spec.partition(":")
+    source = {"type": kind, "name": name}
+    if token_env:
+        source["token_env"] = token_env
+    return source
+
+
+async def test_aggregate(specs: List[str]):
+    """Test function to aggregate repos from several sources."""
+    result = await aggregate_repositories([parse_source_spec(spec) for spec in specs])
+    print(f"\n合并后共 {result['total']} 个仓库，耗时 {result['duration_s']}s\n")
+    for source in result["sources"]:
+        status = f"错误: {source['error']}" if source.get("error") else "完成"
+        print(f"  - {source['source']} ({source['token_env']}): {source.get('repos', 0)} 个仓库, "
+              f"{source.get('pages', 0)} 页, {source.get('duration_s', 0)}s, {status}")
+    for env, usage in result["tokens"].items():
+        print(f"  * {env}: {usage['requests']} 次请求, 剩余配额 {usage['rate_remaining']}")
+    print()
+
+
+WEBHOOK_SAMPLES_DIR = Path(__file__).parent / "webhook_samples"
+
+
+def post_webhook(url: str, secret: str, event: str, body: bytes, delivery: str) -> Tuple[int, Any]:
+    """POST one signed webhook delivery, like GitHub does; returns (HTTP status, parsed response)."""
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(url, data=body, method="POST", headers={
+        "Content-Type": "application/json",
+        "User-Agent": "GitHub-Hookshot/test",
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": delivery,
+        "X-Hub-Signature-256": sign(secret, body),
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+async def test_webhook() -> int:
+    """Test function: post the recorded payloads in webhook_samples/ and check the cached listings.
 
+    Runs against benchmarks/mock_github.py, started in-process (the samples are recorded
+    for its repositories), with a receiver on an ephemeral port and a throwaway secret.
+    Sample files are named <order>-<event>[-<action>].json. After each delivery both the
+    unfiltered and the visibility="public" listing are read again and compared with what
+    the event must do; a duplicate delivery, a forged signature and listing expiry
+    (GITHUB_WEBHOOK_MAX_AGE) are checked too. Returns the number of failed checks.
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+    from mock_github import MockGitHubServer
+
+    _load_dotenv_once()
+    failures: List[str] = []
+
+    def check(description: str, ok: bool, detail: Any = "") -> None:
+        print(f"    {'通过' if ok else '失败'}: {description}" + ("" if ok else f"（{detail}）"))
+        if not ok:
+            failures.append(description)
+
+    async def listing(visibility: Optional[str] = None) -> Tuple[Dict[str, Dict[str, Any]], bool]:
+        """(repositories by full_name, whether this read crawled upstream)"""
+        fetches = repo_listings.fetches
+        repos = await list_repositories(visibility=visibility)
+        return {repo["full_name"]: repo for repo in repos}, repo_listings.fetches > fetches
+
+    with MockGitHubServer() as gh:
+        os.environ.update(GITHUB_API_URL=gh.url, GITHUB_TOKEN="webhook-test",
+                          GITHUB_WEBHOOK_SECRET=os.urandom(16).hex(), GITHUB_WEBHOOK_PORT="0")
+        receiver = start_webhook_receiver()
+        secret = os.environ["GITHUB_WEBHOOK_SECRET"]
+
+        async def post(event: str, body: bytes, delivery: str, key: str = secret) -> Tuple[int, Any]:
+            return await asyncio.to_thread(post_webhook, receiver.url, key, event, body, delivery)
+
+        print(f"模拟 GitHub API: {gh.url}  接收端: {receiver.url}")
+        try:
+            everything, _ = await listing()
+            public, _ = await listing("public")
+            check("首次读取抓取到仓库列表", bool(everything) and bool(public), f"{len(everything)} 个仓库")
+
+            for path in sorted(WEBHOOK_SAMPLES_DIR.glob("*.json")):
+                event = path.stem.split("-")[1]
+                payload = json.loads(path.read_bytes())
+                status, response = await post(event, path.read_bytes(), path.stem)
+                print(f"  {path.name}: {status} {json.dumps(response, ensure_ascii=False)}")
+                if event != "repository":
+                    expected = 200 if event == "ping" else 202
+                    check(f"{event} 事件返回 {expected}", status == expected, status)
+                    continue
+                check("返回 200", status == 200, status)
+
+                action, repo = payload["action"], format_repo(payload["repository"])
+                name = repo["full_name"]
+                everything, crawled = await listing()
+                public, public_crawled = await listing("public")
+                if action == "created":
+                    check("新建的仓库使列表失效并重新抓取", crawled, "从内存返回")
+                    check("public 列表仅在新仓库公开时重新抓取", public_crawled == (not repo["private"]),
+                          f"重新抓取: {public_crawled}")
+                    continue
+                check("从内存返回，没有重新抓取", not crawled and not public_crawled)
+                if action == "renamed":
+                    previous = f"{name.split('/')[0]}/{payload['changes']['repository']['name']['from']}"
+                    check(f"改名后 {previous} 被 {name} 替换",
+                          previous not in everything and everything.get(name) == repo)
+                elif action == "deleted":
+                    check(f"删除后 {name} 不再出现", name not in everything and name not in public)
+                elif action == "privatized":
+                    check(f"{name} 转为私有后仍在全部列表中", (everything.get(name) or {}).get("private") is True)
+                    check(f"{name} 从 public 列表中移除", name not in public)
+                else:
+                    check(f"{name} 更新为事件中的内容", everything.get(name) == repo, everything.get(name))
+
+            # Same delivery again: acknowledged, not applied (the crawl after "created" restored the repo)
+            deleted = next(WEBHOOK_SAMPLES_DIR.glob("*-repository-deleted.json"))
+            name = json.loads(deleted.read_bytes())["repository"]["full_name"]
+            events = repo_cache.events
+            status, response = await post("repository", deleted.read_bytes(), deleted.stem)
+            print(f"  重复投递 {deleted.name}: {status} {json.dumps(response, ensure_ascii=False)}")
+            everything, _ = await listing()
+            check("重复投递只确认不再应用", status == 200 and response.get("duplicate") is True
+                  and repo_cache.events == events and name in everything, response)
+
+            status, response = await post("repository", deleted.read_bytes(), "forged", "wrong-secret")
+            print(f"  错误签名: {status} {json.dumps(response, ensure_ascii=False)}")
+            check("错误签名返回 401 且不应用", status == 401 and repo_cache.events == events, status)
+
+            max_age, repo_cache.max_age = repo_cache.max_age, 0.0
+            try:
+                _, crawled = await listing()
+            finally:
+                repo_cache.max_age = max_age
+            check("超过 GITHUB_WEBHOOK_MAX_AGE 的列表重新抓取", crawled)
+        except Exception as e:
+            check("测试过程中没有异常", False, f"{type(e).__name__}: {e}")
+        finally:
+            stop_webhook_receiver()
+
+    print(get_github_metrics())
+    print(f"{len(failures)} 项检查失败" if failures else "全部检查通过")
+    return len(failures)
+
+
+if __name__ == "__main__":
     # Check for test mode
-    if "--test" in sys.argv:
+    if "--test-webhook" in sys.argv:
+        # python server.py --test-webhook   (starts benchmarks/mock_github.py in-process)
+        print("测试模式: 向本地 webhook 接收端投递 webhook_samples/ 中的事件...")
+        sys.exit(1 if asyncio.run(test_webhook()) else 0)
+    elif "--test-aggregate" in sys.argv:
+        # python server.py --test-aggregate org:acme user:octocat self@GITHUB_TOKEN_2
+        specs = sys.argv[sys.argv.index("--test-aggregate") + 1:]
+        print("测试模式: 合并多个来源的仓库...")
+        asyncio.run(test_aggregate(specs or ["self"]))
+    elif "--test" in sys.argv:
         # Parse simple args for test
         visibility = None
         affiliation = None
@@ -177,5 +777,9 @@ if __name__ == "__main__":
         print("测试模式: 列出仓库...")
         asyncio.run(test_list(visibility, affiliation))
     else:
-        # Run as MCP server
-        asyncio.run(app.run())
+        # Run as MCP server (with the webhook receiver if GITHUB_WEBHOOK_SECRET is set)
+        start_webhook_receiver()
+        try:
+            runtime.run()
+        finally:
+            stop_webhook_receiver()
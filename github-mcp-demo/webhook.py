@@ -0,0 +1,314 @@
+"""
+Local GitHub webhook receiver that keeps list_repositories results current
+
+Without it, list_repositories results are reused for at most
+GITHUB_REUSE_WINDOW seconds (none by default) and then crawled again. When
+GITHUB_WEBHOOK_SECRET is set, the server also starts a small HTTP endpoint
+for GitHub `repository` webhooks, and finished listings are kept in memory
+for up to `max_age` seconds (then crawled again, which catches missed
+deliveries and membership changes that send no `repository` event). Each
+delivery updates only the listings it affects:
+
+- edited / renamed / archived / unarchived: the entry is replaced with the
+  payload's repository (renames are matched by the previous full_name)
+- deleted: the entry is removed
+- privatized / publicized: the entry is updated, or removed from listings
+  whose visibility filter no longer matches
+- created / transferred of a repository not yet listed: whether it belongs to
+  a listing depends on the affiliation filter, which cannot be evaluated from
+  the payload, so every listing its visibility matches is dropped and crawled
+  again on the next call
+- privatized / publicized of a repository not yet listed: listings filtered
+  by visibility are dropped the same way; unfiltered listings are untouched
+
+Deliveries must carry a valid X-Hub-Signature-256 (HMAC-SHA256 of the raw body
+with the shared secret); anything else is rejected with 401. Redeliveries
+(same X-GitHub-Delivery) are acknowledged but applied only once. Events that
+arrive while a crawl is running are replayed onto its result before it is
+cached, so a slow crawl cannot resurrect a deleted repository.
+"""
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+# GitHub caps webhook payloads at 25 MB
+MAX_PAYLOAD = 25 * 1024 * 1024
+# Events kept for replay onto crawls that were running when they arrived
+EVENT_LOG_SIZE = 1000
+DELIVERY_LOG_SIZE = 1000
+
+# Actions after which a repository may belong to a listing it was not in
+_ADDING_ACTIONS = {"created", "transferred", "publicized", "privatized"}
+
+
+def sign(secret: str, body: bytes) -> str:
+    """X-Hub-Signature-256 header value for body"""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, header: Optional[str]) -> bool:
+    return bool(header) and hmac.compare_digest(sign(secret, body), header)
+
+
+def _previous_full_name(payload: Dict[str, Any], repo: Dict[str, Any]) -> Optional[str]:
+    """full_name the repository had before a rename or transfer, if the payload says"""
+    changes = payload.get("changes") or {}
+    owner, _, name = (repo.get("full_name") or "").partition("/")
+    old_name = ((changes.get("repository") or {}).get("name") or {}).get("from")
+    old_owner = (changes.get("owner") or {}).get("from") or {}
+    old_owner = (old_owner.get("user") or old_owner.get("organization") or {}).get("login")
+    if not old_name and not old_owner:
+        return None
+    return f"{old_owner or owner}/{old_name or name}"
+
+
+def _visible(visibility: Optional[str], repo: Dict[str, Any]) -> bool:
+    """Whether a listing made with this visibility filter would include repo"""
+    if visibility in ("public", "private"):
+        return bool(repo.get("private")) == (visibility == "private")
+    return True
+
+
+class RepoCache:
+    """Finished list_repositories results, kept current by webhook events
+
+    Listings are stored per list_repositories key (which includes the token);
+    the visibility filter of each key is kept to decide membership changes.
+    A listing older than max_age seconds (None: no limit) is dropped on read.
+    """
+
+    def __init__(self, format_repo: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 max_age: Optional[float] = None):
+        self._format_repo = format_repo
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # key -> (visibility filter, repos, time stored)
+        self._listings: Dict[Hashable, Tuple[Optional[str], List[Dict[str, Any]], float]] = {}
+        self._events: deque = deque(maxlen=EVENT_LOG_SIZE)
+        self._sequence = 0
+        self.enabled = False
+        self.hits = 0
+        self.stored = 0
+        self.events = 0
+        self.updated = 0
+        self.removed = 0
+        self.invalidated = 0
+        self.expired = 0
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            listing = self._listings.get(key)
+            if listing is None:
+                return None
+            if self.max_age is not None and time.monotonic() - listing[2] > self.max_age:
+                del self._listings[key]
+                self.expired += 1
+                return None
+            self.hits += 1
+            return list(listing[1])
+
+    def sequence(self) -> int:
+        """Current event sequence; pass it to store() for a crawl started now"""
+        with self._lock:
+            return self._sequence
+
+    def store(self, key: Hashable, visibility: Optional[str], repos: List[Dict[str, Any]],
+              since: int) -> List[Dict[str, Any]]:
+        """Cache a crawl started at sequence `since`, after replaying events that arrived meanwhile
+
+        Returns the (possibly updated) repositories. The result is not cached if
+        a replayed event invalidates it or the replay log no longer reaches back.
+        """
+        repos = list(repos)
+        with self._lock:
+            missed = [event for seq, event in self._events if seq > since]
+            complete = self._sequence - since == len(missed)
+            if all(self._apply(visibility, repos, event) for event in missed) and complete:
+                self._listings[key] = (visibility, repos, time.monotonic())
+                self.stored += 1
+            return list(repos)
+
+    def apply_event(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply one `repository` webhook payload to every cached listing"""
+        repo = payload.get("repository") or {}
+        event = {
+            "action": payload.get("action"),
+            "repo": self._format_repo(repo),
+            "previous": _previous_full_name(payload, repo),
+        }
+        result = {"action": event["action"], "repository": event["repo"]["full_name"],
+                  "updated": 0, "removed": 0, "invalidated": 0}
+        with self._lock:
+            self._sequence += 1
+            self._events.append((self._sequence, event))
+            self.events += 1
+            for key, (visibility, repos, _) in list(self._listings.items()):
+                before = len(repos)
+                if not self._apply(visibility, repos, event, result):
+                    del self._listings[key]
+                    result["invalidated"] += 1
+                elif len(repos) < before:
+                    result["removed"] += 1
+            self.updated += result["updated"]
+            self.removed += result["removed"]
+            self.invalidated += result["invalidated"]
+        return result
+
+    @staticmethod
+    def _apply(visibility: Optional[str], repos: List[Dict[str, Any]], event: Dict[str, Any],
+               result: Optional[Dict[str, Any]] = None) -> bool:
+        """Apply an event to one listing in place; False means the listing must be crawled again"""
+        action, repo = event["action"], event["repo"]
+        names = {repo["full_name"], event["previous"]}
+        index = next((i for i, r in enumerate(repos) if r.get("full_name") in names), None)
+        if index is not None:
+            if action == "deleted" or not _visible(visibility, repo):
+                del repos[index]
+            else:
+                repos[index] = dict(repo)
+                if result is not None:
+                    result["updated"] += 1
+            return True
+        if action in _ADDING_ACTIONS and _visible(visibility, repo):
+            # A visibility change cannot add a repository to a listing that does not filter by visibility
+            return action in ("publicized", "privatized") and visibility not in ("public", "private")
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "listings": len(self._listings),
+                "repositories": sum(len(repos) for _, repos, _ in self._listings.values()),
+                "hits": self.hits,
+                "stored": self.stored,
+                "events": self.events,
+                "updated": self.updated,
+                "removed": self.removed,
+                "invalidated": self.invalidated,
+                "expired": self.expired,
+                "max_age_s": self.max_age,
+            }
+
+
+class WebhookReceiver:
+    """Threaded HTTP endpoint for GitHub webhook deliveries; use start() / stop()"""
+
+    def __init__(self, cache: RepoCache, secret: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.cache = cache
+        self.secret = secret
+        self._lock = threading.Lock()  # counters
+        # Held while a delivery is checked, applied and recorded; guards _deliveries
+        self._delivery_lock = threading.Lock()
+        self._deliveries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.received = 0
+        self.rejected = 0
+        self.ignored = 0
+        self.duplicates = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "WebhookReceiver":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="github-webhook", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def handle(self, event: str, delivery: Optional[str], payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Process a verified delivery; returns (HTTP status, response body)
+
+        The duplicate check, applying the event and recording the delivery id
+        happen under one lock, so concurrent redeliveries apply at most once.
+        """
+        with self._delivery_lock:
+            if delivery and delivery in self._deliveries:
+                with self._lock:
+                    self.duplicates += 1
+                return 200, {**self._deliveries[delivery], "duplicate": True}
+            if event == "ping":
+                response = {"ok": True, "hook_id": payload.get("hook_id")}
+            elif event == "repository" and isinstance(payload.get("repository"), dict):
+                response = self.cache.apply_event(payload)
+            else:
+                with self._lock:
+                    self.ignored += 1
+                return 202, {"ignored": event}
+            if delivery:
+                self._deliveries[delivery] = response
+                while len(self._deliveries) > DELIVERY_LOG_SIZE:
+                    self._deliveries.popitem(last=False)
+        return 200, response
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"url": self.url, "received": self.received, "rejected": self.rejected,
+                    "ignored": self.ignored, "duplicates": self.duplicates}
+
+    def _handler_class(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _reject(self, status: int, message: str) -> None:
+                with receiver._lock:
+                    receiver.rejected += 1
+                self._send_json(status, {"error": message})
+
+            def do_POST(self):
+                with receiver._lock:
+                    receiver.received += 1
+                try:
+                    length = int(self.headers.get("Content-Length", ""))
+                except ValueError:
+                    self.close_connection = True
+                    self._reject(411, "Content-Length required")
+                    return
+                if length > MAX_PAYLOAD:
+                    self.close_connection = True
+                    self._reject(413, "payload too large")
+                    return
+                body = self.rfile.read(length)
+                if not verify_signature(receiver.secret, body, self.headers.get("X-Hub-Signature-256")):
+                    self._reject(401, "invalid signature")
+                    return
+                try:
+                    if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                        body = parse_qs(body.decode("utf-8"))["payload"][0].encode("utf-8")
+                    payload = json.loads(body)
+                except (KeyError, UnicodeDecodeError, ValueError) as e:
+                    self._reject(400, f"invalid payload: {e}")
+                    return
+                if not isinstance(payload, dict):
+                    self._reject(400, "invalid payload: expected a JSON object")
+                    return
+                status, response = receiver.handle(self.headers.get("X-GitHub-Event", ""),
+                                                   self.headers.get("X-GitHub-Delivery"), payload)
+                self._send_json(status, response)
+
+        return Handler
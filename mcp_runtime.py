@@ -0,0 +1,564 @@
+"""
+Shared runtime layer for the MCP demo servers
+
+Wraps a FastMCP instance and gives every tool:
+- a bounded thread pool for blocking work (sync tools run there instead of on the event loop)
+- a per-tool concurrency limit (calls over the limit wait in a queue)
+- timing middleware: call counts, errors, in-flight, queue wait and latency percentiles,
+  exposed as the runtime://<server-name> resource (e.g. runtime://ssh-file-transfer-server)
+- a result-size limit: long text results are truncated and the rest can be paged with read_result
+- graceful shutdown: on SIGTERM/SIGINT new calls are rejected and in-flight calls are drained
+- startup profiling: `python server.py --profile-startup` starts the server in a child process
+  under `-X importtime` and reports per-module import time and the time until tools/list answers
+- on-demand sampling profiler (sampling_profiler.py): the profile_server tool, or SIGUSR2, samples
+  every thread's stack for a while and writes a collapsed-stack (flamegraph) file plus a summary of
+  the top functions and of the time spent in subprocess, SSH and HTTP I/O; nothing runs between profiles
+
+Usage (the servers add the repository root to sys.path first):
+
+    runtime = MCPRuntime(mcp)
+
+    @runtime.tool(max_concurrency=4)
+    def my_tool(...): ...
+
+    runtime.run()
+
+Defaults can be overridden with MCP_MAX_WORKERS, MCP_TOOL_CONCURRENCY,
+MCP_MAX_RESULT_CHARS and MCP_DRAIN_TIMEOUT; MCP_PROFILE_DIR (default
+<tmp>/mcp-profiles) and MCP_PROFILE_SECONDS (SIGUSR2 profile length, default 10)
+configure the profiler.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, List, Optional
+
+import anyio
+from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+
+from sampling_profiler import DEFAULT_INTERVAL as DEFAULT_PROFILE_INTERVAL
+from sampling_profiler import DEFAULT_TOP as DEFAULT_PROFILE_TOP
+from sampling_profiler import Profile, SamplingProfiler
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TOOL_CONCURRENCY = 16
+DEFAULT_MAX_RESULT_CHARS = 100_000
+DEFAULT_DRAIN_TIMEOUT = 30.0
+# After the last call finishes, time allowed for its response to be written before the transport closes
+DRAIN_FLUSH_DELAY = 0.2
+
+# Truncated results kept for read_result (oldest evicted first)
+RESULT_CACHE_SIZE = 32
+# Latency samples kept per tool for percentiles
+LATENCY_WINDOW = 1000
+# --profile-startup: how long to wait for the child server, and how many modules to list
+STARTUP_TIMEOUT = 30.0
+STARTUP_TOP_MODULES = 15
+# profile_server / SIGUSR2 default profile length (seconds)
+DEFAULT_PROFILE_SECONDS = 10.0
+
+
+def _env_number(name: str, default, cast=int):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        print(f"Warning: ignoring invalid {name}={value!r}", file=sys.stderr)
+        return default
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class ToolStats:
+    """Cumulative timing for one tool (updated on the event loop thread)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.truncated = 0
+        self.total_s = 0.0
+        self.queue_wait_s = 0.0
+        self.result_chars = 0
+        self.latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "truncated": self.truncated,
+            "avg_ms": round(self.total_s / self.calls * 1000, 3) if self.calls else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            "avg_queue_wait_ms": round(self.queue_wait_s / self.calls * 1000, 3) if self.calls else 0.0,
+            "result_chars": self.result_chars,
+        }
+
+
+class MCPRuntime:
+    """Runtime wrapper around one FastMCP server"""
+
+    def __init__(self, mcp: FastMCP, max_workers: Optional[int] = None,
+                 default_concurrency: Optional[int] = None, max_result_chars: Optional[int] = None,
+                 drain_timeout: Optional[float] = None):
+        self.mcp = mcp
+        self.name = mcp.name
+        self.max_workers = max_workers or _env_number("MCP_MAX_WORKERS", DEFAULT_MAX_WORKERS)
+        self.default_concurrency = default_concurrency or _env_number(
+            "MCP_TOOL_CONCURRENCY", DEFAULT_TOOL_CONCURRENCY)
+        self.max_result_chars = max_result_chars or _env_number(
+            "MCP_MAX_RESULT_CHARS", DEFAULT_MAX_RESULT_CHARS)
+        self.drain_timeout = drain_timeout or _env_number("MCP_DRAIN_TIMEOUT", DEFAULT_DRAIN_TIMEOUT, float)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._limits: Dict[str, int] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, ToolStats] = {}
+        self._results: "OrderedDict[str, str]" = OrderedDict()
+        self._results_lock = threading.Lock()
+        self._in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._draining = False
+        self._started = time.time()
+        self.profiler = SamplingProfiler(self.name)
+        self.profile_dir = os.environ.get("MCP_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "mcp-profiles")
+
+        self.tool(max_concurrency=self.default_concurrency, paginate=False)(self._read_result_tool())
+        self.tool(max_concurrency=1, paginate=False)(self._profile_tool())
+        self.resource_uri = "runtime://" + (re.sub(r"[^a-z0-9]+", "-", self.name.lower()).strip("-") or "server")
+        mcp.resource(self.resource_uri)(self._stats_resource())
+
+    # -- executor -----------------------------------------------------------------
+
+    def get_executor(self, max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+        """The shared bounded pool; max_workers only applies if the pool does not exist yet"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max_workers or self.max_workers, thread_name_prefix=f"{self.name}-worker")
+            return self._executor
+
+    async def run_blocking(self, func: Callable, *args, **kwargs):
+        """Run a blocking callable on the shared pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), functools.partial(func, *args, **kwargs))
+
+    # -- tools --------------------------------------------------------------------
+
+    def tool(self, max_concurrency: Optional[int] = None, paginate: bool = True, **tool_kwargs):
+        """Drop-in replacement for @mcp.tool() that adds the runtime middleware
+
+        Args:
+            max_concurrency: Concurrent calls allowed for this tool (default: MCP_TOOL_CONCURRENCY)
+            paginate: Truncate text results longer than max_result_chars
+        """
+        def decorator(fn: Callable):
+            name = tool_kwargs.get("name") or fn.__name__
+            self._limits[name] = max_concurrency or self.default_concurrency
+            self._stats[name] = ToolStats()
+            is_async = inspect.iscoroutinefunction(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                return await self._call(name, fn, is_async, paginate, args, kwargs)
+
+            self.mcp.tool(**tool_kwargs)(wrapper)
+            return fn
+
+        return decorator
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores[name] = asyncio.Semaphore(self._limits[name])
+        return semaphore
+
+    async def _call(self, name, fn, is_async, paginate, args, kwargs):
+        stats = self._stats[name]
+        if self._draining:
+            stats.rejected += 1
+            raise ToolError(f"{self.name} is shutting down; {name} was not started")
+
+        self._enter()
+        queued_at = time.perf_counter()
+        stats.queued += 1
+        acquired = False
+        try:
+            async with self._semaphore(name):
+                acquired = True
+                stats.queued -= 1
+                started = time.perf_counter()
+                stats.queue_wait_s += started - queued_at
+                stats.in_flight += 1
+                try:
+                    if is_async:
+                        result = await fn(*args, **kwargs)
+                    else:
+                        result = await self.run_blocking(fn, *args, **kwargs)
+                except BaseException:
+                    stats.errors += 1
+                    raise
+                finally:
+                    stats.in_flight -= 1
+                    elapsed = time.perf_counter() - started
+                    stats.calls += 1
+                    stats.total_s += elapsed
+                    stats.latencies.append(elapsed)
+        finally:
+            if not acquired:
+                stats.queued -= 1
+            self._leave()
+
+        if isinstance(result, str):
+            stats.result_chars += len(result)
+            if paginate and len(result) > self.max_result_chars:
+                stats.truncated += 1
+                return self._truncate(result)
+        return result
+
+    # -- result size limits -------------------------------------------------------
+
+    def _truncate(self, text: str) -> str:
+        result_id = uuid.uuid4().hex[:12]
+        with self._results_lock:
+            self._results[result_id] = text
+            while len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return self._page(result_id, text, 0)
+
+    def _page(self, result_id: str, text: str, offset: int) -> str:
+        end = min(offset + self.max_result_chars, len(text))
+        page = text[offset:end]
+        if end >= len(text):
+            return page
+        return (f"{page}\n\n[Result truncated: showing characters {offset}-{end} of {len(text)}. "
+                f"Call read_result(result_id=\"{result_id}\", offset={end}) for the next page.]")
+
+    def _read_result_tool(self):
+        runtime = self
+
+        def read_result(result_id: str, offset: int = 0) -> str:
+            """Read the next page of a truncated tool result
+
+            Args:
+                result_id: The id given in the truncation notice
+                offset: Character offset to continue from
+            """
+            with runtime._results_lock:
+                text = runtime._results.get(result_id)
+                if text is not None:
+                    runtime._results.move_to_end(result_id)
+            if text is None:
+                return f"Error: result {result_id} is no longer available; call the original tool again"
+            return runtime._page(result_id, text, max(offset, 0))
+
+        return read_result
+
+    # -- profiling ----------------------------------------------------------------
+
+    def _profile_tool(self):
+        runtime = self
+
+        async def profile_server(seconds: float = DEFAULT_PROFILE_SECONDS,
+                                 interval_ms: float = DEFAULT_PROFILE_INTERVAL * 1000,
+                                 top: int = DEFAULT_PROFILE_TOP) -> str:
+            """Sample this server's threads for a while and report where the time goes
+
+            Writes a flamegraph-compatible collapsed-stack file and a JSON summary to
+            MCP_PROFILE_DIR and returns the summary: thread time per category (cpu, idle,
+            subprocess, ssh, http), and the top functions by own and cumulative samples.
+
+            Args:
+                seconds: How long to sample (max 600)
+                interval_ms: Sampling interval in milliseconds (at least 1)
+                top: Number of functions to list
+            """
+            try:
+                profile = runtime.profiler.start(seconds, interval_ms / 1000)
+            except (RuntimeError, ValueError) as e:
+                return f"Error: {e}"
+            try:
+                await asyncio.sleep(profile.duration)
+            finally:
+                profile.stop()
+            await runtime.run_blocking(profile.wait)
+            summary = await runtime.run_blocking(runtime.profiler.write, profile, runtime.profile_dir, top)
+            return json.dumps(summary, indent=2)
+
+        return profile_server
+
+    def _write_signal_profile(self, profile: Profile) -> None:
+        """on_finish callback of a SIGUSR2 profile (runs on the sampler thread)"""
+        try:
+            summary = self.profiler.write(profile, self.profile_dir)
+        except OSError as e:
+            print(f"{self.name}: could not write profile: {e}", file=sys.stderr)
+            return
+        shares = ", ".join(f"{name} {c['share']:.0%}" for name, c in summary["categories"].items())
+        print(f"{self.name}: profile written to {summary['collapsed_file']} ({shares})", file=sys.stderr)
+
+    async def _watch_profile_signal(self) -> None:
+        signum = getattr(signal, "SIGUSR2", None)
+        if signum is None:
+            return
+        seconds = _env_number("MCP_PROFILE_SECONDS", DEFAULT_PROFILE_SECONDS, float)
+        try:
+            with anyio.open_signal_receiver(signum) as signals:
+                async for _ in signals:
+                    try:
+                        self.profiler.start(seconds, on_finish=self._write_signal_profile)
+                        print(f"{self.name}: profiling for {seconds:g}s", file=sys.stderr)
+                    except (RuntimeError, ValueError) as e:
+                        print(f"{self.name}: {e}", file=sys.stderr)
+        except NotImplementedError:
+            return
+
+    # -- metrics ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "server": self.name,
+            "uptime_s": round(time.time() - self._started, 3),
+            "max_workers": self._executor._max_workers if self._executor else self.max_workers,
+            "in_flight": self._in_flight,
+            "draining": self._draining,
+            "profiler": self.profiler.snapshot(),
+            "tools": {name: {"max_concurrency": self._limits[name], **stats.snapshot()}
+                      for name, stats in self._stats.items()},
+        }
+
+    def _stats_resource(self):
+        runtime = self
+
+        def runtime_stats() -> str:
+            """Per-tool call counts, latency percentiles and concurrency for this server (JSON)"""
+            return json.dumps(runtime.snapshot(), indent=2)
+
+        return runtime_stats
+
+    # -- shutdown -----------------------------------------------------------------
+
+    def _enter(self) -> None:
+        self._in_flight += 1
+        if self._idle is not None:
+            self._idle.clear()
+
+    def _leave(self) -> None:
+        self._in_flight -= 1
+        if self._in_flight == 0 and self._idle is not None:
+            self._idle.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Reject new calls and wait for in-flight calls; returns False on timeout"""
+        self._draining = True
+        if self._in_flight == 0:
+            return True
+        self._idle = asyncio.Event()
+        if self._in_flight == 0:
+            return True
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout if timeout is None else timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _watch_signals(self, scope: anyio.CancelScope) -> None:
+        try:
+            with anyio.open_signal_receiver(signal.SIGTERM, signal.SIGINT) as signals:
+                async for signum in signals:
+                    print(f"{self.name}: received signal {signum}, draining {self._in_flight} in-flight call(s)",
+                          file=sys.stderr)
+                    if not await self.drain():
+                        print(f"{self.name}: drain timed out after {self.drain_timeout}s", file=sys.stderr)
+                    await anyio.sleep(DRAIN_FLUSH_DELAY)
+                    scope.cancel()
+                    return
+        except NotImplementedError:
+            # Windows: no signal receiver, Ctrl+C still stops the server via KeyboardInterrupt
+            return
+
+    async def serve(self, transport: str = "stdio") -> None:
+        """Run the server until the transport closes or a shutdown signal has been drained"""
+        runners = {
+            "stdio": self.mcp.run_stdio_async,
+            "sse": self.mcp.run_sse_async,
+            "streamable-http": self.mcp.run_streamable_http_async,
+        }
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(self._watch_signals, tg.cancel_scope)
+                tg.start_soon(self._watch_profile_signal)
+                await runners[transport]()
+                tg.cancel_scope.cancel()
+        finally:
+            self.shutdown()
+
+    def run(self, transport: str = "stdio") -> None:
+        """Synchronous entry point, replaces mcp.run(); handles --profile-startup"""
+        if "--profile-startup" in sys.argv:
+            print_startup_profile(profile_startup(sys.argv[0]))
+            return
+        anyio.run(self.serve, transport)
+
+    def shutdown(self) -> None:
+        """Finish running blocking work and drop queued work"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output into [{module, self_ms, cumulative_ms, depth}] in import order"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            self_ms, cumulative_ms = int(self_us) / 1000, int(cumulative_us) / 1000
+        except ValueError:
+            continue  # the header line
+        module = name.lstrip()
+        modules.append({"module": module, "self_ms": self_ms, "cumulative_ms": cumulative_ms,
+                        "depth": (len(name) - len(module) - 1) // 2})
+    return modules
+
+
+def profile_startup(server_path: str, timeout: float = STARTUP_TIMEOUT,
+                    top: int = STARTUP_TOP_MODULES) -> Dict[str, Any]:
+    """Start a server over stdio under `-X importtime` and time it until tools/list is answered
+
+    Returns initialize_ms (spawn -> initialize response), ready_ms (spawn -> tools/list
+    response), the number of tools, the total import time and the slowest modules by
+    cumulative and self time. Raises RuntimeError if the server exits or times out.
+    """
+    from mcp.types import LATEST_PROTOCOL_VERSION
+
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-X", "importtime", str(server_path)],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    stderr_lines: List[bytes] = []
+    responses: Queue = Queue()
+
+    def read_stdout():
+        for line in proc.stdout:
+            responses.put(line)
+        responses.put(None)
+
+    # Both pipes are drained in threads: importtime output alone can fill the stderr pipe
+    threading.Thread(target=read_stdout, daemon=True).start()
+    stderr_reader = threading.Thread(target=lambda: stderr_lines.extend(proc.stderr), daemon=True)
+    stderr_reader.start()
+
+    def send(message: Dict[str, Any]) -> None:
+        proc.stdin.write((json.dumps({"jsonrpc": "2.0", **message}) + "\n").encode("utf-8"))
+        proc.stdin.flush()
+
+    def wait_for(request_id: int) -> Dict[str, Any]:
+        deadline = started + timeout
+        while True:
+            try:
+                line = responses.get(timeout=max(deadline - time.perf_counter(), 0))
+            except Empty:
+                raise RuntimeError(f"{server_path}: no response within {timeout}s") from None
+            if line is None:
+                raise RuntimeError(f"{server_path}: server exited before responding "
+                                   f"(stderr: {b''.join(stderr_lines[-5:]).decode(errors='replace').strip()})")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue  # not a JSON-RPC line
+            if message.get("id") == request_id:
+                return message
+
+    try:
+        send({"id": 1, "method": "initialize", "params": {
+            "protocolVersion": LATEST_PROTOCOL_VERSION, "capabilities": {},
+            "clientInfo": {"name": "startup-profiler", "version": "1.0"}}})
+        wait_for(1)
+        initialize_ms = (time.perf_counter() - started) * 1000
+        send({"method": "notifications/initialized"})
+        send({"id": 2, "method": "tools/list"})
+        tools = wait_for(2).get("result", {}).get("tools", [])
+        ready_ms = (time.perf_counter() - started) * 1000
+    finally:
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        stderr_reader.join(timeout=5)
+
+    modules = parse_importtime(b"".join(stderr_lines).decode("utf-8", errors="replace"))
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for entry in modules:
+        by_name.setdefault(entry["module"], entry)
+    rank = lambda key: [{"module": m["module"], "self_ms": round(m["self_ms"], 1),
+                         "cumulative_ms": round(m["cumulative_ms"], 1)}
+                        for m in sorted(by_name.values(), key=lambda m: m[key], reverse=True)[:top]]
+    return {
+        "server": str(server_path),
+        "initialize_ms": round(initialize_ms, 1),
+        "ready_ms": round(ready_ms, 1),
+        "tools": len(tools),
+        "import_ms": round(sum(m["cumulative_ms"] for m in modules if m["depth"] == 0), 1),
+        "top_cumulative": rank("cumulative_ms"),
+        "top_self": rank("self_ms"),
+    }
+
+
+def summarize_startup(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median timings over several profile_startup runs; module lists come from the median run"""
+    median_run = sorted(runs, key=lambda r: r["ready_ms"])[len(runs) // 2]
+    return {
+        **median_run,
+        "runs": len(runs),
+        "ready_ms": round(statistics.median(r["ready_ms"] for r in runs), 1),
+        "initialize_ms": round(statistics.median(r["initialize_ms"] for r in runs), 1),
+        "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+    }
+
+
+def print_startup_profile(profile: Dict[str, Any]) -> None:
+    print(f"Startup profile: {profile['server']}")
+    print(f"  initialize answered: {profile['initialize_ms']:8.1f} ms")
+    print(f"  tools/list answered: {profile['ready_ms']:8.1f} ms ({profile['tools']} tools)")
+    print(f"  imports (total):     {profile['import_ms']:8.1f} ms")
+    for title, key in (("Slowest imports (cumulative)", "top_cumulative"), ("Slowest imports (self)", "top_self")):
+        print(f"\n{title}:")
+        for entry in profile[key]:
+            print(f"  {entry['cumulative_ms']:8.1f} ms cumulative {entry['self_ms']:8.1f} ms self  {entry['module']}")
@@ -2,13 +2,29 @@
 """
 OpenAI 命令行对话程序 (使用官方SDK) - 修复版
 支持连续对话和流式输出
+
+导入 SDK、创建客户端和建立连接都在后台线程中进行，与显示欢迎信息、等待输入同时完成；
+SDK 的 httpx 连接池保持这条连接，第一轮对话直接复用。设置了 SYSTEM_PROMPT 时
+预热请求使用系统提示词，之后的对话可命中服务端的前缀缓存（OpenAI 要求前缀至少 1024 个 token）。
+各阶段耗时输出到 stderr（SHOW_TIMINGS = False 关闭）。
+
+支持工具调用: TOOL_SERVERS 中的 MCP 服务（GitHub、SSH、测试用例生成）在后台线程中
+直接加载到本进程（tool_hub.py，不经过 stdio 传输），工具以 function calling 的形式提供给模型；
+默认不加载任何服务（TOOL_SERVERS = []），需要时自行开启。只读工具（列出仓库、远程目录等）
+一轮中的多个调用并发执行，每个调用完成后立即输出结果；其他工具（执行远程脚本、上传下载文件、
+生成测试用例等）逐个执行，执行前显示工具名和完整参数并询问 y/N，AUTO_APPROVE_TOOLS 中的除外。
 """
 
+import functools
+import importlib.util
 import sys
+import threading
+import time
+from concurrent.futures import Future
 
-try:
-    from openai import OpenAI
-except ImportError:
+from tool_hub import Timings, accumulate_tool_call_deltas, chat_turn, start_tool_hub
+
+if importlib.util.find_spec("openai") is None:
     print("错误: 请先安装 OpenAI SDK")
     print("运行: pip install openai")
     sys.exit(1)
@@ -16,34 +32,117 @@ except ImportError:
 # OpenAI API配置
 API_KEY = "your-api-key-here"  # 请替换为你的API密钥
 MODEL = "gpt-4o-mini"  # 可选: gpt-4o, gpt-4o-mini, gpt-3.5-turbo 等
+BASE_URL = None  # 可选: 兼容 OpenAI 接口的服务地址，None 表示官方地址
+
+# 可选: 系统提示词，每轮对话都作为第一条消息发送
+SYSTEM_PROMPT = ""
+# 启动时用系统提示词发送一次 max_tokens=1 的请求预热前缀缓存；否则只请求模型列表来建立连接
+PRIME_CACHE = True
+# 在 stderr 输出导入、连接、预热、首 token 等阶段的耗时
+SHOW_TIMINGS = True
+# 在本进程中加载的 MCP 服务，工具提供给模型调用，可选 "github"、"ssh"、"gen-testcase"；[] 表示不使用工具
+TOOL_SERVERS = []
+# 无需确认即可执行的非只读工具（fnmatch 模式，如 "gen_testcase__*"）；只读工具始终直接执行
+AUTO_APPROVE_TOOLS = []
+# 每轮对话中模型最多连续请求几次工具调用，超过后要求模型直接回答
+MAX_TOOL_ROUNDS = 8
+# 工具结果在终端中显示的最大字符数（发给模型的是完整结果）
+TOOL_PREVIEW_CHARS = 200
+
+timings = Timings(SHOW_TIMINGS)
+
 
+def build_client():
+    """导入 SDK、创建客户端并预热连接（在后台线程中执行）"""
+    started = time.perf_counter()
+    from openai import OpenAI
+    timings.record("导入 openai", time.perf_counter() - started)
 
-def stream_chat(client, messages):
-    """发送请求并流式接收响应"""
+    client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+    warm_started = time.perf_counter()
     try:
+        if SYSTEM_PROMPT and PRIME_CACHE:
+            client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "你好"}],
+                max_tokens=1
+            )
+            timings.record("前缀缓存预热请求", time.perf_counter() - warm_started)
+        else:
+            # 任何请求都会让 httpx 连接池留下一条已完成 TLS 握手的连接
+            client.with_options(max_retries=0).models.list()
+            timings.record("预热连接", time.perf_counter() - warm_started)
+    except Exception as e:
+        timings.note(f"预热失败（不影响对话）: {e}")
+    timings.record("后台预热完成", time.perf_counter() - started)
+    return client
+
+
+def start_client():
+    """在后台线程中创建客户端，返回 Future"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(build_client())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+    return future
+
+
+def initial_messages():
+    return [{"role": "system", "content": SYSTEM_PROMPT}] if SYSTEM_PROMPT else []
+
+
+def stream_chat(client, messages, tools=None, tool_calls=None):
+    """发送请求并流式接收响应，逐段返回回复内容
+
+    传入 tools（function calling 格式）时模型可以请求工具调用，
+    流中的 tool_calls 增量合并到 tool_calls 字典（按 index）中；请求中途失败或响应不完整
+    （没有 finish_reason）时清空 tool_calls，避免执行参数不完整的工具调用。
+    """
+    try:
+        options = {"tools": tools} if tools else {}
         stream = client.chat.completions.create(
             model=MODEL,
             messages=messages,
-            stream=True
+            stream=True,
+            **options
         )
         
-        assistant_reply = ""
+        finished = False
         for chunk in stream:
+            if not chunk.choices:
+                continue
+            finished = finished or bool(chunk.choices[0].finish_reason)
+            if tool_calls is not None and chunk.choices[0].delta.tool_calls:
+                accumulate_tool_call_deltas(tool_calls, chunk.choices[0].delta.tool_calls)
             # 检查 delta 是否存在以及是否有 content
             if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
                 content = chunk.choices[0].delta.content
                 print(content, end='', flush=True)
-                assistant_reply += content
-        
-        return assistant_reply
+                yield content
+        # 流提前结束时 SDK 不一定报错，没有收到 finish_reason 就不执行工具调用
+        if tool_calls and not finished:
+            tool_calls.clear()
+            print("\n错误: 响应不完整，已忽略其中的工具调用", file=sys.stderr)
                 
     except Exception as e:
+        if tool_calls is not None:
+            tool_calls.clear()
         print(f"\n错误: {str(e)}", file=sys.stderr)
-        return ""
 
 
 def main():
     """主程序"""
+    # 显示欢迎信息、等待输入的同时在后台创建客户端
+    client_future = start_client()
+    client = None
+    hub_future = start_tool_hub(TOOL_SERVERS, AUTO_APPROVE_TOOLS, timings)
+    hub = None
+
     print("=" * 50)
     print(f"OpenAI 对话程序 (模型: {MODEL})")
     print("=" * 50)
@@ -52,11 +151,8 @@ def main():
     print("=" * 50)
     print()
     
-    # 初始化客户端
-    client = OpenAI(api_key=API_KEY)
-    
     # 对话历史
-    messages = []
+    messages = initial_messages()
     
     while True:
         try:
@@ -72,24 +168,46 @@ def main():
                 break
             
             if user_input.lower() == 'clear':
-                messages = []
+                messages = initial_messages()
                 print("对话历史已清空\n")
                 continue
             
             # 添加用户消息
             messages.append({"role": "user", "content": user_input})
             
+            # 第一轮对话时取后台创建好的客户端（未完成时等待）
+            # 创建失败时直接退出：SDK 未安装或配置错误，之后每轮都会同样失败
+            if client is None:
+                started = time.perf_counter()
+                try:
+                    client = client_future.result()
+                except Exception as e:
+                    print(f"错误: 创建 OpenAI 客户端失败: {e}", file=sys.stderr)
+                    sys.exit(1)
+                timings.record("等待客户端就绪", time.perf_counter() - started)
+            
+            # 同样取后台加载好的工具；加载失败时不使用工具继续对话
+            if hub is None and hub_future is not None:
+                started = time.perf_counter()
+                try:
+                    hub = hub_future.result()
+                except Exception as e:
+                    print(f"工具加载失败，本次不使用工具: {e}", file=sys.stderr)
+                hub_future = None
+                timings.record("等待工具就绪", time.perf_counter() - started)
+            
             # 显示AI回复
+            timings.flush()
             print("AI: ", end='', flush=True)
             
-            # 获取AI回复
-            assistant_reply = stream_chat(client, messages)
+            # 获取AI回复（添加到历史由 chat_turn 完成，包括工具调用和结果）
+            started = time.perf_counter()
+            chat_turn(functools.partial(stream_chat, client), messages, hub, timings,
+                      MAX_TOOL_ROUNDS, TOOL_PREVIEW_CHARS)
             
             print()  # 换行
-            
-            # 添加AI回复到历史
-            if assistant_reply:
-                messages.append({"role": "assistant", "content": assistant_reply})
+            timings.record("本轮总计", time.perf_counter() - started)
+            timings.flush()
             
             print()  # 空行分隔
             
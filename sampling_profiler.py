@@ -0,0 +1,293 @@
+"""
+On-demand sampling profiler for the MCP demo servers
+
+Nothing runs until a profile is started (mcp_runtime exposes this as the
+profile_server tool and on SIGUSR2). While a profile runs, a daemon thread
+wakes every `interval` seconds, takes sys._current_frames() and records the
+Python stack of every other thread (at most every MIN_INTERVAL seconds).
+When it stops, the samples are written as:
+
+- <name>-<timestamp>-<pid>-<n>.collapsed: one "frame;frame;...;leaf count"
+  line per distinct stack, rooted at the (normalized) thread name; feed it to
+  flamegraph.pl, speedscope or inferno
+- <name>-<timestamp>-<pid>-<n>.json: the summary returned by Profile.summary()
+
+<n> counts the profiles of the process, so profiles started within the same
+second do not overwrite each other.
+
+Each sample is classified by its stack: "subprocess" (inside the subprocess
+module, e.g. curl or ssh.exe), "ssh" (paramiko frames: a tool waiting for a
+channel or SFTP reply), "http" (http.client, urllib, httpx, ...), "idle" (a
+thread parked in a selector, queue or lock wait with none of the above on its
+stack, and paramiko's transport threads waiting for the next packet) or "cpu"
+(everything else, which includes waits in C code the sampler cannot see).
+Times are thread-seconds: two threads blocked for one second count two.
+"""
+
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.005
+# Shorter intervals are raised to this: below it the sampler thread would starve the GIL
+MIN_INTERVAL = 0.001
+MAX_DURATION = 600.0
+MAX_DEPTH = 128
+DEFAULT_TOP = 20
+
+# Module prefixes that mark a stack as blocked in external I/O (checked leaf first)
+IO_CATEGORIES = (
+    ("subprocess", ("subprocess", "asyncio.subprocess", "asyncio.base_subprocess")),
+    ("ssh", ("paramiko",)),
+    ("http", ("http.client", "urllib.request", "urllib3", "requests", "httpx", "httpcore", "aiohttp")),
+)
+# Leaf frames of a thread that is waiting for work
+_IDLE_LEAVES = {
+    ("selectors", None),
+    ("threading", "Condition.wait"),
+    ("threading", "Event.wait"),
+    ("threading", "Thread.join"),
+    ("threading", "Thread._wait_for_tstate_lock"),
+    ("queue", "Queue.get"),
+    ("concurrent.futures.thread", "_worker"),
+    ("anyio._backends._asyncio", "WorkerThread.run"),
+    ("asyncio.base_events", "BaseEventLoop.run_forever"),
+    ("socket", "socket.accept"),
+}
+# Thread / event loop machinery under every stack; left out of the cumulative ranking
+_PLUMBING_MODULES = ("threading", "concurrent.futures", "asyncio.runners", "asyncio.base_events",
+                     "asyncio.events", "anyio._core", "anyio._backends")
+# paramiko's per-connection reader thread blocks here between packets even when no tool is waiting
+_PARAMIKO_READS = {("paramiko.packet", "Packetizer.read_all"), ("paramiko.packet", "Packetizer._read_timeout")}
+
+_profile_numbers = itertools.count(1)
+
+
+def _frame_key(frame) -> Tuple[str, str, str]:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or Path(code.co_filename).stem
+    return module, getattr(code, "co_qualname", code.co_name), f"{Path(code.co_filename).name}:{code.co_firstlineno}"
+
+
+def _is_plumbing(module: str) -> bool:
+    return any(module == prefix or module.startswith(prefix + ".") for prefix in _PLUMBING_MODULES)
+
+
+def _thread_label(name: str) -> str:
+    """Merge pool threads: 'srv-worker_3' -> 'srv-worker', 'Thread-7 (run)' -> 'Thread (run)'"""
+    name = re.sub(r"_\d+$", "", name)
+    return re.sub(r"^(Thread|Dummy)-\d+", r"\1", name).replace(";", ",")
+
+
+def classify(stack: List[Tuple[str, str, str]]) -> str:
+    """Category of one sampled stack (root first)"""
+    if stack and stack[-1][:2] in _PARAMIKO_READS \
+            and any(frame[:2] == ("paramiko.transport", "Transport.run") for frame in stack[:4]):
+        return "idle"
+    for module, _, _ in reversed(stack):
+        for category, prefixes in IO_CATEGORIES:
+            if any(module == prefix or module.startswith(prefix + ".") for prefix in prefixes):
+                return category
+    if stack:
+        module, function, _ = stack[-1]
+        if (module, None) in _IDLE_LEAVES or (module, function) in _IDLE_LEAVES:
+            return "idle"
+    return "cpu"
+
+
+class Profile:
+    """One sampling run; started by SamplingProfiler.start()"""
+
+    def __init__(self, name: str, duration: float, interval: float,
+                 on_finish: Optional[Callable[["Profile"], None]] = None):
+        self.name = name
+        self.number = next(_profile_numbers)
+        self.duration = min(max(duration, interval), MAX_DURATION)
+        self.interval = interval
+        self.on_finish = on_finish
+        self.started_at = time.time()
+        self.elapsed = 0.0
+        self.cpu_s = 0.0  # CPU time used by the sampler thread itself
+        self.ticks = 0
+        self.error: Optional[str] = None
+        # (thread label, stack) -> [samples, thread-seconds]
+        self._stacks: Dict[Tuple[str, tuple], List[float]] = {}
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-profiler", daemon=True)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        # Per-tick work is kept to dict lookups: frame keys are built once per code object
+        keys: Dict[Any, Tuple[str, str, str]] = {}
+        names: Dict[int, str] = {}
+        start = last = time.perf_counter()
+        deadline = start + self.duration
+        try:
+            while not self._stop.wait(self.interval):
+                now = time.perf_counter()
+                # Weight each sample by the real time since the previous tick (sleep overshoot included)
+                weight, last = now - last, now
+                frames = sys._current_frames()
+                if not names.keys() >= frames.keys():
+                    names = {thread.ident: _thread_label(thread.name) for thread in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < MAX_DEPTH:
+                        key = keys.get(frame.f_code)
+                        if key is None:
+                            key = keys[frame.f_code] = _frame_key(frame)
+                        stack.append(key)
+                        frame = frame.f_back
+                    stack.reverse()
+                    key = (names.get(ident) or f"thread-{ident}", tuple(stack))
+                    entry = self._stacks.get(key)
+                    if entry is None:
+                        self._stacks[key] = [1, weight]
+                    else:
+                        entry[0] += 1
+                        entry[1] += weight
+                self.ticks += 1
+                if now >= deadline:
+                    break
+        except Exception as e:  # never let the sampler take the server down
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self.cpu_s = time.thread_time()
+            self._done.set()
+            if self.on_finish is not None:
+                self.on_finish(self)
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def collapsed(self) -> List[str]:
+        """Flamegraph lines ("thread;frame;...;leaf samples"), heaviest first"""
+        lines = []
+        for (thread, stack), (samples, _) in sorted(self._stacks.items(), key=lambda item: -item[1][0]):
+            frames = [f"{module}.{function}".replace(";", ",") for module, function, _ in stack]
+            lines.append(f"{';'.join([thread, *frames])} {int(samples)}")
+        return lines
+
+    def summary(self, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+        """Per-category thread time and the top functions outside idle waits"""
+        categories: Dict[str, List[float]] = {}
+        threads = Counter()
+        own, total = Counter(), Counter()
+        own_s, total_s = Counter(), Counter()
+        function_category: Dict[str, Counter] = {}
+        for (thread, stack), (samples, seconds) in self._stacks.items():
+            category = classify(list(stack))
+            bucket = categories.setdefault(category, [0, 0.0])
+            bucket[0] += samples
+            bucket[1] += seconds
+            threads[thread] += samples
+            if category == "idle" or not stack:
+                continue
+            labels = [f"{module}.{function} ({location})" for module, function, location in stack]
+            own[labels[-1]] += samples
+            own_s[labels[-1]] += seconds
+            cumulative = {label for label, (module, _, _) in zip(labels, stack) if not _is_plumbing(module)}
+            for label in cumulative:
+                total[label] += samples
+                total_s[label] += seconds
+            for label in cumulative | {labels[-1]}:
+                function_category.setdefault(label, Counter())[category] += samples
+
+        thread_seconds = sum(seconds for _, seconds in categories.values()) or 1.0
+
+        def rows(counter: Counter, seconds: Counter) -> List[Dict[str, Any]]:
+            return [{"function": label, "samples": int(samples), "seconds": round(seconds[label], 3),
+                     "category": function_category[label].most_common(1)[0][0]}
+                    for label, samples in counter.most_common(top)]
+
+        return {
+            "server": self.name,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "duration_s": round(self.elapsed, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "ticks": self.ticks,
+            "sampler_cpu_s": round(self.cpu_s, 3),
+            "samples": int(sum(samples for samples, _ in categories.values())),
+            "error": self.error,
+            "categories": {name: {"samples": int(samples), "seconds": round(seconds, 3),
+                                  "share": round(seconds / thread_seconds, 3)}
+                           for name, (samples, seconds) in sorted(categories.items(), key=lambda c: -c[1][1])},
+            "threads": dict(threads.most_common()),
+            "top_self": rows(own, own_s),
+            "top_cumulative": rows(total, total_s),
+        }
+
+    def write(self, output_dir: os.PathLike, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+        """Write the .collapsed and .json files; returns the summary with their paths"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{re.sub(r'[^A-Za-z0-9_.-]+', '-', self.name)}-" \
+               f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}-{os.getpid()}-{self.number}"
+        collapsed, report = output_dir / f"{stem}.collapsed", output_dir / f"{stem}.json"
+        summary = self.summary(top)
+        summary["collapsed_file"] = str(collapsed)
+        summary["summary_file"] = str(report)
+        collapsed.write_text("\n".join(self.collapsed()) + "\n", encoding="utf-8")
+        report.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        return summary
+
+
+class SamplingProfiler:
+    """Starts at most one Profile at a time for a server"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.profiles = 0
+        self.last_summary: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._current: Optional[Profile] = None
+
+    def start(self, duration: float, interval: float = DEFAULT_INTERVAL,
+              on_finish: Optional[Callable[[Profile], None]] = None) -> Profile:
+        """Start sampling for `duration` seconds; RuntimeError if a profile is already running
+
+        interval is raised to MIN_INTERVAL if it is shorter.
+        """
+        if not (interval > 0 and duration > 0):
+            raise ValueError("duration and interval must be positive")
+        interval = max(interval, MIN_INTERVAL)
+        with self._lock:
+            if self._current is not None and self._current.running:
+                raise RuntimeError(f"a profile of {self.name} is already running")
+            profile = self._current = Profile(self.name, duration, interval, on_finish)
+            self.profiles += 1
+        profile._thread.start()
+        return profile
+
+    def write(self, profile: Profile, output_dir: os.PathLike, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+        """Profile.write(), remembering the summary for snapshot()"""
+        summary = profile.write(output_dir, top)
+        self.last_summary = summary
+        return summary
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            current = self._current
+        return {
+            "running": current is not None and current.running,
+            "profiles": self.profiles,
+            "last_collapsed_file": (self.last_summary or {}).get("collapsed_file"),
+        }
@@ -0,0 +1,297 @@
+"""
+Persistent remote helper agent for batched metadata operations
+
+Recursive walks, existence checks and listings over SFTP cost one or more
+network round trips per path. When `remote_agent` is enabled in config.json,
+the server instead starts remote_agent_program.py on the host over one exec
+channel of a dedicated, long-lived SSH connection and sends it batched
+requests (bulk stat, filtered recursive listing, hashing, mkdir); a whole
+tree walk is then a single round trip.
+
+- The program is uploaded once per host: a small bootstrap (python3 -c)
+  looks for ~/.cache/ssh-mcp-demo/agent-<sha256 prefix>.py and asks for the
+  source over the channel only when it is missing (or cannot be cached).
+- Frames are a 4-byte big-endian length followed by a UTF-8 JSON body.
+- One session per host, reused across tool calls; requests on a session are
+  serialized. Idle sessions are closed after `remote_agent_idle_timeout`.
+- If the agent cannot start (no python3, exec refused, ...) the host is
+  marked unavailable for UNAVAILABLE_RETRY seconds and callers fall back to
+  plain SFTP; a session that fails mid-request is dropped the same way.
+- A request that only timed out (no byte of its response read yet) leaves
+  the session in place while the agent is alive: the caller falls back for
+  that call, and the late response is skipped by the next request. Requests
+  can pass their own timeout; hashing scales it with the file size
+  (hash_timeout()).
+
+paramiko is not imported here; connections come from the server's connect callback.
+"""
+import hashlib
+import json
+import shlex
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROGRAM_FILE = Path(__file__).parent / "remote_agent_program.py"
+DEFAULT_PYTHON = "python3"
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_IDLE_TIMEOUT = 300.0
+# Seconds before a host where the agent failed to start is tried again
+UNAVAILABLE_RETRY = 300.0
+MAX_FRAME = 64 * 1024 * 1024
+# Slowest hashing rate (bytes/s) assumed when scaling the timeout of a hash request
+MIN_HASH_RATE = 20 * 1024 * 1024
+
+# Runs on the remote host: exec the cached agent, or receive it over stdin first
+_BOOTSTRAP = """\
+import os, struct, sys
+i, o = sys.stdin.buffer, sys.stdout.buffer
+p = os.path.join(os.path.expanduser("~"), ".cache", "ssh-mcp-demo", "agent-%s.py" % sys.argv[1])
+def frame(b):
+    o.write(struct.pack(">I", len(b)) + b)
+    o.flush()
+if os.path.isfile(p):
+    frame(b'{"need":false}')
+    s = open(p, "rb").read()
+else:
+    frame(b'{"need":true}')
+    s = i.read(struct.unpack(">I", i.read(4))[0])
+    try:
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        t = "%s.%d" % (p, os.getpid())
+        with open(t, "wb") as f:
+            f.write(s)
+        os.replace(t, p)
+    except OSError:
+        pass
+exec(compile(s, p, "exec"), {"__name__": "__main__"})
+"""
+
+
+class RemoteAgentError(Exception):
+    """The agent could not be started or the session broke"""
+
+
+class RemoteAgentTimeout(RemoteAgentError):
+    """A request timed out before any of its response arrived; the session is still in sync"""
+
+
+def hash_timeout(size: int, timeout: float = DEFAULT_TIMEOUT) -> float:
+    """Timeout for hashing `size` bytes on the agent: the base timeout plus the time at MIN_HASH_RATE"""
+    return timeout + size / MIN_HASH_RATE
+
+
+def _program() -> Tuple[bytes, str]:
+    source = PROGRAM_FILE.read_bytes()
+    return source, hashlib.sha256(source).hexdigest()[:16]
+
+
+def _encode(message: Any) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return struct.pack(">I", len(body)) + body
+
+
+class AgentSession:
+    """One running agent: an SSH connection owned by the session plus its exec channel"""
+
+    def __init__(self, client, channel, info: Dict[str, Any], timeout: float = DEFAULT_TIMEOUT):
+        self.client = client
+        self.channel = channel
+        self.info = info
+        self.timeout = timeout
+        self.last_used = time.monotonic()
+        self.requests = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # Ids of timed-out requests whose responses are still to come
+        self._abandoned = set()
+
+    @classmethod
+    def start(cls, client, python: str = DEFAULT_PYTHON, timeout: float = DEFAULT_TIMEOUT) -> "AgentSession":
+        """Start the agent on an SSH connection (which the session then owns)"""
+        source, digest = _program()
+        channel = client.get_transport().open_session()
+        channel.settimeout(timeout)
+        channel.exec_command(f"{python} -c {shlex.quote(_BOOTSTRAP)} {digest}")
+        session = cls(client, channel, {}, timeout)
+        try:
+            hello = session._read()
+            if hello.get("need"):
+                channel.sendall(struct.pack(">I", len(source)) + source)
+            ready = session._read()
+            if "ready" not in ready:
+                raise RemoteAgentError(f"unexpected greeting from agent: {ready}")
+            session.info = {"version": ready["ready"], "python": ready.get("python"),
+                            "uploaded": bool(hello.get("need"))}
+        except BaseException:
+            session.close()
+            raise
+        return session
+
+    def _recv_exact(self, size: int, frame_start: bool = False) -> bytes:
+        chunks = []
+        while size:
+            try:
+                data = self.channel.recv(min(size, 1024 * 1024))
+            except socket.timeout:
+                if frame_start and not chunks:
+                    raise RemoteAgentTimeout("timed out waiting for the agent") from None
+                raise RemoteAgentError("timed out in the middle of an agent frame") from None
+            if not data:
+                stderr = b""
+                while self.channel.recv_stderr_ready():
+                    stderr += self.channel.recv_stderr(4096)
+                detail = stderr.decode("utf-8", "replace").strip()
+                raise RemoteAgentError(f"agent exited{': ' + detail if detail else ''}")
+            chunks.append(data)
+            size -= len(data)
+        return b"".join(chunks)
+
+    def _read(self) -> Dict[str, Any]:
+        size = struct.unpack(">I", self._recv_exact(4, frame_start=True))[0]
+        if size > MAX_FRAME:
+            raise RemoteAgentError(f"agent frame too large ({size} bytes)")
+        return json.loads(self._recv_exact(size).decode("utf-8"))
+
+    def request(self, ops: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[Any]:
+        """Send a batch of ops in one frame; returns one result per op
+
+        timeout (default: the session's) bounds the wait for each response frame,
+        including late responses to earlier timed-out requests that are skipped.
+        """
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self.channel.sendall(_encode({"id": request_id, "ops": ops}))
+            self.channel.settimeout(timeout or self.timeout)
+            try:
+                while True:
+                    response = self._read()
+                    if response.get("id") not in self._abandoned:
+                        break
+                    self._abandoned.discard(response.get("id"))
+            except RemoteAgentTimeout:
+                self._abandoned.add(request_id)
+                self.timeouts += 1
+                raise
+            finally:
+                self.channel.settimeout(self.timeout)
+            if response.get("id") != request_id:
+                raise RemoteAgentError(f"response id {response.get('id')} does not match request {request_id}")
+            self.requests += 1
+            self.last_used = time.monotonic()
+            return response["results"]
+
+    @property
+    def alive(self) -> bool:
+        transport = self.client.get_transport()
+        return (transport is not None and transport.is_active() and not self.channel.closed
+                and not self.channel.exit_status_ready())
+
+    def close(self) -> None:
+        for closable in (self.channel, self.client):
+            try:
+                closable.close()
+            except Exception:
+                pass
+
+
+class RemoteAgentPool:
+    """Agent sessions per host key, with a negative cache for hosts where the agent cannot run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[tuple, AgentSession] = {}
+        self._starting: Dict[tuple, threading.Lock] = {}
+        self._unavailable: Dict[tuple, Tuple[float, str]] = {}
+        self.fallbacks = 0
+
+    def _sweep(self, idle_timeout: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, s in self._sessions.items() if now - s.last_used > idle_timeout]
+            closing = [self._sessions.pop(key) for key in idle]
+        for session in closing:
+            session.close()
+
+    def session(self, host_key: tuple, connect: Callable[[], Any], python: str = DEFAULT_PYTHON,
+                timeout: float = DEFAULT_TIMEOUT, idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> Optional[AgentSession]:
+        """The host's running session, starting one if needed; None if the agent is unavailable there"""
+        self._sweep(idle_timeout)
+        with self._lock:
+            unavailable = self._unavailable.get(host_key)
+            if unavailable is not None and time.monotonic() < unavailable[0]:
+                return None
+            starting = self._starting.setdefault(host_key, threading.Lock())
+        # Concurrent callers for the same host wait for one start instead of racing
+        with starting:
+            with self._lock:
+                session = self._sessions.get(host_key)
+            if session is not None and session.alive:
+                return session
+            if session is not None:
+                self.drop(host_key, session)
+            client = None
+            try:
+                client = connect()
+                session = AgentSession.start(client, python, timeout)
+            except Exception as e:
+                if client is not None:
+                    client.close()
+                with self._lock:
+                    self._unavailable[host_key] = (time.monotonic() + UNAVAILABLE_RETRY, f"{type(e).__name__}: {e}")
+                return None
+            with self._lock:
+                self._sessions[host_key] = session
+                self._unavailable.pop(host_key, None)
+            return session
+
+    def request(self, host_key: tuple, connect: Callable[[], Any], ops: List[Dict[str, Any]],
+                request_timeout: Optional[float] = None, **options: Any) -> Optional[List[Any]]:
+        """Run ops on the host's agent; None means "use SFTP instead" (agent unavailable, busy or session broke)"""
+        session = self.session(host_key, connect, **options)
+        if session is None:
+            self.fallbacks += 1
+            return None
+        try:
+            return session.request(ops, request_timeout)
+        except RemoteAgentTimeout:
+            # Still in sync: keep the session unless the agent died meanwhile
+            if not session.alive:
+                self.drop(host_key, session)
+            self.fallbacks += 1
+            return None
+        except Exception:
+            # Unknown protocol state (timeout, closed channel, bad frame): start afresh next time
+            self.drop(host_key, session)
+            self.fallbacks += 1
+            return None
+
+    def drop(self, host_key: tuple, session: AgentSession) -> None:
+        with self._lock:
+            if self._sessions.get(host_key) is session:
+                del self._sessions[host_key]
+        session.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "sessions": {f"{key[2]}@{key[0]}:{key[1]}": {**s.info, "requests": s.requests,
+                                                            "timeouts": s.timeouts,
+                                                            "idle_s": round(now - s.last_used, 1)}
+                             for key, s in self._sessions.items()},
+                "unavailable": {f"{key[2]}@{key[0]}:{key[1]}": reason
+                                for key, (until, reason) in self._unavailable.items() if now < until},
+                "fallbacks": self.fallbacks,
+            }
@@ -0,0 +1,188 @@
+"""
+Helper program run on remote hosts by ssh-mcp-demo (see remote_agent.py)
+
+Started once per host over an exec channel and kept running; answers
+metadata requests so that walking or stat-ing many remote paths costs one
+round trip instead of one (or more) per path. Standard library only, runs on
+Python 3.6+.
+
+Every message in both directions is a frame: a 4-byte big-endian length
+followed by a UTF-8 JSON body.
+
+    request:  {"id": 7, "ops": [{"op": "stat", "paths": [...]}, {"op": "hash", ...}]}
+    response: {"id": 7, "results": [<one result per op>]}
+
+A failing op yields {"error": "..."} in its slot; the other ops still run.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import stat
+import struct
+import sys
+
+VERSION = 1
+MAX_FRAME = 64 * 1024 * 1024
+HASH_BLOCK = 1024 * 1024
+
+
+def read_frame(stream):
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    size = struct.unpack(">I", header)[0]
+    if size > MAX_FRAME:
+        raise ValueError("frame too large: %d bytes" % size)
+    body = stream.read(size)
+    if len(body) < size:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def write_frame(stream, message):
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    stream.write(struct.pack(">I", len(body)) + body)
+    stream.flush()
+
+
+def _type(mode):
+    if stat.S_ISDIR(mode):
+        return "dir"
+    if stat.S_ISLNK(mode):
+        return "link"
+    if stat.S_ISREG(mode):
+        return "file"
+    return "other"
+
+
+def _entry(name, st):
+    """Same fields as the server's SFTP listing entries"""
+    return {"name": name, "type": _type(st.st_mode), "size": st.st_size, "mtime": int(st.st_mtime),
+            "mode": stat.filemode(st.st_mode)}
+
+
+def _error(e):
+    return "%s: %s" % (type(e).__name__, e)
+
+
+def op_stat(paths):
+    """stat() each path (following symlinks, like sftp.stat)"""
+    results = []
+    for path in paths:
+        try:
+            entry = _entry(os.path.basename(path.rstrip("/")) or path, os.stat(path))
+            entry.update(path=path, exists=True)
+        except FileNotFoundError:
+            entry = {"path": path, "exists": False}
+        except OSError as e:
+            entry = {"path": path, "error": _error(e)}
+        results.append(entry)
+    return results
+
+
+def _wanted(name, extensions, pattern):
+    if extensions:
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in extensions:
+            return False
+    return not pattern or fnmatch.fnmatch(name, pattern)
+
+
+def op_list(path, recursive=False, extensions=None, pattern=None, max_entries=None):
+    """List a directory (optionally recursively) without following symlinks
+
+    extensions / pattern filter files only; directories are always listed so
+    the caller can recreate the tree. Entries are in pre-order, sorted by name
+    within each directory, with "path" relative to `path`.
+    """
+    st = os.stat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        return {"path": path, "type": _type(st.st_mode), "entry": _entry(os.path.basename(path), st)}
+
+    extensions = [e.lower() if e.startswith(".") else "." + e.lower() for e in extensions or []]
+    entries, errors = [], []
+    truncated = False
+    stack = [""]
+    while stack and not truncated:
+        relative = stack.pop()
+        directory = os.path.join(path, relative) if relative else path
+        try:
+            with os.scandir(directory) as it:
+                children = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            errors.append({"path": relative or ".", "error": _error(e)})
+            continue
+        subdirs = []
+        for child in children:
+            try:
+                child_st = child.stat(follow_symlinks=False)
+            except OSError as e:
+                errors.append({"path": relative + "/" + child.name if relative else child.name,
+                               "error": _error(e)})
+                continue
+            is_dir = stat.S_ISDIR(child_st.st_mode)
+            if not is_dir and not _wanted(child.name, extensions, pattern):
+                continue
+            entry = _entry(child.name, child_st)
+            entry["path"] = relative + "/" + child.name if relative else child.name
+            entries.append(entry)
+            if is_dir and recursive:
+                subdirs.append(entry["path"])
+            if max_entries and len(entries) >= max_entries:
+                truncated = True
+                break
+        # Reverse so the stack pops subdirectories in name order (pre-order output)
+        stack.extend(reversed(subdirs))
+    return {"path": path, "type": "dir", "entries": entries, "errors": errors, "truncated": truncated}
+
+
+def op_hash(paths, algorithm="sha256"):
+    """Digest of each file, read in 1 MiB blocks"""
+    results = []
+    for path in paths:
+        try:
+            digest = hashlib.new(algorithm)
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                    digest.update(block)
+            results.append({"path": path, algorithm: digest.hexdigest()})
+        except (OSError, ValueError) as e:
+            results.append({"path": path, "error": _error(e)})
+    return results
+
+
+def op_mkdir(path, parents=False):
+    """Create a directory if missing; {"created": bool}"""
+    if os.path.isdir(path):
+        return {"path": path, "created": False}
+    if parents:
+        os.makedirs(path, exist_ok=True)
+    else:
+        os.mkdir(path)
+    return {"path": path, "created": True}
+
+
+OPS = {"stat": op_stat, "list": op_list, "hash": op_hash, "mkdir": op_mkdir}
+
+
+def main():
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    write_frame(stdout, {"ready": VERSION, "python": sys.version.split()[0]})
+    while True:
+        request = read_frame(stdin)
+        if request is None:
+            break
+        results = []
+        for op in request.get("ops", []):
+            op = dict(op)
+            handler = OPS.get(op.pop("op", None))
+            try:
+                results.append(handler(**op) if handler else {"error": "unknown op"})
+            except Exception as e:
+                results.append({"error": _error(e)})
+        write_frame(stdout, {"id": request.get("id"), "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,40 @@
 """
 SSH MCP Server - Upload files and execute remote scripts via SSH
 """
+from __future__ import annotations
+
 import os
+import sys
 import json
+import asyncio
+import contextvars
+import fnmatch
+import functools
+import posixpath
+import stat
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
-import paramiko
-from mcp.server.fastmcp import FastMCP
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from mcp.server.fastmcp import Context, FastMCP
+
+from fast_upload import UploadTuning, pipelined_upload, remote_sha256
+from remote_agent import DEFAULT_IDLE_TIMEOUT, DEFAULT_PYTHON, DEFAULT_TIMEOUT, RemoteAgentPool, hash_timeout
+from telemetry import metrics
+
+if TYPE_CHECKING:
+    # paramiko (and its crypto stack) is imported on the first connection, not at startup
+    import paramiko
+
+# Shared MCP runtime (mcp_runtime.py at the repository root)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from mcp_runtime import MCPRuntime
 
 # Initialize FastMCP server
 mcp = FastMCP("SSH File Transfer Server")
+runtime = MCPRuntime(mcp)
 
 # Load configuration
 CONFIG_FILE = Path(__file__).parent / "config.json"
@@ -22,10 +47,136 @@ def load_config() -> dict:
             return json.load(f)
     return {}
 
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_MAX_CONCURRENCY_PER_HOST = 4
+
+class SSHJobCancelled(Exception):
+    """Raised inside a worker thread when its tool call has been cancelled"""
+
+class SSHJob:
+    """Tracks the SSH clients opened by one tool call so it can be cancelled
+
+    Blocking paramiko calls cannot be interrupted directly; cancelling a job
+    closes its clients, which makes the I/O in the worker thread fail fast.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: List[paramiko.SSHClient] = []
+        self.cancelled = False
+
+    def track(self, client: paramiko.SSHClient) -> None:
+        with self._lock:
+            if not self.cancelled:
+                self._clients.append(client)
+                return
+        client.close()
+        raise SSHJobCancelled("Tool call was cancelled")
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+
+_current_job: contextvars.ContextVar[Optional[SSHJob]] = contextvars.ContextVar("ssh_job", default=None)
+
+_host_semaphores: Dict[Tuple[str, int, str], asyncio.Semaphore] = {}
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the runtime's worker pool for blocking SSH I/O, sized by max_workers on first use"""
+    return runtime.get_executor(load_config().get('max_workers', DEFAULT_MAX_WORKERS))
+
+def _host_semaphore(host_key: tuple) -> asyncio.Semaphore:
+    semaphore = _host_semaphores.get(host_key)
+    if semaphore is None:
+        limit = load_config().get('max_concurrency_per_host', DEFAULT_MAX_CONCURRENCY_PER_HOST)
+        semaphore = _host_semaphores[host_key] = asyncio.Semaphore(max(int(limit), 1))
+    return semaphore
+
+async def run_ssh_job(func: Callable[..., Any], **kwargs) -> Any:
+    """
+    Run a blocking SSH function on the worker pool without blocking the event loop
+
+    At most max_concurrency_per_host jobs run against the same host at once.
+    If the awaiting task is cancelled, the job's SSH clients are closed and the
+    host slot is released only once the worker thread has actually finished.
+    """
+    config = load_config()
+    host_key = _host_key(kwargs.get('host') or config.get('host') or '',
+                         kwargs.get('port') or config.get('port', 22),
+                         kwargs.get('username') or config.get('username') or '')
+    label = _host_label(host_key[0], host_key[1])
+    semaphore = _host_semaphore(host_key)
+    with metrics.span(label, "queue_wait"):
+        await semaphore.acquire()
+
+    job = SSHJob()
+    context = contextvars.copy_context()
+    context.run(_current_job.set, job)
+    tool_name = func.__name__.strip('_').replace('_sync', '')
+    started = time.perf_counter()
+    metrics.enter(label)
+    try:
+        future = asyncio.get_running_loop().run_in_executor(
+            _get_executor(), functools.partial(context.run, func, **kwargs))
+    except BaseException:
+        metrics.leave(label)
+        semaphore.release()
+        raise
+
+    def _finished(_):
+        metrics.leave(label)
+        metrics.record(label, f"tool:{tool_name}", time.perf_counter() - started)
+        semaphore.release()
+
+    future.add_done_callback(_finished)
+
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        job.cancel()
+        raise
+
+def _host_label(host: str, port: int) -> str:
+    """Host name used in metrics"""
+    return f"{host}:{port}"
+
+@functools.lru_cache(maxsize=None)
+def _timed_client_class() -> type:
+    """SSHClient subclass recording handshake/auth spans; built on first use so paramiko loads lazily"""
+    import paramiko
+
+    class _TimedSSHClient(paramiko.SSHClient):
+        """SSHClient that records handshake (TCP connect + key exchange) and auth spans"""
+
+        def connect(self, hostname, port=22, *args, **kwargs):
+            self._span_host = _host_label(hostname, port)
+            self._connect_started = time.perf_counter()
+            return super().connect(hostname, port, *args, **kwargs)
+
+        def _auth(self, *args, **kwargs):
+            auth_started = time.perf_counter()
+            metrics.record(self._span_host, "handshake", auth_started - self._connect_started)
+            try:
+                return super()._auth(*args, **kwargs)
+            finally:
+                metrics.record(self._span_host, "auth", time.perf_counter() - auth_started)
+
+    return _TimedSSHClient
+
 def get_ssh_client(host: str, port: int, username: str, password: Optional[str] = None,
-                   key_file: Optional[str] = None) -> paramiko.SSHClient:
-    """Create and return an SSH client connection"""
-    client = paramiko.SSHClient()
+                   key_file: Optional[str] = None, track: bool = True) -> paramiko.SSHClient:
+    """Create and return an SSH client connection
+
+    With track=False the client is not tied to the running tool call (used for
+    long-lived connections such as the remote agent's, which cancelling one
+    call must not close).
+    """
+    import paramiko
+
+    client = _timed_client_class()()
     client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
     if key_file and os.path.exists(key_file):
@@ -33,32 +184,263 @@ def get_ssh_client(host: str, port: int, username: str, password: Optional[str]
     else:
         client.connect(hostname=host, port=port, username=username, password=password)
 
+    # Register with the running tool call so cancellation can close it
+    job = _current_job.get() if track else None
+    if job is not None:
+        job.track(client)
+
     return client
 
-@mcp.tool()
-def upload_file(
+PROGRESS_INTERVAL = 0.25
+
+def open_sftp(client: paramiko.SSHClient, host: str, port: int) -> paramiko.SFTPClient:
+    """Open an SFTP channel, recording a channel_open span"""
+    with metrics.span(_host_label(host, port), "channel_open", channel="sftp"):
+        return client.open_sftp()
+
+def run_command(client: paramiko.SSHClient, host: str, port: int, command: str) -> Tuple[str, str, int]:
+    """Execute a command and return (stdout, stderr, exit_code), recording channel_open and exec spans"""
+    label = _host_label(host, port)
+    with metrics.span(label, "channel_open", channel="exec"):
+        channel = client.get_transport().open_session()
+    with metrics.span(label, "exec"):
+        channel.exec_command(command)
+        stdout = channel.makefile('r')
+        stderr = channel.makefile_stderr('r')
+        output = stdout.read().decode('utf-8')
+        error = stderr.read().decode('utf-8')
+        exit_code = channel.recv_exit_status()
+    return output, error, exit_code
+
+def timed_put(sftp: paramiko.SFTPClient, host: str, port: int, local_file: str, remote_file: str,
+              progress: Optional[Callable[[int, int], None]] = None) -> None:
+    """sftp.put with an upload span (bytes/sec) and optional progress callback"""
+    with metrics.span(_host_label(host, port), "upload", path=remote_file) as info:
+        attrs = sftp.put(local_file, remote_file, callback=progress)
+        info["bytes"] = attrs.st_size if attrs.st_size is not None else os.path.getsize(local_file)
+
+def timed_pipelined_put(client: paramiko.SSHClient, host: str, port: int, local_file: str, remote_file: str,
+                        tuning: UploadTuning, progress: Optional[Callable[[int, int], None]] = None,
+                        remote_hash: Optional[Callable[[str, int], Optional[str]]] = None) -> str:
+    """Pipelined upload for large files with an upload span; returns a summary, verifying the checksum if asked
+
+    remote_hash(remote_file, size), if given, is tried first for the remote sha256
+    (e.g. the remote agent); sha256sum/shasum over an exec channel is the fallback.
+    """
+    started = time.perf_counter()
+    with metrics.span(_host_label(host, port), "upload", path=remote_file, mode="pipelined",
+                      channels=tuning.channels) as info:
+        result = pipelined_upload(client, local_file, remote_file, tuning, progress)
+        info["bytes"] = result["bytes"]
+    elapsed = time.perf_counter() - started
+    rate = result["bytes"] / elapsed / 1e6 if elapsed > 0 else 0.0
+    summary = (f"{result['bytes']} bytes in {elapsed:.1f}s, {rate:.1f} MB/s, "
+               f"{result['channels']} channel(s), pipeline depth {tuning.pipeline_depth}")
+
+    if result["sha256"] is not None:
+        remote = remote_hash(remote_file, result["bytes"]) if remote_hash is not None else None
+        if remote is None:
+            remote = remote_sha256(lambda command: run_command(client, host, port, command), remote_file)
+        if remote is None:
+            summary += "; checksum not verified (sha256sum/shasum unavailable on remote host)"
+        elif remote != result["sha256"]:
+            raise IOError(f"checksum mismatch for '{remote_file}': local sha256 {result['sha256']}, "
+                          f"remote {remote}")
+        else:
+            summary += f"; sha256 verified ({remote})"
+    return summary
+
+def timed_get(sftp: paramiko.SFTPClient, host: str, port: int, remote_file: str, local_file: str,
+              progress: Optional[Callable[[int, int], None]] = None) -> None:
+    """sftp.get with a download span (bytes/sec) and optional progress callback"""
+    with metrics.span(_host_label(host, port), "download", path=remote_file) as info:
+        sftp.get(remote_file, local_file, callback=progress)
+        info["bytes"] = os.path.getsize(local_file)
+
+def progress_forwarder(ctx: Optional[Context], label: str) -> Optional[Callable[[int, int], None]]:
+    """
+    Build an SFTP callback that forwards transfer progress to the MCP client
+
+    The callback runs on a worker thread, so notifications are scheduled on
+    the event loop. Updates are throttled to one per PROGRESS_INTERVAL.
+    """
+    if ctx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    last_sent = [0.0]
+
+    def forward(transferred: int, total: Optional[int]) -> None:
+        now = time.monotonic()
+        if (total is None or transferred < total) and now - last_sent[0] < PROGRESS_INTERVAL:
+            return
+        last_sent[0] = now
+        message = f"{label}: {transferred}/{total} bytes" if total else f"{label}: {transferred} bytes"
+        asyncio.run_coroutine_threadsafe(ctx.report_progress(transferred, total, message), loop)
+
+    return forward
+
+class _CumulativeProgress:
+    """Turns per-file SFTP callbacks into one running byte count across files"""
+
+    def __init__(self, forward: Callable[[int, Optional[int]], None]):
+        self._forward = forward
+        self._completed = 0
+
+    def __call__(self, transferred: int, total: int) -> None:
+        self._forward(self._completed + transferred, None)
+        if transferred >= total:
+            self._completed += total
+
+DEFAULT_LISTING_CACHE_TTL = 30
+# Listings kept over all hosts; the least recently used are dropped beyond this
+DEFAULT_LISTING_CACHE_SIZE = 256
+
+class RemoteListingCache:
+    """Per-host cache of remote directory listings (sftp.listdir_attr results)
+
+    Entries expire after a TTL and are invalidated by this server's own
+    uploads and script executions, so repeated exploration of the same remote
+    tree is answered without a network round trip. Expired listings are
+    dropped on get/put, and at most max_entries listings are kept (LRU).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_LISTING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (host_key, directory) -> (stored_at, entries), least recently used first
+        self._listings: "OrderedDict[Tuple[tuple, str], Tuple[float, List[dict]]]" = OrderedDict()
+        # TTL of the latest get(); put() drops listings older than this
+        self._ttl: float = DEFAULT_LISTING_CACHE_TTL
+
+    @staticmethod
+    def _normalize(remote_dir: str) -> str:
+        return posixpath.normpath(remote_dir.replace('\\', '/'))
+
+    def get(self, host_key: tuple, remote_dir: str, ttl: float) -> Optional[Tuple[float, List[dict]]]:
+        """Return (age_seconds, entries) for a fresh listing, or None"""
+        key = (host_key, self._normalize(remote_dir))
+        with self._lock:
+            self._ttl = ttl
+            cached = self._listings.get(key)
+            if cached is None:
+                return None
+            age = time.monotonic() - cached[0]
+            if age > ttl:
+                del self._listings[key]
+                return None
+            self._listings.move_to_end(key)
+        return age, cached[1]
+
+    def put(self, host_key: tuple, remote_dir: str, entries: List[dict]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (stored, _) in self._listings.items() if now - stored > self._ttl]:
+                del self._listings[key]
+            key = (host_key, self._normalize(remote_dir))
+            self._listings[key] = (now, entries)
+            self._listings.move_to_end(key)
+            while len(self._listings) > self.max_entries:
+                self._listings.popitem(last=False)
+
+    def invalidate(self, host_key: tuple, remote_dir: str) -> None:
+        """Drop the listing of remote_dir and of its parent directory"""
+        remote_dir = self._normalize(remote_dir)
+        with self._lock:
+            self._listings.pop((host_key, remote_dir), None)
+            self._listings.pop((host_key, posixpath.dirname(remote_dir)), None)
+
+    def invalidate_host(self, host_key: tuple) -> None:
+        with self._lock:
+            for key in [k for k in self._listings if k[0] == host_key]:
+                del self._listings[key]
+
+listing_cache = RemoteListingCache()
+
+def _host_key(host: str, port: int, username: str) -> tuple:
+    return (host, int(port), username)
+
+def _entry_from_attr(attr: paramiko.SFTPAttributes) -> dict:
+    """Convert an SFTPAttributes object into a typed listing entry"""
+    mode = attr.st_mode or 0
+    if stat.S_ISDIR(mode):
+        entry_type = "dir"
+    elif stat.S_ISLNK(mode):
+        entry_type = "link"
+    elif stat.S_ISREG(mode):
+        entry_type = "file"
+    else:
+        entry_type = "other"
+    return {
+        "name": attr.filename,
+        "type": entry_type,
+        "size": attr.st_size,
+        "mtime": attr.st_mtime,
+        "mode": stat.filemode(mode),
+    }
+
+def _cache_listing(host_key: tuple, remote_dir: str, attrs: List[paramiko.SFTPAttributes]) -> List[dict]:
+    """Store a fresh listdir_attr result in the listing cache and return its entries"""
+    entries = sorted((_entry_from_attr(a) for a in attrs), key=lambda e: e["name"])
+    listing_cache.put(host_key, remote_dir, entries)
+    return entries
+
+remote_agents = RemoteAgentPool()
+
+def agent_request(config: dict, host: str, port: int, username: str, password: Optional[str],
+                  key_file: Optional[str], ops: List[Dict[str, Any]],
+                  timeout: Optional[float] = None) -> Optional[List[Any]]:
+    """
+    Run a batch of ops on the host's remote agent (remote_agent.py) in one round trip
+
+    Returns one result per op, or None when remote_agent is disabled in
+    config.json or the agent cannot run on the host; callers then use SFTP.
+    timeout overrides remote_agent_timeout for this request.
+    """
+    if not config.get('remote_agent', False):
+        return None
+    started = time.perf_counter()
+    results = remote_agents.request(
+        _host_key(host, port, username),
+        lambda: get_ssh_client(host, port, username, password, key_file, track=False),
+        ops,
+        request_timeout=timeout,
+        python=config.get('remote_agent_python', DEFAULT_PYTHON),
+        timeout=config.get('remote_agent_timeout', DEFAULT_TIMEOUT),
+        idle_timeout=config.get('remote_agent_idle_timeout', DEFAULT_IDLE_TIMEOUT),
+    )
+    if results is not None:
+        metrics.record(_host_label(host, port), "agent_request", time.perf_counter() - started,
+                       ops=[op["op"] for op in ops])
+    return results
+
+def _agent_sha256(config: dict, host: str, port: int, username: str, password: Optional[str],
+                  key_file: Optional[str]) -> Callable[[str], Optional[str]]:
+    """remote_hash callback for timed_pipelined_put backed by the remote agent"""
+    def remote_hash(remote_file: str, size: int) -> Optional[str]:
+        # Hashing a multi-GB file takes far longer than a metadata request
+        timeout = hash_timeout(size, config.get('remote_agent_timeout', DEFAULT_TIMEOUT))
+        results = agent_request(config, host, port, username, password, key_file,
+                                [{"op": "hash", "paths": [remote_file]}], timeout)
+        if results is None or not isinstance(results[0], list):
+            return None
+        return results[0][0].get("sha256")
+    return remote_hash
+
+def _upload_file_sync(
     local_file: str,
     remote_dir: Optional[str] = None,
     host: Optional[str] = None,
     port: Optional[int] = None,
     username: Optional[str] = None,
     password: Optional[str] = None,
-    key_file: Optional[str] = None
+    key_file: Optional[str] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    large_file: Optional[dict] = None
 ) -> str:
-    """
-    Upload a local file to a remote server via SSH/SFTP
-
-    Args:
-        local_file: Path to the local file to upload
-        remote_dir: Remote directory path (uses config.json default_remote_dir if not provided)
-        host: SSH host (uses config.json if not provided)
-        port: SSH port (uses config.json if not provided)
-        username: SSH username (uses config.json if not provided)
-        password: SSH password (optional, uses config.json if not provided)
-        key_file: Path to SSH private key file (optional)
+    """Blocking implementation of upload_file and upload_large_file (runs on the SSH worker pool)
 
-    Returns:
-        Success message with remote file path
+    Files of at least large_file_threshold bytes, or any file when large_file
+    (UploadTuning overrides) is given, use the pipelined upload path.
     """
     try:
         # Load config for missing parameters
@@ -83,50 +465,137 @@ def upload_file(
 
         # Connect via SSH
         client = get_ssh_client(host, port, username, password, key_file)
-        sftp = client.open_sftp()
-
-        # Create remote directory if it doesn't exist
-        try:
-            sftp.stat(remote_dir)
-        except FileNotFoundError:
-            # Try to create the directory
-            sftp.mkdir(remote_dir)
+        sftp = open_sftp(client, host, port)
+
+        # Create remote directory if it doesn't exist (via the remote agent when enabled)
+        checked = agent_request(config, host, port, username, password, key_file,
+                                [{"op": "mkdir", "path": remote_dir}])
+        if checked is None or "error" in checked[0]:
+            try:
+                sftp.stat(remote_dir)
+            except FileNotFoundError:
+                # Try to create the directory
+                sftp.mkdir(remote_dir)
 
         # Upload file
-        sftp.put(local_file, remote_file)
-        sftp.close()
+        tuning = UploadTuning.from_config(config, **(large_file or {}))
+        if large_file is not None or os.path.getsize(local_file) >= tuning.threshold:
+            sftp.close()
+            remote_hash = _agent_sha256(config, host, port, username, password, key_file)
+            details = f" ({timed_pipelined_put(client, host, port, local_file, remote_file, tuning, progress, remote_hash)})"
+        else:
+            timed_put(sftp, host, port, local_file, remote_file, progress)
+            sftp.close()
+            details = ""
         client.close()
 
-        return f"Successfully uploaded '{local_file}' to '{remote_file}' on {host}"
+        listing_cache.invalidate(_host_key(host, port, username), remote_dir)
+
+        return f"Successfully uploaded '{local_file}' to '{remote_file}' on {host}{details}"
 
     except Exception as e:
         return f"Error uploading file: {str(e)}"
 
-@mcp.tool()
-def execute_remote_script(
-    script_path: Optional[str] = None,
+@runtime.tool()
+async def upload_file(
+    local_file: str,
+    remote_dir: Optional[str] = None,
     host: Optional[str] = None,
     port: Optional[int] = None,
     username: Optional[str] = None,
     password: Optional[str] = None,
     key_file: Optional[str] = None,
-    args: Optional[str] = None
+    ctx: Optional[Context] = None
 ) -> str:
     """
-    Execute a script on the remote server via SSH
+    Upload a local file to a remote server via SSH/SFTP
 
     Args:
-        script_path: Path to the script on the remote server (uses config.json default_script if not provided)
+        local_file: Path to the local file to upload
+        remote_dir: Remote directory path (uses config.json default_remote_dir if not provided)
         host: SSH host (uses config.json if not provided)
         port: SSH port (uses config.json if not provided)
         username: SSH username (uses config.json if not provided)
         password: SSH password (optional, uses config.json if not provided)
         key_file: Path to SSH private key file (optional)
-        args: Optional arguments to pass to the script
 
     Returns:
-        Script execution output
+        Success message with remote file path
+    """
+    return await run_ssh_job(
+        _upload_file_sync,
+        local_file=local_file,
+        remote_dir=remote_dir,
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        key_file=key_file,
+        progress=progress_forwarder(ctx, os.path.basename(local_file))
+    )
+
+@runtime.tool()
+async def upload_large_file(
+    local_file: str,
+    remote_dir: Optional[str] = None,
+    channels: Optional[int] = None,
+    pipeline_depth: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    verify: bool = True,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> str:
+    """
+    Upload a large file with pipelined SFTP writes, optionally over parallel channels
+
+    upload_file switches to this path by itself for files of at least
+    large_file_threshold bytes (config.json); use this tool to choose the
+    settings per call or to verify the upload.
+
+    Args:
+        local_file: Path to the local file to upload
+        remote_dir: Remote directory path (uses config.json default_remote_dir if not provided)
+        channels: Parallel SFTP channels, each writing one range of the file (config.json upload_channels, default 1)
+        pipeline_depth: Write requests kept in flight per channel (config.json upload_pipeline_depth, default 64)
+        chunk_size: Bytes per write request, at most 261120 (config.json upload_chunk_size, default 131072)
+        verify: Compare the local sha256 with sha256sum on the remote host after the upload
+        host: SSH host (uses config.json if not provided)
+        port: SSH port (uses config.json if not provided)
+        username: SSH username (uses config.json if not provided)
+        password: SSH password (optional, uses config.json if not provided)
+        key_file: Path to SSH private key file (optional)
+
+    Returns:
+        Success message with the remote path, throughput and verification result
     """
+    return await run_ssh_job(
+        _upload_file_sync,
+        local_file=local_file,
+        remote_dir=remote_dir,
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        key_file=key_file,
+        progress=progress_forwarder(ctx, os.path.basename(local_file)),
+        large_file={"channels": channels, "pipeline_depth": pipeline_depth, "chunk_size": chunk_size,
+                    "verify": verify}
+    )
+
+def _execute_remote_script_sync(
+    script_path: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None,
+    args: Optional[str] = None
+) -> str:
+    """Blocking implementation of execute_remote_script (runs on the SSH worker pool)"""
     try:
         # Load config for missing parameters
         config = load_config()
@@ -155,15 +624,13 @@ def execute_remote_script(
 
         # Connect via SSH and execute
         client = get_ssh_client(host, port, username, password, key_file)
-        stdin, stdout, stderr = client.exec_command(command)
-
-        # Get output
-        output = stdout.read().decode('utf-8')
-        error = stderr.read().decode('utf-8')
-        exit_code = stdout.channel.recv_exit_status()
+        output, error, exit_code = run_command(client, host, port, command)
 
         client.close()
 
+        # The script may have changed anything on the remote host
+        listing_cache.invalidate_host(_host_key(host, port, username))
+
         # Format result
         result = f"=== Script Execution Results ===\n"
         result += f"Command: {command}\n"
@@ -183,8 +650,44 @@ def execute_remote_script(
     except Exception as e:
         return f"Error executing script: {str(e)}"
 
-@mcp.tool()
-def upload_and_execute(
+@runtime.tool()
+async def execute_remote_script(
+    script_path: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None,
+    args: Optional[str] = None
+) -> str:
+    """
+    Execute a script on the remote server via SSH
+
+    Args:
+        script_path: Path to the script on the remote server (uses config.json default_script if not provided)
+        host: SSH host (uses config.json if not provided)
+        port: SSH port (uses config.json if not provided)
+        username: SSH username (uses config.json if not provided)
+        password: SSH password (optional, uses config.json if not provided)
+        key_file: Path to SSH private key file (optional)
+        args: Optional arguments to pass to the script
+
+    Returns:
+        Script execution output
+    """
+    return await run_ssh_job(
+        _execute_remote_script_sync,
+        script_path=script_path,
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        key_file=key_file,
+        args=args
+    )
+
+@runtime.tool()
+async def upload_and_execute(
     local_file: str,
     remote_dir: Optional[str] = None,
     script_path: Optional[str] = None,
@@ -193,7 +696,8 @@ def upload_and_execute(
     username: Optional[str] = None,
     password: Optional[str] = None,
     key_file: Optional[str] = None,
-    script_args: Optional[str] = None
+    script_args: Optional[str] = None,
+    ctx: Optional[Context] = None
 ) -> str:
     """
     Upload a file and execute a remote script in one operation
@@ -213,21 +717,22 @@ def upload_and_execute(
         Combined result of upload and script execution
     """
     # First, upload the file
-    upload_result = upload_file(
+    upload_result = await upload_file(
         local_file=local_file,
         remote_dir=remote_dir,
         host=host,
         port=port,
         username=username,
         password=password,
-        key_file=key_file
+        key_file=key_file,
+        ctx=ctx
     )
 
     if "Error" in upload_result:
         return upload_result
 
     # Then execute the script
-    exec_result = execute_remote_script(
+    exec_result = await execute_remote_script(
         script_path=script_path,
         host=host,
         port=port,
@@ -240,8 +745,42 @@ def upload_and_execute(
     # Combine results
     return f"{upload_result}\n\n{exec_result}"
 
-@mcp.tool()
-def list_remote_directory(
+def _list_remote_directory_sync(
+    remote_dir: str,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None
+) -> str:
+    """Blocking implementation of list_remote_directory (runs on the SSH worker pool)"""
+    try:
+        # Load config for missing parameters
+        config = load_config()
+        host = host or config.get('host')
+        port = port or config.get('port', 22)
+        username = username or config.get('username')
+        password = password or config.get('password')
+        key_file = key_file or config.get('key_file')
+
+        if not all([host, username, remote_dir]):
+            return "Error: Missing required parameters (host, username, remote_dir)"
+
+        # Connect via SSH
+        client = get_ssh_client(host, port, username, password, key_file)
+        output, error, _ = run_command(client, host, port, f"ls -lah {remote_dir}")
+        client.close()
+
+        if error:
+            return f"Error: {error}"
+
+        return f"Contents of {remote_dir} on {host}:\n\n{output}"
+
+    except Exception as e:
+        return f"Error listing directory: {str(e)}"
+
+@runtime.tool()
+async def list_remote_directory(
     remote_dir: str,
     host: Optional[str] = None,
     port: Optional[int] = None,
@@ -263,6 +802,29 @@ def list_remote_directory(
     Returns:
         Directory listing
     """
+    return await run_ssh_job(
+        _list_remote_directory_sync,
+        remote_dir=remote_dir,
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        key_file=key_file
+    )
+
+def _list_remote_entries_sync(
+    remote_dir: str,
+    pattern: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 200,
+    refresh: bool = False,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """Blocking implementation of list_remote_entries (runs on the SSH worker pool)"""
     try:
         # Load config for missing parameters
         config = load_config()
@@ -271,25 +833,195 @@ def list_remote_directory(
         username = username or config.get('username')
         password = password or config.get('password')
         key_file = key_file or config.get('key_file')
+        ttl = config.get('listing_cache_ttl', DEFAULT_LISTING_CACHE_TTL)
 
         if not all([host, username, remote_dir]):
-            return "Error: Missing required parameters (host, username, remote_dir)"
+            return {"error": "Missing required parameters (host, username, remote_dir)"}
 
-        # Connect via SSH
-        client = get_ssh_client(host, port, username, password, key_file)
-        stdin, stdout, stderr = client.exec_command(f"ls -lah {remote_dir}")
+        # Handle relative paths
+        if not remote_dir.startswith('/'):
+            default_remote_dir = config.get('default_remote_dir', '')
+            if default_remote_dir:
+                remote_dir = os.path.join(default_remote_dir, remote_dir).replace('\\', '/')
+
+        host_key = _host_key(host, port, username)
+        cached = None if refresh else listing_cache.get(host_key, remote_dir, ttl)
+
+        listing = None
+        if cached is None:
+            results = agent_request(config, host, port, username, password, key_file,
+                                    [{"op": "list", "path": remote_dir}])
+            listing = results[0] if results is not None else None
+            if listing is not None and "error" not in listing and listing["type"] != "dir":
+                listing = {"error": f"'{remote_dir}' is not a directory"}
+            if listing is not None and "error" in listing:
+                return {"error": f"Error listing directory: {listing['error']}"}
+
+        if cached is not None:
+            age, entries = cached
+        elif listing is not None:
+            entries = [{key: e[key] for key in ("name", "type", "size", "mtime", "mode")} for e in listing["entries"]]
+            listing_cache.put(host_key, remote_dir, entries)
+            age = 0.0
+        else:
+            client = get_ssh_client(host, port, username, password, key_file)
+            try:
+                sftp = open_sftp(client, host, port)
+                entries = _cache_listing(host_key, remote_dir, sftp.listdir_attr(remote_dir))
+                sftp.close()
+            finally:
+                client.close()
+            age = 0.0
+
+        if pattern:
+            entries = [e for e in entries if fnmatch.fnmatch(e["name"], pattern)]
+
+        offset = max(offset, 0)
+        limit = max(limit, 1)
+        page = entries[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(entries) else None
+
+        return {
+            "host": host,
+            "remote_dir": remote_dir,
+            "total": len(entries),
+            "offset": offset,
+            "next_offset": next_offset,
+            "cached": cached is not None,
+            "cache_age": round(age, 3),
+            "entries": page,
+        }
 
-        output = stdout.read().decode('utf-8')
-        error = stderr.read().decode('utf-8')
-        client.close()
+    except Exception as e:
+        return {"error": f"Error listing directory: {str(e)}"}
 
-        if error:
-            return f"Error: {error}"
+@runtime.tool()
+async def list_remote_entries(
+    remote_dir: str,
+    pattern: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 200,
+    refresh: bool = False,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    List a remote directory as structured entries (served from a per-host cache when fresh)
 
-        return f"Contents of {remote_dir} on {host}:\n\n{output}"
+    Args:
+        remote_dir: Remote directory path (can be absolute or relative to default_remote_dir)
+        pattern: Optional glob applied to entry names (e.g. '*.log')
+        offset: Index of the first entry to return
+        limit: Maximum number of entries to return
+        refresh: Bypass the listing cache and re-read the directory
+        host: SSH host (uses config.json if not provided)
+        port: SSH port (uses config.json if not provided)
+        username: SSH username (uses config.json if not provided)
+        password: SSH password (optional, uses config.json if not provided)
+        key_file: Path to SSH private key file (optional)
+
+    Returns:
+        Page of entries (name, type, size, mtime, mode) with pagination info
+    """
+    return await run_ssh_job(
+        _list_remote_entries_sync,
+        remote_dir=remote_dir,
+        pattern=pattern,
+        offset=offset,
+        limit=limit,
+        refresh=refresh,
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        key_file=key_file
+    )
+
+def _stat_remote_paths_sync(
+    paths: List[str],
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """Blocking implementation of stat_remote_paths (runs on the SSH worker pool)"""
+    try:
+        # Load config for missing parameters
+        config = load_config()
+        host = host or config.get('host')
+        port = port or config.get('port', 22)
+        username = username or config.get('username')
+        password = password or config.get('password')
+        key_file = key_file or config.get('key_file')
+
+        if not all([host, username]) or not paths:
+            return {"error": "Missing required parameters (host, username, paths)"}
+
+        results = agent_request(config, host, port, username, password, key_file,
+                                [{"op": "stat", "paths": paths}])
+        if results is not None and isinstance(results[0], list):
+            return {"host": host, "via": "agent", "results": results[0]}
+
+        client = get_ssh_client(host, port, username, password, key_file)
+        try:
+            sftp = open_sftp(client, host, port)
+            entries = []
+            for path in paths:
+                try:
+                    attr = sftp.stat(path)
+                    attr.filename = posixpath.basename(path.rstrip('/')) or path
+                    entries.append({**_entry_from_attr(attr), "path": path, "exists": True})
+                except FileNotFoundError:
+                    entries.append({"path": path, "exists": False})
+                except IOError as e:
+                    entries.append({"path": path, "error": str(e)})
+            sftp.close()
+        finally:
+            client.close()
+        return {"host": host, "via": "sftp", "results": entries}
 
     except Exception as e:
-        return f"Error listing directory: {str(e)}"
+        return {"error": f"Error reading file status: {str(e)}"}
+
+@runtime.tool()
+async def stat_remote_paths(
+    paths: List[str],
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Check existence, type, size and mtime of many remote paths in one call
+
+    Uses one request to the remote agent when remote_agent is enabled in
+    config.json, otherwise one SFTP stat per path over a single connection.
+
+    Args:
+        paths: Remote paths to check
+        host: SSH host (uses config.json if not provided)
+        port: SSH port (uses config.json if not provided)
+        username: SSH username (uses config.json if not provided)
+        password: SSH password (optional, uses config.json if not provided)
+        key_file: Path to SSH private key file (optional)
+
+    Returns:
+        One result per path: exists, plus name, type, size, mtime and mode when it exists
+    """
+    return await run_ssh_job(
+        _stat_remote_paths_sync,
+        paths=paths,
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        key_file=key_file
+    )
 
 def _should_download_file(filename: str, allowed_extensions: list) -> bool:
     """
@@ -308,7 +1040,8 @@ def _should_download_file(filename: str, allowed_extensions: list) -> bool:
     _, ext = os.path.splitext(filename)
     return ext.lower() in [e.lower() if e.startswith('.') else f'.{e.lower()}' for e in allowed_extensions]
 
-def _download_recursive(sftp, remote_path: str, local_path: str, allowed_extensions: list) -> list:
+def _download_recursive(sftp, remote_path: str, local_path: str, allowed_extensions: list,
+                        host_key: tuple, progress: Optional[Callable[[int, int], None]] = None) -> list:
     """
     Recursively download files from remote path to local path
 
@@ -317,6 +1050,8 @@ def _download_recursive(sftp, remote_path: str, local_path: str, allowed_extensi
         remote_path: Remote directory or file path
         local_path: Local directory or file path
         allowed_extensions: List of allowed file extensions
+        host_key: Listing cache key; directory listings read here refresh the cache
+        progress: Optional SFTP progress callback
 
     Returns:
         List of downloaded files
@@ -332,25 +1067,29 @@ def _download_recursive(sftp, remote_path: str, local_path: str, allowed_extensi
             if _should_download_file(remote_path, allowed_extensions):
                 # Create parent directory if needed
                 os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                sftp.get(remote_path, local_path)
+                timed_get(sftp, host_key[0], host_key[1], remote_path, local_path, progress)
                 downloaded_files.append(local_path)
             return downloaded_files
 
         # If it's a directory, recursively download
         os.makedirs(local_path, exist_ok=True)
 
-        for item in sftp.listdir_attr(remote_path):
+        items = sftp.listdir_attr(remote_path)
+        _cache_listing(host_key, remote_path, items)
+
+        for item in items:
             remote_item = os.path.join(remote_path, item.filename).replace('\\', '/')
             local_item = os.path.join(local_path, item.filename)
 
             # Check if item is a directory
             if item.st_mode & 0o040000:  # Is a directory
                 # Recursively download directory
-                downloaded_files.extend(_download_recursive(sftp, remote_item, local_item, allowed_extensions))
+                downloaded_files.extend(_download_recursive(sftp, remote_item, local_item, allowed_extensions,
+                                                           host_key, progress))
             else:
                 # Download file if it matches extension filter
                 if _should_download_file(item.filename, allowed_extensions):
-                    sftp.get(remote_item, local_item)
+                    timed_get(sftp, host_key[0], host_key[1], remote_item, local_item, progress)
                     downloaded_files.append(local_item)
 
         return downloaded_files
@@ -358,31 +1097,62 @@ def _download_recursive(sftp, remote_path: str, local_path: str, allowed_extensi
     except Exception as e:
         raise Exception(f"Error downloading from {remote_path}: {str(e)}")
 
-@mcp.tool()
-def download_file(
+def _download_listed(sftp, listing: dict, remote_path: str, local_path: str, allowed_extensions: list,
+                     host_key: tuple, progress: Optional[Callable[[int, int], None]] = None) -> list:
+    """
+    Download from remote_path using one recursive listing made by the remote agent
+
+    Same result as _download_recursive, which needs a stat and a listdir round
+    trip per directory; here the tree is known up front and only the file
+    transfers go over SFTP.
+    """
+    if "error" in listing:
+        raise Exception(f"Error downloading from {remote_path}: {listing['error']}")
+    downloaded_files = []
+
+    if listing["type"] != "dir":
+        if _should_download_file(remote_path, allowed_extensions):
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            timed_get(sftp, host_key[0], host_key[1], remote_path, local_path, progress)
+            downloaded_files.append(local_path)
+        return downloaded_files
+
+    if listing["errors"]:
+        error = listing["errors"][0]
+        raise Exception(f"Error downloading from {posixpath.join(remote_path, error['path'])}: {error['error']}")
+
+    os.makedirs(local_path, exist_ok=True)
+    # Without a filter the listing is complete, so it also refreshes the listing cache
+    listings: Optional[Dict[str, List[dict]]] = None if allowed_extensions else {remote_path: []}
+    for entry in listing["entries"]:
+        remote_item = posixpath.join(remote_path, entry["path"])
+        local_item = os.path.join(local_path, *entry["path"].split("/"))
+        if listings is not None:
+            listings.setdefault(posixpath.dirname(remote_item), []).append(
+                {key: entry[key] for key in ("name", "type", "size", "mtime", "mode")})
+        if entry["type"] == "dir":
+            os.makedirs(local_item, exist_ok=True)
+            if listings is not None:
+                listings.setdefault(remote_item, [])
+        elif _should_download_file(entry["name"], allowed_extensions):
+            timed_get(sftp, host_key[0], host_key[1], remote_item, local_item, progress)
+            downloaded_files.append(local_item)
+
+    for remote_dir, entries in (listings or {}).items():
+        listing_cache.put(host_key, remote_dir, entries)
+    return downloaded_files
+
+def _download_file_sync(
     remote_path: str,
     local_dir: Optional[str] = None,
     host: Optional[str] = None,
     port: Optional[int] = None,
     username: Optional[str] = None,
     password: Optional[str] = None,
-    key_file: Optional[str] = None
+    key_file: Optional[str] = None,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None
 ) -> str:
-    """
-    Download a file or directory from the remote server via SSH/SFTP
-
-    Args:
-        remote_path: Remote file or directory path (can be absolute or relative to default_remote_dir)
-        local_dir: Local directory to save downloaded files (uses config.json default_local_download_dir if not provided)
-        host: SSH host (uses config.json if not provided)
-        port: SSH port (uses config.json if not provided)
-        username: SSH username (uses config.json if not provided)
-        password: SSH password (optional, uses config.json if not provided)
-        key_file: Path to SSH private key file (optional)
-
-    Returns:
-        Success message with list of downloaded files
-    """
+    """Blocking implementation of download_file (runs on the SSH worker pool)"""
     try:
         # Load config for missing parameters
         config = load_config()
@@ -405,14 +1175,24 @@ def download_file(
 
         # Connect via SSH
         client = get_ssh_client(host, port, username, password, key_file)
-        sftp = client.open_sftp()
+        sftp = open_sftp(client, host, port)
 
         # Get the basename of remote path for local path
         remote_basename = os.path.basename(remote_path.rstrip('/'))
         local_path = os.path.join(local_dir, remote_basename)
 
-        # Download recursively
-        downloaded_files = _download_recursive(sftp, remote_path, local_path, allowed_extensions)
+        # Download recursively: one listing request to the remote agent when enabled, else a walk over SFTP
+        host_key = _host_key(host, port, username)
+        cumulative = _CumulativeProgress(progress) if progress else None
+        results = agent_request(config, host, port, username, password, key_file,
+                                [{"op": "list", "path": remote_path, "recursive": True,
+                                  "extensions": allowed_extensions}])
+        if results is not None:
+            downloaded_files = _download_listed(sftp, results[0], remote_path, local_path, allowed_extensions,
+                                                host_key, cumulative)
+        else:
+            downloaded_files = _download_recursive(sftp, remote_path, local_path, allowed_extensions,
+                                                   host_key, cumulative)
 
         sftp.close()
         client.close()
@@ -438,6 +1218,53 @@ def download_file(
     except Exception as e:
         return f"Error downloading file: {str(e)}"
 
+@runtime.tool()
+async def download_file(
+    remote_path: str,
+    local_dir: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    key_file: Optional[str] = None,
+    ctx: Optional[Context] = None
+) -> str:
+    """
+    Download a file or directory from the remote server via SSH/SFTP
+
+    Args:
+        remote_path: Remote file or directory path (can be absolute or relative to default_remote_dir)
+        local_dir: Local directory to save downloaded files (uses config.json default_local_download_dir if not provided)
+        host: SSH host (uses config.json if not provided)
+        port: SSH port (uses config.json if not provided)
+        username: SSH username (uses config.json if not provided)
+        password: SSH password (optional, uses config.json if not provided)
+        key_file: Path to SSH private key file (optional)
+
+    Returns:
+        Success message with list of downloaded files
+    """
+    return await run_ssh_job(
+        _download_file_sync,
+        remote_path=remote_path,
+        local_dir=local_dir,
+        host=host,
+        port=port,
+        username=username,
+        password=password,
+        key_file=key_file,
+        progress=progress_forwarder(ctx, "download")
+    )
+
+@mcp.resource("metrics://ssh")
+def get_ssh_metrics() -> str:
+    """Cumulative per-host span metrics (handshake, auth, channel_open, upload, download, exec, queue_wait,
+    agent_request, tool calls) and the remote agent sessions"""
+    return json.dumps({**metrics.snapshot(), "remote_agents": remote_agents.snapshot()}, indent=2)
+
 if __name__ == "__main__":
     # Run the MCP server
-    mcp.run()
+    try:
+        runtime.run()
+    finally:
+        remote_agents.close_all()
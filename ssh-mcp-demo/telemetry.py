@@ -0,0 +1,94 @@
+"""
+Span recording and cumulative per-host metrics for the SSH tools
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Spans whose byte counts are reported as throughput
+TRANSFER_SPANS = ("upload", "download")
+
+
+class Metrics:
+    """Thread-safe span recorder
+
+    Keeps cumulative statistics per host and span name (count, total, min,
+    max, bytes) plus a ring buffer of the most recent spans.
+    """
+
+    def __init__(self, recent: int = 200):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._recent: deque = deque(maxlen=recent)
+        self._started = time.time()
+
+    def record(self, host: str, name: str, duration: float, nbytes: Optional[int] = None, **attrs: Any) -> None:
+        """Record one finished span"""
+        with self._lock:
+            stats = self._stats.setdefault(host, {}).setdefault(name, {
+                "count": 0, "total_s": 0.0, "min_s": duration, "max_s": duration, "bytes": 0,
+            })
+            stats["count"] += 1
+            stats["total_s"] += duration
+            stats["min_s"] = min(stats["min_s"], duration)
+            stats["max_s"] = max(stats["max_s"], duration)
+            if nbytes:
+                stats["bytes"] += nbytes
+
+            span = {"host": host, "span": name, "duration_s": round(duration, 6), "at": time.time()}
+            if nbytes is not None:
+                span["bytes"] = nbytes
+                if duration > 0:
+                    span["bytes_per_s"] = round(nbytes / duration, 1)
+            span.update(attrs)
+            self._recent.append(span)
+
+    @contextmanager
+    def span(self, host: str, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """Time a block; set info['bytes'] inside the block to record a transfer size"""
+        info: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.record(host, name, time.perf_counter() - start, info.pop("bytes", None), **attrs, **info)
+
+    def enter(self, host: str) -> None:
+        with self._lock:
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+
+    def leave(self, host: str) -> None:
+        with self._lock:
+            self._in_flight[host] = self._in_flight.get(host, 1) - 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative metrics per host plus the most recent spans"""
+        with self._lock:
+            hosts = {}
+            for host, spans in self._stats.items():
+                host_stats = {}
+                for name, stats in spans.items():
+                    entry = {
+                        "count": stats["count"],
+                        "total_s": round(stats["total_s"], 6),
+                        "avg_s": round(stats["total_s"] / stats["count"], 6),
+                        "min_s": round(stats["min_s"], 6),
+                        "max_s": round(stats["max_s"], 6),
+                    }
+                    if name in TRANSFER_SPANS:
+                        entry["bytes"] = int(stats["bytes"])
+                        if stats["total_s"] > 0:
+                            entry["bytes_per_s"] = round(stats["bytes"] / stats["total_s"], 1)
+                    host_stats[name] = entry
+                hosts[host] = {"in_flight": self._in_flight.get(host, 0), "spans": host_stats}
+            return {
+                "uptime_s": round(time.time() - self._started, 3),
+                "hosts": hosts,
+                "recent_spans": list(self._recent),
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,380 @@
+"""
+In-process MCP tool hub for the chat CLIs
+
+Loads the demo MCP servers (github-mcp-demo, ssh-mcp-demo,
+gen-testcase-mcp-demo) as modules in the current process and calls their
+tools directly through FastMCP.call_tool, without a stdio transport or
+JSON-RPC. Calls still pass the shared runtime middleware (per-tool limits,
+timing, result truncation), exactly as calls from an MCP host do.
+
+- openai_tools() converts the tools to OpenAI function-calling schemas;
+  names are prefixed per server, e.g. "ssh__upload_file"
+- run_tool_calls() runs the tool calls of one model turn in order on the
+  hub's event loop: consecutive read-only calls run concurrently and yield
+  each result as soon as it finishes, every other call runs alone
+- chat_turn(), start_tool_hub() and Timings are the tool loop shared by the
+  chat CLIs; each CLI only supplies its stream_chat() transport
+
+Only the tools in READ_ONLY_TOOLS run without asking. Every other tool runs
+remote commands, transfers files or writes generated files, so it needs
+approval: it must match a pattern in `allow` (fnmatch, e.g. "gen_testcase__*"),
+or `confirm(name, arguments)` must return True. It is called in the thread
+iterating run_tool_calls(). Without either, the model gets an error result
+instead.
+
+Usage (the chat CLIs load the hub in a background thread at startup):
+
+    hub = ToolHub.load(["github", "ssh", "gen-testcase"], confirm=ask_user)
+    tools = hub.openai_tools()
+    for call, message, elapsed in hub.run_tool_calls(tool_calls):
+        messages.append(message)
+"""
+import asyncio
+import fnmatch
+import importlib.util
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+# name -> (directory, attribute holding the FastMCP instance)
+SERVERS = {
+    "github": ("github-mcp-demo", "app"),
+    "ssh": ("ssh-mcp-demo", "mcp"),
+    "gen-testcase": ("gen-testcase-mcp-demo", "mcp"),
+}
+# Tool results longer than this are cut before they are sent back to the model
+MAX_TOOL_RESULT_CHARS = 20_000
+TOOL_NAME_SEPARATOR = "__"
+# Tools that only read state (per server); everything else needs approval
+READ_ONLY_TOOLS = {
+    "github": {"list_repositories", "aggregate_repositories", "read_result"},
+    "ssh": {"list_remote_directory", "list_remote_entries", "stat_remote_paths", "read_result"},
+    "gen-testcase": {"list_generated_testcases", "read_result"},
+}
+
+
+def _load_server_module(name: str):
+    """Import <dir>/server.py under a unique module name (all servers are called server.py)"""
+    directory, _ = SERVERS[name]
+    path = REPO_ROOT / directory / "server.py"
+    module_name = "tool_hub_" + re.sub(r"[^a-z0-9]+", "_", name)
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    # FastMCP() configures the root logger for a server process; keep the host's logging as it was
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    finally:
+        root.handlers[:] = handlers
+        root.setLevel(level)
+    return module
+
+
+def _result_text(result: Any) -> str:
+    """Text for the model from a FastMCP.call_tool result (content blocks, or (content, structured))"""
+    if isinstance(result, tuple):
+        content, structured = result
+        if structured is not None:
+            # Tools returning lists are wrapped as {"result": [...]} in structured output
+            if isinstance(structured, dict) and set(structured) == {"result"}:
+                structured = structured["result"]
+            return json.dumps(structured, ensure_ascii=False)
+        result = content
+    if isinstance(result, dict):
+        return json.dumps(result, ensure_ascii=False)
+    parts = []
+    for block in result or []:
+        text = getattr(block, "text", None)
+        parts.append(text if text is not None else json.dumps(block.model_dump(mode="json"), ensure_ascii=False))
+    return "\n".join(parts)
+
+
+class ToolHub:
+    """The tools of several in-process MCP servers, callable from synchronous code"""
+
+    def __init__(self, confirm: Optional[Callable[[str, str], bool]] = None, allow: Iterable[str] = ()):
+        self.confirm = confirm
+        self.allow = list(allow)
+        self._servers: Dict[str, Any] = {}
+        self._modules: Dict[str, Any] = {}
+        self._tools: Dict[str, Tuple[str, str]] = {}  # exposed name -> (server, tool name)
+        self._schemas: List[Dict[str, Any]] = []
+        self.errors: Dict[str, str] = {}
+        # One loop for all calls: the runtime's semaphores and executors are bound to it
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="tool-hub", daemon=True).start()
+
+    @classmethod
+    def load(cls, servers: List[str], confirm: Optional[Callable[[str, str], bool]] = None,
+             allow: Iterable[str] = ()) -> "ToolHub":
+        """Load the named servers; a server that fails to import is skipped and listed in .errors"""
+        hub = cls(confirm, allow)
+        for name in servers:
+            try:
+                hub.add_server(name)
+            except Exception as e:
+                hub.errors[name] = f"{type(e).__name__}: {e}"
+        return hub
+
+    def add_server(self, name: str) -> None:
+        if name not in SERVERS:
+            raise ValueError(f"unknown server '{name}' (choose from {', '.join(SERVERS)})")
+        module = _load_server_module(name)
+        server = getattr(module, SERVERS[name][1])
+        prefix = re.sub(r"[^a-zA-Z0-9_]+", "_", name)
+        for tool in self._run(server.list_tools()):
+            exposed = f"{prefix}{TOOL_NAME_SEPARATOR}{tool.name}"[:64]
+            self._tools[exposed] = (name, tool.name)
+            self._schemas.append({
+                "type": "function",
+                "function": {
+                    "name": exposed,
+                    "description": (tool.description or "").strip()[:1024],
+                    "parameters": tool.inputSchema or {"type": "object", "properties": {}},
+                },
+            })
+        self._servers[name] = server
+        self._modules[name] = module
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def openai_tools(self) -> List[Dict[str, Any]]:
+        """OpenAI function-calling schemas of every loaded tool"""
+        return list(self._schemas)
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def is_read_only(self, exposed_name: str) -> bool:
+        server_name, tool_name = self._tools.get(exposed_name, (None, None))
+        return tool_name in READ_ONLY_TOOLS.get(server_name, ())
+
+    def is_allowed(self, exposed_name: str) -> bool:
+        """Read-only, or approved in advance through the allow patterns"""
+        return self.is_read_only(exposed_name) or any(fnmatch.fnmatchcase(exposed_name, pattern)
+                                                      for pattern in self.allow)
+
+    def approve(self, exposed_name: str, arguments: Any) -> bool:
+        """Whether a call may run; asks confirm() for tools that are not allowed in advance"""
+        if exposed_name not in self._tools or self.is_allowed(exposed_name):
+            return True
+        if self.confirm is None:
+            return False
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments, ensure_ascii=False)
+        return bool(self.confirm(exposed_name, arguments))
+
+    async def call(self, exposed_name: str, arguments: Any, approved: bool = False) -> str:
+        """Call one tool; errors come back as "Error: ..." text for the model
+
+        Tools that are not allowed in advance only run with approved=True (see approve()).
+        """
+        if exposed_name not in self._tools:
+            return f"Error: unknown tool '{exposed_name}'"
+        if not approved and not self.is_allowed(exposed_name):
+            return f"Error: the user did not approve running '{exposed_name}'"
+        server_name, tool_name = self._tools[exposed_name]
+        try:
+            if isinstance(arguments, str):
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            result = await self._servers[server_name].call_tool(tool_name, arguments or {})
+            text = _result_text(result)
+        except Exception as e:
+            return f"Error: {e}"
+        if len(text) > MAX_TOOL_RESULT_CHARS:
+            text = text[:MAX_TOOL_RESULT_CHARS] + f"\n[truncated: {len(text)} chars in total]"
+        return text
+
+    def run_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], float]]:
+        """Run the tool calls of one turn in the model's order; yield (call, tool message, seconds) as each finishes
+
+        Consecutive read-only calls run concurrently. Every other call is a barrier:
+        it is approved (see approve()) and run alone once the calls before it have
+        finished, and the calls after it start only when it is done, since they may
+        depend on it (upload, then list or execute). seconds is each call's own run time.
+        tool_calls use the OpenAI format: {"id", "type": "function", "function": {"name", "arguments"}}.
+        """
+        async def timed(call, approved=False):
+            started = time.perf_counter()
+            function = call.get("function", {})
+            text = await self.call(function.get("name", ""), function.get("arguments") or "{}", approved)
+            return text, time.perf_counter() - started
+
+        def message(call, text):
+            return {"role": "tool", "tool_call_id": call.get("id"), "content": text}
+
+        batch: List[Dict[str, Any]] = []
+
+        def run_batch():
+            futures = {asyncio.run_coroutine_threadsafe(timed(call), self._loop): call for call in batch}
+            batch.clear()
+            for future in as_completed(futures):
+                call = futures[future]
+                text, elapsed = future.result()
+                yield call, message(call, text), elapsed
+
+        for call in tool_calls:
+            function = call.get("function", {})
+            if self.is_read_only(function.get("name", "")):
+                batch.append(call)
+                continue
+            yield from run_batch()
+            approved = self.approve(function.get("name", ""), function.get("arguments") or "{}")
+            text, elapsed = asyncio.run_coroutine_threadsafe(timed(call, approved), self._loop).result()
+            yield call, message(call, text), elapsed
+        yield from run_batch()
+
+    def close(self) -> None:
+        """Stop the servers' worker pools and the hub's event loop"""
+        for module in self._modules.values():
+            runtime = getattr(module, "runtime", None)
+            if runtime is not None:
+                runtime.shutdown()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def accumulate_tool_call_deltas(calls: Dict[int, Dict[str, Any]], deltas: Optional[List[Any]]) -> None:
+    """Merge streamed tool_call deltas (dicts or SDK objects) into calls, keyed by index"""
+    for delta in deltas or []:
+        get = delta.get if isinstance(delta, dict) else (lambda key, d=delta: getattr(d, key, None))
+        index = get("index") or 0
+        call = calls.setdefault(index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+        if get("id"):
+            call["id"] = get("id")
+        function = get("function")
+        if function is not None:
+            fget = function.get if isinstance(function, dict) else (lambda key, f=function: getattr(f, key, None))
+            if fget("name"):
+                call["function"]["name"] += fget("name")
+            if fget("arguments"):
+                call["function"]["arguments"] += fget("arguments")
+
+
+def finish_tool_calls(calls: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Accumulated tool calls in index order, with ids filled in where the stream sent none"""
+    result = []
+    for index in sorted(calls):
+        call = calls[index]
+        if not call["id"]:
+            call["id"] = f"call_{index}"
+        result.append(call)
+    return result
+
+
+# Shared by the chat CLIs (ai_chat.py, openai_chat_sdk.py); each CLI only supplies
+# its own stream_chat(messages, tools, tool_calls) transport.
+
+class Timings:
+    """Stage timings of a chat CLI, kept until flush() so background threads do not break into the input prompt"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._pending: List[str] = []
+
+    def record(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self._pending.append(f"{stage} {seconds * 1000:.0f}ms")
+
+    def note(self, text: str) -> None:
+        """A message shown with the timings, e.g. a failed warm-up"""
+        if self.enabled:
+            self._pending.append(text)
+
+    def flush(self) -> None:
+        while self._pending:
+            print(f"[耗时] {self._pending.pop(0)}", file=sys.stderr)
+
+
+def confirm_tool_call(name: str, arguments: str) -> bool:
+    """Show a side-effecting call with its full arguments and ask y/N on the terminal; declined by default"""
+    try:
+        answer = input(f"[工具] 模型请求执行 {name}，参数: {arguments}\n是否允许? [y/N] ")
+    except EOFError:
+        return False
+    return answer.strip().lower() in ("y", "yes")
+
+
+def start_tool_hub(servers: List[str], allow: Iterable[str], timings: Timings) -> Future:
+    """Load the servers in a background thread; the Future's result is the ToolHub, or None without servers"""
+    future = Future()
+
+    def run():
+        started = time.perf_counter()
+        try:
+            hub = None
+            if servers:
+                hub = ToolHub.load(servers, confirm=confirm_tool_call, allow=allow)
+                timings.record(f"加载 {len(hub)} 个工具", time.perf_counter() - started)
+                for name, error in hub.errors.items():
+                    timings.note(f"工具服务 {name} 加载失败: {error}")
+            future.set_result(hub)
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="tool-hub-load", daemon=True).start()
+    return future
+
+
+def print_tool_results(hub: ToolHub, tool_calls: List[Dict[str, Any]], messages: List[Dict[str, Any]],
+                       preview_chars: int = 200) -> None:
+    """Run the tool calls of one turn, print a preview of each result as it finishes and append it to messages"""
+    print()
+    for call, message, elapsed in hub.run_tool_calls(tool_calls):
+        preview = " ".join(message["content"].split())
+        if len(preview) > preview_chars:
+            preview = preview[:preview_chars] + "..."
+        print(f"[工具] {call['function']['name']} 完成 ({elapsed:.2f}s): {preview}", flush=True)
+        messages.append(message)
+
+
+def chat_turn(stream_chat: Callable[..., Iterable[str]], messages: List[Dict[str, Any]], hub: Optional[ToolHub],
+              timings: Timings, max_tool_rounds: int = 8, preview_chars: int = 200) -> str:
+    """Complete one user turn, running the tools the model asks for until it answers; return the final reply
+
+    stream_chat(messages, tools, tool_calls) yields the reply's content chunks and
+    merges the streamed tool calls into the tool_calls dict (see
+    accumulate_tool_call_deltas()). When the request fails or the stream ends
+    without a finish_reason it must leave tool_calls empty, so no call with
+    truncated arguments runs.
+    After max_tool_rounds rounds with tool calls the model gets no tools and has to answer.
+    """
+    tools = hub.openai_tools() if hub is not None and len(hub) else None
+    started = time.perf_counter()
+    first_token = True
+    for round_index in range(max_tool_rounds + 1):
+        round_tools = tools if round_index < max_tool_rounds else None
+        calls: Dict[int, Dict[str, Any]] = {}
+        assistant_reply = ""
+        for chunk in stream_chat(messages, round_tools, calls):
+            if first_token:
+                timings.record("首 token", time.perf_counter() - started)
+                first_token = False
+            assistant_reply += chunk
+
+        if not calls:
+            if assistant_reply:
+                messages.append({"role": "assistant", "content": assistant_reply})
+            return assistant_reply
+
+        tool_calls = finish_tool_calls(calls)
+        messages.append({"role": "assistant", "content": assistant_reply or None, "tool_calls": tool_calls})
+        print_tool_results(hub, tool_calls, messages, preview_chars)
+        print("AI: ", end='', flush=True)
+    return ""